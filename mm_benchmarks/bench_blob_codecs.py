@@ -0,0 +1,89 @@
+"""
+Stored-blob codecs of MMContentSerializer vs. the original JSON path,
+on synthetic web-page chunks (split text, with some images in between).
+
+    python -m mm_benchmarks.bench_blob_codecs [--chunks 20000] [--chunk-size 1000]
+
+Codecs whose optional dependency is not installed are skipped.
+"""
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List
+
+from mm_langchain.mm_blob_codecs import decode_blob, get_blob_codec
+
+_WORDS = (
+    "the of and to in is for on with as by at from that this multimodal "
+    "vector store embedding image page “quoted” naïve café résumé 2023 "
+    'Cassandra <b>markup</b> "double" back\\slash tab\tnewline\n'
+).split(" ")
+
+
+def web_page_chunks(
+    num_chunks: int, chunk_size: int = 1000, image_every: int = 5, seed: int = 0
+) -> List[Dict[str, str]]:
+    """
+    Serialized contents as MMImageTextSerializer makes them from a loaded
+    web page: text chunks of about chunk_size characters, and every
+    `image_every` chunks an image (stored as a placeholder string).
+    """
+    rng = random.Random(seed)
+    chunks: List[Dict[str, str]] = []
+    for chunk_i in range(num_chunks):
+        if image_every and chunk_i % image_every == image_every - 1:
+            chunks.append({"image": "(an image)"})
+        else:
+            words: List[str] = []
+            length = 0
+            while length < chunk_size:
+                word = rng.choice(_WORDS)
+                words.append(word)
+                length += len(word) + 1
+            chunks.append({"text": " ".join(words)[:chunk_size]})
+    return chunks
+
+
+def _time_per_item(func: Callable, items: List) -> float:
+    t0 = time.perf_counter()
+    for item in items:
+        func(item)
+    return 1e6 * (time.perf_counter() - t0) / len(items)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--chunks", type=int, default=20000)
+    arg_parser.add_argument("--chunk-size", type=int, default=1000)
+    args = arg_parser.parse_args()
+    #
+    chunks = web_page_chunks(args.chunks, args.chunk_size)
+    print(f"{'codec':<22}{'encode us':>10}{'decode us':>10}{'avg chars':>11}")
+
+    def _report(label: str, encode: Callable, decode: Callable) -> None:
+        blobs = [encode(chunk) for chunk in chunks]
+        assert [decode(blob) for blob in blobs] == chunks, f"{label}: round trip!"
+        print(
+            f"{label:<22}{_time_per_item(encode, chunks):>10.2f}"
+            f"{_time_per_item(decode, blobs):>10.2f}"
+            f"{sum(len(blob) for blob in blobs) / len(blobs):>11.1f}"
+        )
+
+    # the original path: stdlib json both ways
+    _report(
+        "original (json)",
+        lambda stored: json.dumps(stored, separators=(",", ":"), sort_keys=True),
+        json.loads,
+    )
+    for codec_name in ["json", "orjson", "length_prefixed"]:
+        try:
+            codec = get_blob_codec(codec_name)
+        except ImportError as exc:
+            print(f"{codec_name:<22}(skipped: {exc})")
+            continue
+        _report(codec_name, codec.encode, decode_blob)
+
+
+if __name__ == "__main__":
+    main()
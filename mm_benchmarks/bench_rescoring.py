@@ -0,0 +1,176 @@
+"""
+Recall and cost of the two-stage (compact first pass + exact rescoring)
+search of NumpyVectorReaderWriter, against exact search, on synthetic
+clustered vectors.
+
+    python -m mm_benchmarks.bench_rescoring [--rows 100000] [--dimension 512]
+
+Then the same for the two-stage layouts of CassandraVectorReaderWriter
+(truncated vectors in the ANN index, rescoring with the full ones),
+on an in-memory table with exact search (no database needed), with
+their bytes per row of vector data. The synthetic vectors, like CLIP's,
+are not trained to keep their information in the leading components.
+"""
+import argparse
+import time
+from typing import Any, List, Optional, Sequence
+from unittest import mock
+
+import numpy as np
+
+from mm_langchain.mm_abstract_vectorstores import VectorReaderWriter
+from mm_langchain.mm_local_vectorstores import NumpyVectorReaderWriter
+from mm_langchain.mm_types import DefaultVSearchResult
+from mm_langchain import mm_vectorstores
+from mm_langchain.mm_vectorstores import CassandraVectorReaderWriter
+
+from .fakes import InMemoryVectorTable
+
+
+def recall_at_k(
+    reference: Sequence[List[DefaultVSearchResult]],
+    candidate: Sequence[List[DefaultVSearchResult]],
+) -> float:
+    """Fraction of the reference ids (per query) found in the candidate results."""
+    found = 0
+    total = 0
+    for ref_results, cand_results in zip(reference, candidate):
+        ref_ids = {result[0] for result in ref_results}
+        found += len(ref_ids & {result[0] for result in cand_results})
+        total += len(ref_ids)
+    return found / total if total else 1.0
+
+
+def measure_recall(
+    exact_rw: VectorReaderWriter,
+    approx_rw: VectorReaderWriter,
+    queries: np.ndarray,
+    k: int = 10,
+) -> float:
+    return recall_at_k(
+        [exact_rw.search_by_vector(query, k=k) for query in queries],
+        [approx_rw.search_by_vector(query, k=k) for query in queries],
+    )
+
+
+def synthetic_vectors(
+    num_rows: int, dimension: int, num_clusters: int = 100, seed: int = 0
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, num_clusters, size=num_rows)
+    noise = rng.standard_normal((num_rows, dimension)).astype(np.float32)
+    return centers[labels] + 0.8 * noise
+
+
+def _build(
+    vectors: np.ndarray, compact_codec: Optional[str]
+) -> NumpyVectorReaderWriter:
+    rw = NumpyVectorReaderWriter(
+        vector_dimension=vectors.shape[1],
+        initial_capacity=len(vectors),
+        compact_codec=compact_codec,
+    )
+    rw.store_contents(
+        contents_str=[""] * len(vectors),
+        vectors=vectors,
+        ids=[str(row_i) for row_i in range(len(vectors))],
+    )
+    return rw
+
+
+def _query_ms(rw: VectorReaderWriter, queries: np.ndarray, k: int) -> float:
+    t0 = time.perf_counter()
+    for query in queries:
+        rw.search_by_vector(query, k=k)
+    return 1000 * (time.perf_counter() - t0) / len(queries)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--rows", type=int, default=100000)
+    arg_parser.add_argument("--dimension", type=int, default=512)
+    arg_parser.add_argument("--queries", type=int, default=100)
+    arg_parser.add_argument("--k", type=int, default=10)
+    arg_parser.add_argument("--cassandra-rows", type=int, default=20000)
+    args = arg_parser.parse_args()
+    #
+    vectors = synthetic_vectors(args.rows + args.queries, args.dimension)
+    data, queries = vectors[: args.rows], vectors[args.rows :]
+    exact = _build(data, None)
+    print(f"{'mode':<18}{'recall@k':>10}{'ms/query':>10}{'first-pass MB':>15}")
+    print(
+        f"{'exact':<18}{1.0:>10.3f}{_query_ms(exact, queries, args.k):>10.2f}"
+        f"{exact._matrix[: exact._size].nbytes / 2**20:>15.1f}"
+    )
+    for codec in ["int8", "bit"]:
+        approx = _build(data, codec)
+        for oversample in [1, 4, 10]:
+            approx.oversample = oversample
+            recall = measure_recall(exact, approx, queries, k=args.k)
+            label = f"{codec} x{oversample}"
+            print(
+                f"{label:<18}{recall:>10.3f}"
+                f"{_query_ms(approx, queries, args.k):>10.2f}"
+                f"{approx._compact[: approx._size].nbytes / 2**20:>15.1f}"
+            )
+    print_cassandra_layouts(data[: args.cassandra_rows], queries, args.k)
+
+
+def _build_cassandra(vectors: np.ndarray, **kwargs: Any) -> CassandraVectorReaderWriter:
+    """A CassandraVectorReaderWriter on an InMemoryVectorTable."""
+    with mock.patch.object(
+        mm_vectorstores, "MetadataVectorCassandraTable", InMemoryVectorTable
+    ):
+        rw = CassandraVectorReaderWriter("bench", vectors.shape[1], **kwargs)
+    rw.store_contents(
+        contents_str=[""] * len(vectors),
+        vectors=vectors,
+        ids=[str(row_i) for row_i in range(len(vectors))],
+    )
+    return rw
+
+
+def print_cassandra_layouts(data: np.ndarray, queries: np.ndarray, k: int) -> None:
+    """
+    Recall@k (against exact search) and bytes per row of vector data of
+    the two-stage layouts, relative to the exact one.
+    """
+    dimension = data.shape[1]
+    exact_size = CassandraVectorReaderWriter.row_storage(dimension)["vector_column"]
+    exact = _build_cassandra(data)
+    print(
+        f"\nCassandra two-stage layouts ({len(data)} rows; "
+        f"exact: {exact_size} bytes per row, all indexed)"
+    )
+    print(
+        f"{'layout':<18}{'recall@k':>10}{'x4 recall':>10}"
+        f"{'indexed B':>10}{'metadata B':>12}{'row':>8}{'index':>8}"
+    )
+    for search_dimension in [dimension // 2, dimension // 4, dimension // 8]:
+        for codec in ["float32", "float16", "int8"]:
+            approx = _build_cassandra(
+                data,
+                search_dimension=search_dimension,
+                full_vector_codec=codec,
+                oversample=1,
+            )
+            recall = measure_recall(exact, approx, queries, k=k)
+            approx.oversample = 4
+            recall_x4 = measure_recall(exact, approx, queries, k=k)
+            storage = CassandraVectorReaderWriter.row_storage(
+                dimension, search_dimension, codec
+            )
+            row_size = storage["vector_column"] + storage["full_vector_metadata"]
+            label = f"{search_dimension} + {codec}"
+            print(
+                f"{label:<18}{recall:>10.3f}{recall_x4:>10.3f}"
+                f"{storage['vector_column']:>10}"
+                f"{storage['full_vector_metadata']:>12}"
+                f"{row_size / exact_size:>7.2f}x"
+                f"{storage['vector_column'] / exact_size:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Regression benchmark for the web loader's `_traverse` on a synthetic page.
+
+    python -m mm_benchmarks.bench_traverse [--nodes 50000] [--skip-legacy]
+
+Checks that the text/image stream is the same as the one of the
+original recursive traversal (kept here for reference) and times both,
+with each available parser.
+"""
+import argparse
+import time
+from typing import Iterable, List, Union
+
+import bs4
+
+from mm_langchain.mm_loaders.mm_web_page_loader import _traverse
+
+
+def _legacy_traverse(
+    tree_base: Union[bs4.BeautifulSoup, bs4.element.Tag]
+) -> Iterable[dict]:
+    # the original implementation: find_all at every level (quadratic)
+    if tree_base.name == "img":
+        yield {"image_url": tree_base["src"]}
+    else:
+        if len(tree_base.find_all("img")) == 0:
+            _txt = tree_base.text.strip()
+            if _txt:
+                yield {"text": _txt}
+        else:
+            for child in tree_base.children:
+                if isinstance(child, bs4.element.NavigableString):
+                    _txt = child.text.strip()
+                    if _txt:
+                        yield {"text": _txt}
+                elif isinstance(child, bs4.element.Tag):
+                    for piece in _legacy_traverse(child):
+                        yield piece
+                else:
+                    raise ValueError(f"Unexpected child: {child}")
+
+
+def synthetic_page(num_nodes: int = 50000, depth: int = 100) -> str:
+    """
+    A page of sections, each a chain of `depth` nested divs with some text
+    (plus an image-free paragraph) at every level and an image at the bottom.
+    Each level accounts for 7 nodes (tags and strings).
+    """
+    num_sections = max(1, num_nodes // (7 * depth))
+    parts: List[str] = ["<html><head><title>Synthetic</title></head><body>"]
+    for section_i in range(num_sections):
+        for level in range(depth):
+            parts.append(
+                f"<div>Section {section_i} level {level}."
+                f"<p>Some <b>bold</b> text here.</p>"
+            )
+        parts.append(f'<img src="/img/{section_i}.png"/>')
+        parts.append("</div>" * depth)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _timed(label: str, func, *pargs):
+    t0 = time.perf_counter()
+    result = func(*pargs)
+    print(f"    {label:<24} {1000 * (time.perf_counter() - t0):10.1f} ms")
+    return result
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--nodes", type=int, default=50000)
+    arg_parser.add_argument("--depth", type=int, default=100)
+    arg_parser.add_argument("--skip-legacy", action="store_true")
+    args = arg_parser.parse_args()
+    #
+    html = synthetic_page(args.nodes, args.depth)
+    parsers = ["html.parser"]
+    try:
+        import lxml  # type: ignore # noqa: F401
+
+        parsers.append("lxml")
+    except ImportError:
+        print("(lxml not installed, skipping it)")
+    for parser in parsers:
+        print(f"Parser '{parser}':")
+        soup = _timed("parse", bs4.BeautifulSoup, html, parser)
+        print(f"    ({sum(1 for _ in soup.descendants)} nodes)")
+        pieces = _timed("_traverse", lambda s: list(_traverse(s)), soup)
+        if not args.skip_legacy:
+            legacy_pieces = _timed(
+                "legacy _traverse", lambda s: list(_legacy_traverse(s)), soup
+            )
+            assert pieces == legacy_pieces, "Traversal output differs from legacy!"
+            print("    (same output as legacy traversal)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Offline, deterministic stand-ins for the benchmarks: a fake multimodal
+embedding model, a minimal in-memory LangChain vector store (a base store
+for the duct tape), an in-memory cassio vector table, a web loader reading a given page and synthetic
+HTML/image fixtures.
+"""
+import hashlib
+import io
+import random
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import bs4
+import numpy as np
+from PIL import Image
+from PIL.Image import Image as PILImageType
+
+from langchain.schema.document import Document
+from langchain.schema.embeddings import Embeddings
+from langchain.schema.vectorstore import VectorStore
+
+from mm_langchain.mm_abstract_embeddings import MMEmbeddings
+from mm_langchain.mm_loaders.mm_web_page_loader import MMDisjointWebBaseLoader
+from mm_langchain.mm_vectors import as_vector_array, as_vector_matrix
+
+_WORDS = (
+    "the of and to in is for on with as by at from that this multimodal "
+    "vector store embedding image page quoted naive cafe resume 2023 "
+    "Cassandra search query result model batch index partition"
+).split(" ")
+
+
+def _seed_of(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class FakeMMEmbeddings(MMEmbeddings):
+    """
+    Deterministic "text"/"image" embeddings: each value maps to
+    a pseudo-random unit vector seeded by a hash of the value.
+    No model cost, so that the library's own overhead is what gets timed.
+    """
+
+    modality_type_map = {
+        "text": str,
+        "image": PILImageType,
+    }
+
+    def __init__(self, dimension: int = 512) -> None:
+        self.dimension = dimension
+
+    def _vector(self, modality: str, value: Any) -> np.ndarray:
+        if modality == "text":
+            data = value.encode("utf-8")
+        elif modality == "image":
+            data = value.tobytes()
+        else:
+            raise ValueError(f"Unknown modality '{modality}'")
+        rng = np.random.default_rng(_seed_of(modality.encode() + b"\x00" + data))
+        vector = rng.standard_normal(self.dimension).astype(np.float32)
+        vector /= np.linalg.norm(vector)
+        return vector
+
+    def embed_by_modality(self, modality: str, value: Any) -> np.ndarray:
+        return self._vector(modality, value)
+
+    def embed_batch_by_modality(
+        self, modality: str, values: List[Any], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        return as_vector_matrix([self._vector(modality, value) for value in values])
+
+
+class InMemoryBaseVectorStore(VectorStore):
+    """
+    Brute-force (cosine) LangChain vector store, to have
+    the duct tape run on something without a database.
+    """
+
+    def __init__(self, embedding: Embeddings, **kwargs: Any) -> None:
+        self.embedding = embedding
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._vectors: List[np.ndarray] = []
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts0 = list(texts)
+        vectors = as_vector_matrix(self.embedding.embed_documents(texts0))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        first_id = len(self._texts)
+        self._texts.extend(texts0)
+        self._metadatas.extend(metadatas or [{} for _ in texts0])
+        self._vectors.extend(vectors)
+        return [str(first_id + text_i) for text_i in range(len(texts0))]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        query = as_vector_array(embedding)
+        scores = np.stack(self._vectors) @ (query / np.linalg.norm(query))
+        top = np.argsort(-scores)[:k]
+        return [
+            (
+                Document(page_content=self._texts[i], metadata=self._metadatas[i]),
+                float(scores[i]),
+            )
+            for i in top
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            self.embedding.embed_query(query), k=k
+        )
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> "InMemoryBaseVectorStore":
+        store = cls(embedding=embedding)
+        store.add_texts(texts, metadatas=metadatas)
+        return store
+
+
+class _CompletedFuture:
+    """A driver ResponseFuture already completed successfully."""
+
+    def result(self) -> None:
+        return None
+
+
+class InMemoryVectorTable:
+    """
+    Exact-search stand-in for cassio's MetadataVectorCassandraTable,
+    with what CassandraVectorReaderWriter uses of it (no partitions),
+    to run the reader-writer (e.g. its two-stage search) without a database.
+    """
+
+    def __init__(self, table: str, vector_dimension: int, **kwargs: Any) -> None:
+        self.vector_dimension = vector_dimension
+        self.clear()
+
+    def put_async(
+        self, row_id: str, body_blob: str, vector: List[float], metadata: dict
+    ) -> _CompletedFuture:
+        unit = as_vector_array(vector) / np.linalg.norm(vector)
+        position = self._position_by_id.setdefault(row_id, len(self._rows))
+        if position == len(self._rows):
+            self._rows.append((row_id, body_blob, dict(metadata)))
+            self._vectors.append(unit)
+        else:
+            self._rows[position] = (row_id, body_blob, dict(metadata))
+            self._vectors[position] = unit
+        self._matrix = None
+        return _CompletedFuture()
+
+    def metric_ann_search(
+        self, vector: List[float], n: int, metric: str, **kwargs: Any
+    ) -> List[dict]:
+        if not self._rows:
+            return []
+        if self._matrix is None:
+            self._matrix = np.stack(self._vectors)
+        query = as_vector_array(vector)
+        scores = self._matrix @ (query / np.linalg.norm(query))
+        top = np.argsort(-scores)[:n]
+        return [
+            {
+                "row_id": self._rows[i][0],
+                "body_blob": self._rows[i][1],
+                "metadata": dict(self._rows[i][2]),
+                "distance": float(scores[i]),
+            }
+            for i in top.tolist()
+        ]
+
+    async def ametric_ann_search(self, **kwargs: Any) -> List[dict]:
+        return self.metric_ann_search(**kwargs)
+
+    def clear(self) -> None:
+        self._position_by_id: Dict[str, int] = {}
+        self._rows: List[Tuple[str, str, dict]] = []
+        self._vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+
+def synthetic_image(seed: int = 0, size: Tuple[int, int] = (320, 240)) -> PILImageType:
+    """A noisy RGB image (fully determined by the seed)."""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    return Image.fromarray(pixels, mode="RGB")
+
+
+def synthetic_jpeg(seed: int = 0, size: Tuple[int, int] = (320, 240)) -> bytes:
+    buffer = io.BytesIO()
+    synthetic_image(seed, size).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def synthetic_text(num_chars: int, rng: random.Random) -> str:
+    words: List[str] = []
+    length = 0
+    while length < num_chars:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:num_chars]
+
+
+def synthetic_html(
+    num_sections: int = 50,
+    paragraphs_per_section: int = 4,
+    paragraph_chars: int = 400,
+    seed: int = 0,
+) -> str:
+    """An article-like page: sections of paragraphs, each closed by an image."""
+    rng = random.Random(seed)
+    parts: List[str] = [
+        '<html lang="en"><head><title>Synthetic page</title>'
+        '<meta name="description" content="Benchmark fixture"/></head><body>'
+    ]
+    for section_i in range(num_sections):
+        parts.append(f"<section><h2>Section {section_i}</h2>")
+        for _ in range(paragraphs_per_section):
+            text = synthetic_text(paragraph_chars, rng)
+            parts.append(f"<p>{text} <b>{rng.choice(_WORDS)}</b>.</p>")
+        parts.append(f'<figure><img src="img/{section_i}.jpg"/></figure></section>')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+class OfflineWebLoader(MMDisjointWebBaseLoader):
+    """
+    The web loader on a given page: no requests are made,
+    every image URL is served the same JPEG bytes (decoded lazily by PIL,
+    as the downloaded ones would be).
+    """
+
+    def __init__(
+        self,
+        html: str,
+        image_bytes: bytes,
+        url: str = "https://example.com/page.html",
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(url, **kwargs)
+        self.html = html
+        self.image_bytes = image_bytes
+
+    def _scrape(self, url: str) -> Any:
+        return bs4.BeautifulSoup(self.html, self.parser)
+
+    def _fetch_images(self, image_urls: Iterable[str]) -> Iterator[PILImageType]:
+        for _ in image_urls:
+            yield Image.open(io.BytesIO(self.image_bytes))
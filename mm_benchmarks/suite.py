@@ -0,0 +1,268 @@
+"""
+Offline micro-benchmarks of the embed -> serialize -> store -> search path
+(plus loading and the duct tape), with the fakes of mm_benchmarks.fakes.
+
+    python -m mm_benchmarks.suite [--output results.json] [--compare base.json]
+
+Each stage runs `--repeats` times; the JSON output has the best and median
+time and the median time per item of each stage, along with the git commit
+and the parameters. With `--compare`, stages whose median got slower than
+`--threshold` times the baseline are reported and the exit code is 1.
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import bs4
+import numpy as np
+
+from mm_langchain.mm_duct_tape import (
+    _unwrap_from_base_vectorstore,
+    _wrap_for_base_vectorstore,
+    duct_tape_make_multimodal,
+)
+from mm_langchain.mm_huggingface_embeddings import MMImageTextSerializer
+from mm_langchain.mm_loaders.mm_web_page_loader import _traverse
+from mm_langchain.mm_local_vectorstores import MMNumpyVectorStore
+from mm_langchain.mm_types import MMContent
+
+from .fakes import (
+    FakeMMEmbeddings,
+    InMemoryBaseVectorStore,
+    OfflineWebLoader,
+    synthetic_html,
+    synthetic_image,
+    synthetic_jpeg,
+    synthetic_text,
+)
+
+
+def synthetic_contents(
+    num_contents: int, text_chars: int = 256, image_every: int = 5, seed: int = 0
+) -> List[MMContent]:
+    """Text chunks, with an image every `image_every` contents."""
+    rng = random.Random(seed)
+    images = [synthetic_image(seed=image_i, size=(64, 64)) for image_i in range(16)]
+    return [
+        {"image": images[content_i % len(images)]}
+        if image_every and content_i % image_every == image_every - 1
+        else {"text": synthetic_text(text_chars, rng)}
+        for content_i in range(num_contents)
+    ]
+
+
+def time_stage(
+    func: Callable[[], Any],
+    num_items: int,
+    repeats: int,
+    setup: Optional[Callable[[], None]] = None,
+) -> Dict[str, float]:
+    """Run `func` `repeats` times (calling `setup`, untimed, before each)."""
+    timings: List[float] = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    median = statistics.median(timings)
+    return {
+        "items": num_items,
+        "repeats": repeats,
+        "best_s": min(timings),
+        "median_s": median,
+        "median_us_per_item": 1e6 * median / num_items,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(
+    num_contents: int = 2000,
+    num_queries: int = 200,
+    dimension: int = 512,
+    k: int = 4,
+    page_sections: int = 50,
+    repeats: int = 5,
+) -> Dict[str, Dict[str, float]]:
+    embedding = FakeMMEmbeddings(dimension=dimension)
+    serializer = MMImageTextSerializer()
+    contents = synthetic_contents(num_contents)
+    queries = synthetic_contents(num_queries, text_chars=64, image_every=0, seed=1)
+    results: Dict[str, Dict[str, float]] = {}
+
+    results["embed_many"] = time_stage(
+        lambda: embedding.embed_many(contents), num_contents, repeats
+    )
+    results["serialize_content_to_stored_str"] = time_stage(
+        lambda: [
+            serializer.serialize_content_to_stored_str(content) for content in contents
+        ],
+        num_contents,
+        repeats,
+    )
+
+    # add_contents on a fresh store each time
+    stores: List[MMNumpyVectorStore] = []
+
+    def _new_store() -> None:
+        stores[:] = [
+            MMNumpyVectorStore(
+                embedding=embedding,
+                content_serializer=serializer,
+                vector_dimension=dimension,
+            )
+        ]
+
+    results["add_contents"] = time_stage(
+        lambda: stores[0].add_contents(contents), num_contents, repeats, _new_store
+    )
+    store = stores[0]
+    results["similarity_search"] = time_stage(
+        lambda: [store.similarity_search(query, k=k) for query in queries],
+        len(queries),
+        repeats,
+    )
+
+    html = synthetic_html(num_sections=page_sections)
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    num_nodes = sum(1 for _ in soup.descendants)
+    results["_traverse"] = time_stage(lambda: list(_traverse(soup)), num_nodes, repeats)
+    loader = OfflineWebLoader(html, synthetic_jpeg())
+    results["load_and_split"] = time_stage(
+        lambda: loader.load_and_split(), page_sections, repeats
+    )
+
+    vectors = embedding.embed_many_array(contents)
+    results["duct_tape_wrap"] = time_stage(
+        lambda: [
+            _wrap_for_base_vectorstore(content, vector, serializer)
+            for content, vector in zip(contents, vectors)
+        ],
+        num_contents,
+        repeats,
+    )
+    wrapped = [
+        _wrap_for_base_vectorstore(content, vector, serializer)
+        for content, vector in zip(contents, vectors)
+    ]
+    results["duct_tape_unwrap"] = time_stage(
+        lambda: [
+            _unwrap_from_base_vectorstore(wrapped_str, {}, serializer)
+            for wrapped_str in wrapped
+        ],
+        num_contents,
+        repeats,
+    )
+    dt_store = duct_tape_make_multimodal(
+        base_vectorstore_class=InMemoryBaseVectorStore,
+        embedding=embedding,
+        content_serializer=serializer,
+        vector_dimension=dimension,
+    )
+    dt_store.add_contents(contents)
+    results["duct_tape_similarity_search"] = time_stage(
+        lambda: [dt_store.similarity_search(query, k=k) for query in queries],
+        len(queries),
+        repeats,
+    )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """The stages slower than `threshold` times their baseline median."""
+    regressions = []
+    for stage, result in results.items():
+        if stage not in baseline:
+            continue
+        ratio = result["median_us_per_item"] / baseline[stage]["median_us_per_item"]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(stage)
+            flag = "  <== REGRESSION"
+        print(f"    {stage:<34}{ratio:>8.2f}x{flag}")
+    return regressions
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--contents", type=int, default=2000)
+    arg_parser.add_argument("--queries", type=int, default=200)
+    arg_parser.add_argument("--dimension", type=int, default=512)
+    arg_parser.add_argument("--k", type=int, default=4)
+    arg_parser.add_argument("--page-sections", type=int, default=50)
+    arg_parser.add_argument("--repeats", type=int, default=5)
+    arg_parser.add_argument("--output", help="write the results to this JSON file")
+    arg_parser.add_argument("--compare", help="baseline JSON (from --output)")
+    arg_parser.add_argument("--threshold", type=float, default=1.25)
+    args = arg_parser.parse_args()
+    #
+    parameters = {
+        "contents": args.contents,
+        "queries": args.queries,
+        "dimension": args.dimension,
+        "k": args.k,
+        "page_sections": args.page_sections,
+        "repeats": args.repeats,
+    }
+    results = run_suite(
+        num_contents=args.contents,
+        num_queries=args.queries,
+        dimension=args.dimension,
+        k=args.k,
+        page_sections=args.page_sections,
+        repeats=args.repeats,
+    )
+    print(f"{'stage':<38}{'items':>8}{'median ms':>12}{'us/item':>10}")
+    for stage, result in results.items():
+        print(
+            f"{stage:<38}{result['items']:>8}{1000 * result['median_s']:>12.2f}"
+            f"{result['median_us_per_item']:>10.2f}"
+        )
+    report = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "parameters": parameters,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as o_file:
+            json.dump(report, o_file, indent=2)
+    if args.compare:
+        with open(args.compare) as b_file:
+            baseline = json.load(b_file)
+        print(f"Compared to {args.compare} ({baseline['meta'].get('git_commit')}):")
+        if baseline["meta"].get("parameters") != parameters:
+            print("    (warning: different parameters)")
+        if compare(results, baseline["results"], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
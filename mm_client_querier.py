@@ -9,6 +9,8 @@ from mm_langchain.mm_huggingface_embeddings import (
     MMHuggingFaceEmbeddings,
     MMImageTextSerializer,
 )
+from mm_langchain.mm_abstract_embeddings import MMEmbeddings
+from mm_langchain.mm_embedding_server import MMEmbeddingClient
 from mm_langchain.mm_types import MMContent
 
 
@@ -20,7 +22,12 @@ cassio.init(
 
 vector_store_name = "mm_test"
 
-mm_embeddings = MMHuggingFaceEmbeddings(model_name="clip-ViT-B-32")
+# a shared embedding server (see README), if any, instead of a local model
+mm_embeddings: MMEmbeddings
+if os.environ.get("MM_EMBEDDING_SERVER"):
+    mm_embeddings = MMEmbeddingClient(os.environ["MM_EMBEDDING_SERVER"])
+else:
+    mm_embeddings = MMHuggingFaceEmbeddings(model_name="clip-ViT-B-32")
 mm_vectorstore = MMCassandra(
     embedding=mm_embeddings,
     content_serializer=MMImageTextSerializer(),
@@ -1,52 +1,159 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Set
-import json
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
 
 from .mm_types import MMContent
+from .mm_metrics import NULL_METRICS, MetricsCollector
+from .mm_blob_codecs import BlobCodec, JsonBlobCodec, decode_blob, get_blob_codec
+from .mm_vectors import VectorType, as_vector_matrix
 
 
 class MMEmbeddings(ABC):
     """Abstract multimodal embeddings."""
 
     modality_type_map: Dict[str, type]
+    # reports an "embed.<modality>" stage per model call (see mm_metrics)
+    metrics: MetricsCollector = NULL_METRICS
 
     @property
     def modalities(self) -> Set[str]:
         return set(self.modality_type_map.keys())
 
     @abstractmethod
-    def embed_by_modality(self, modality: str, value: Any) -> List[float]:
+    def embed_by_modality(self, modality: str, value: Any) -> VectorType:
         """
         Single-modality embedding computation.
             Note: perhaps not used by all embeddings (e.g. 'holistic' models)
             or maybe not worth having it here at all ...
         """
 
-    def embed_one(self, content: MMContent) -> List[float]:
+    def embed_batch_by_modality(
+        self, modality: str, values: List[Any], batch_size: Optional[int] = None
+    ) -> np.ndarray:
         """
-        Embed a single piece of multimodal content.
-        For now, the merging policy is hardcoded here.
+        Single-modality embedding of several values at once, as a 2-D array.
+        Default: loop over embed_by_modality. Models that can process
+        batches in a single call should override this.
         """
+        return as_vector_matrix(
+            [self.embed_by_modality(modality, value) for value in values]
+        )
+
+    def _validate_content(self, content: MMContent) -> None:
         assert content != {}
         assert len(content.keys() - self.modality_type_map.keys()) == 0
         for modality, value in content.items():
             assert isinstance(value, self.modality_type_map[modality])
-        #
-        vectors_map = {
-            modality: self.embed_by_modality(modality, value)
-            for modality, value in content.items()
-        }
-        # average:
-        num_modalities = len(vectors_map)
-        return [sum(xs) / num_modalities for xs in zip(*vectors_map.values())]
 
-    def embed_many(self, contents: List[MMContent]) -> List[List[float]]:
+    def embed_one(self, content: MMContent) -> List[float]:
+        """
+        Embed a single piece of multimodal content.
+        For now, the merging policy is hardcoded here (see embed_many_array).
+        """
+        return self.embed_one_array(content).tolist()
+
+    def embed_many(
+        self, contents: List[MMContent], batch_size: Optional[int] = None
+    ) -> List[List[float]]:
         """Embed a list of contents."""
-        return [self.embed_one(content) for content in contents]
+        return self.embed_many_array(contents, batch_size=batch_size).tolist()
+
+    def embed_one_array(self, content: MMContent) -> np.ndarray:
+        """Embed a single piece of multimodal content to a 1-D float32 array."""
+        return self.embed_many_array([content])[0]
+
+    def embed_many_by_modality(
+        self, contents: List[MMContent], batch_size: Optional[int] = None
+    ) -> Dict[str, Tuple[List[int], np.ndarray]]:
+        """
+        The per-modality vectors of a list of contents, not merged:
+        modality => (indices of the contents having it, their vectors).
+        Values are grouped by modality across the whole list, so that
+        the model is invoked once per modality (in batches of `batch_size`
+        if given).
+        """
+        for content in contents:
+            self._validate_content(content)
+        # modality -> indices (in `contents`) of the contents having it
+        grouped: Dict[str, List[int]] = {}
+        for content_i, content in enumerate(contents):
+            for modality in content.keys():
+                grouped.setdefault(modality, []).append(content_i)
+        #
+        by_modality: Dict[str, Tuple[List[int], np.ndarray]] = {}
+        for modality, indices in grouped.items():
+            with self.metrics.timer(f"embed.{modality}", items=len(indices)):
+                by_modality[modality] = (
+                    indices,
+                    as_vector_matrix(
+                        self.embed_batch_by_modality(
+                            modality,
+                            [contents[content_i][modality] for content_i in indices],
+                            batch_size=batch_size,
+                        )
+                    ),
+                )
+        return by_modality
+
+    def embed_many_array(
+        self, contents: List[MMContent], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Embed a list of contents to a (len(contents), dimension) float32 array
+        (see embed_many_by_modality). The per-content merging policy
+        is the average of its per-modality vectors (MMMultiVectorStore
+        stores the per-modality vectors instead and fuses at query time).
+        """
+        if not contents:
+            return as_vector_matrix([])
+        sums: Optional[np.ndarray] = None
+        counts = np.zeros(len(contents), dtype=np.float32)
+        for indices, vectors in self.embed_many_by_modality(
+            contents, batch_size=batch_size
+        ).values():
+            if sums is None:
+                sums = np.zeros((len(contents), vectors.shape[1]), dtype=np.float32)
+            # each content has at most one value per modality: no repeated indices
+            index_array = np.asarray(indices, dtype=np.intp)
+            sums[index_array] += vectors
+            counts[index_array] += 1
+        # average (in place, the result stays contiguous float32):
+        assert sums is not None
+        sums /= counts[:, np.newaxis]
+        return sums
+
+    async def aembed_one_array(self, content: MMContent) -> np.ndarray:
+        """Asynchronous embed_one_array (model inference runs in an executor)."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.embed_one_array, content
+        )
+
+    async def aembed_many_array(
+        self, contents: List[MMContent], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """Asynchronous embed_many_array (model inference runs in an executor)."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.embed_many_array, batch_size=batch_size), contents
+        )
 
 
 # this concerns the layer between the mm vector store and the reader-writer
 class MMContentSerializer(ABC):
+    """
+    The stored string is written with `blob_codec` (default: "json",
+    see mm_blob_codecs for the others) and read back whatever the
+    codec that wrote it.
+    """
+
+    # (also for subclasses not calling this __init__)
+    blob_codec: BlobCodec = JsonBlobCodec()
+
+    def __init__(self, blob_codec: Union[str, BlobCodec] = "json") -> None:
+        self.blob_codec = get_blob_codec(blob_codec)
+
     @property
     def modalities(self) -> Set[str]:
         raise NotImplementedError
@@ -98,11 +205,9 @@ class MMContentSerializer(ABC):
         }
 
     def serialize_content_to_stored_str(self, content: MMContent) -> str:
-        return json.dumps(
-            self.serialize_content(content), separators=(",", ":"), sort_keys=True
-        )
+        return self.blob_codec.encode(self.serialize_content(content))
 
     def deserialize_stored_str_to_content(
         self, stored_str: str, metadata: Optional[dict] = None
     ) -> MMContent:
-        return self.deserialize_stored(json.loads(stored_str), metadata=metadata)
+        return self.deserialize_stored(decode_blob(stored_str), metadata=metadata)
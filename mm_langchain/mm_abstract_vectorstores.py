@@ -1,12 +1,33 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, Generic, Iterable, List, Optional, TypeVar
-
-## Components from langchain
-from langchain.schema.document import Document
-from langchain.schema.embeddings import Embeddings
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 from .mm_abstract_embeddings import MMEmbeddings, MMContentSerializer
-from .mm_types import MMContent, MMDocument, MMStoredDocument
+from .mm_types import DefaultVSearchResult, MMContent, MMDocument, MMStoredDocument
+from .mm_vectors import VectorBatchType, VectorType
+from .mm_streaming import batched, prefetch
+from .mm_incremental import BloomFilter, content_hash_id
+from .mm_metrics import NULL_METRICS, MetricsCollector
+
+if TYPE_CHECKING:
+    # components from langchain: langchain.schema is slow to import,
+    # and only the (text) VectorStore uses them
+    from langchain.schema.document import Document
+    from langchain.schema.embeddings import Embeddings
 
 # i.e. either str or MMContent in the two cases at hand
 # C = TypeVar('C')
@@ -16,36 +37,188 @@ from .mm_types import MMContent, MMDocument, MMStoredDocument
 S = TypeVar("S")
 
 
+class MMBulkWriteError(Exception):
+    """
+    Raised by a bulk store_contents once all rows have been attempted,
+    if some of them failed: the others are written regardless.
+    """
+
+    def __init__(self, inserted_ids: List[str], failures: Dict[str, Exception]):
+        self.inserted_ids = inserted_ids
+        self.failures = failures
+        super().__init__(
+            f"{len(failures)} row(s) failed to write "
+            f"({len(inserted_ids)} written successfully)"
+        )
+
+
+def per_query(
+    values: Optional[Sequence[Any]], num_queries: int, name: str = "filters"
+) -> List[Any]:
+    """
+    One (possibly None) value per query: `values` if given,
+    which must then be aligned with the queries.
+    """
+    if not values:
+        return [None] * num_queries
+    if len(values) != num_queries:
+        raise ValueError(f"Got {len(values)} {name} for {num_queries} queries")
+    return list(values)
+
+
+# marks MMSearchHit content not deserialized yet
+_NOT_LOADED = object()
+
+
+class MMSearchHit:
+    """
+    A lightweight search result: id, score and metadata as they come
+    from the reader-writer. The content is deserialized on first access
+    of `content`; an MMStoredDocument is built only by `to_stored_document`.
+    """
+
+    __slots__ = ("id", "score", "metadata", "stored_str", "_serializer", "_content")
+
+    def __init__(
+        self,
+        id: str,
+        stored_str: str,
+        metadata: dict,
+        score: float,
+        serializer: MMContentSerializer,
+    ) -> None:
+        self.id = id
+        self.stored_str = stored_str
+        self.metadata = metadata
+        self.score = score
+        self._serializer = serializer
+        self._content: Any = _NOT_LOADED
+
+    @property
+    def content(self) -> MMContent:
+        if self._content is _NOT_LOADED:
+            self._content = self._serializer.deserialize_stored_str_to_content(
+                self.stored_str, metadata=self.metadata
+            )
+        return self._content
+
+    def to_stored_document(self) -> MMStoredDocument:
+        return MMStoredDocument(content=self.content, metadata=self.metadata)
+
+    def __repr__(self) -> str:
+        return f"MMSearchHit(id={self.id!r}, score={self.score!r})"
+
+
 class VectorReaderWriter(ABC, Generic[S]):
+    # reader-writers with stages of their own report them here
+    metrics: MetricsCollector = NULL_METRICS
+
     @abstractmethod
     def store_contents(
         self,
         contents_str: Iterable[str],
-        vectors: Iterable[List[float]],
+        vectors: VectorBatchType,
         metadatas: Optional[Iterable[dict]] = None,
         **kwargs: Any,
     ) -> List[str]:
-        """Actual storing to backend. the "contents" are stringy blobs, no questions asked."""
+        """
+        Actual storing to backend. the "contents" are stringy blobs, no questions asked.
+        vectors can be a 2-D float32 array or an iterable of single vectors.
+        """
 
     @abstractmethod
     def search_by_vector(
-        self, vector: List[float], k: int = 4, **kwargs: Any
+        self, vector: VectorType, k: int = 4, **kwargs: Any
     ) -> List[S]:
-        """run an ANN search and return an S for each returned entry"""
+        """
+        run an ANN search and return an S for each returned entry.
+        vector can be a 1-D float32 array or a list of floats.
+        """
+
+    def search_by_vectors(
+        self,
+        vectors: VectorBatchType,
+        k: int = 4,
+        metadatas: Optional[List[Optional[dict]]] = None,
+        max_workers: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[List[S]]:
+        """
+        run several ANN searches, returning the results in input order.
+        metadatas, if given, has one (possibly None) search filter per vector.
+
+        Default: concurrent search_by_vector calls on a thread pool.
+        """
+        vectors0 = list(vectors)
+        metadatas0 = per_query(metadatas, len(vectors0), "metadatas")
+        if not vectors0:
+            return []
+
+        def _search(vector: VectorType, metadata: Optional[dict]) -> List[S]:
+            if metadata:
+                return self.search_by_vector(vector, k=k, metadata=metadata, **kwargs)
+            else:
+                return self.search_by_vector(vector, k=k, **kwargs)
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers or min(32, len(vectors0))
+        ) as executor:
+            return list(executor.map(_search, vectors0, metadatas0))
+
+    def existing_ids(
+        self, ids: List[str], metadatas: Optional[List[dict]] = None
+    ) -> Set[str]:
+        """
+        Which of these row ids are stored (for incremental ingestion).
+        metadatas, aligned with ids, are for the reader-writers needing
+        more than the id to locate a row (e.g. partitioned tables).
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """remove all stored entries."""
+        raise NotImplementedError
+
+    async def astore_contents(
+        self,
+        contents_str: Iterable[str],
+        vectors: VectorBatchType,
+        metadatas: Optional[Iterable[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Asynchronous store_contents. Default: run it in an executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            partial(
+                self.store_contents,
+                contents_str=contents_str,
+                vectors=vectors,
+                metadatas=metadatas,
+                **kwargs,
+            ),
+        )
+
+    async def asearch_by_vector(
+        self, vector: VectorType, k: int = 4, **kwargs: Any
+    ) -> List[S]:
+        """Asynchronous search_by_vector. Default: run it in an executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.search_by_vector, vector=vector, k=k, **kwargs)
+        )
 
 
 class VectorStore(Generic[S]):
     vector_reader_writer: VectorReaderWriter[S]
-    embedding: Embeddings
+    embedding: "Embeddings"
 
     @property
-    def embeddings(self) -> Optional[Embeddings]:
+    def embeddings(self) -> Optional["Embeddings"]:
         raise NotImplementedError
 
     @abstractmethod
     def similarity_search(
         self, query: str, k: int = 4, **kwargs: Any
-    ) -> List[Document]:
+    ) -> List["Document"]:
         """
         Return docs most similar to query.
         The implementation depends at least on what `S` is)
@@ -70,16 +243,59 @@ class VectorStore(Generic[S]):
             **kwargs,
         )
 
-    def add_documents(self, documents: List[Document], **kwargs: Any) -> List[str]:
+    def add_documents(self, documents: List["Document"], **kwargs: Any) -> List[str]:
         texts = [doc.page_content for doc in documents]
         metadatas = [doc.metadata or {} for doc in documents]
         return self.add_texts(texts, metadatas, **kwargs)
 
+    async def asimilarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List["Document"]:
+        """Asynchronous similarity_search. Default: run it in an executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.similarity_search, query, k=k, **kwargs)
+        )
+
+    async def aadd_texts(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        embedding_vectors = await self.embedding.aembed_documents(texts)
+        if metadatas:
+            metadatas0 = metadatas
+        else:
+            metadatas0 = [{} for _ in texts]
+        return await self.vector_reader_writer.astore_contents(
+            contents_str=texts,
+            vectors=embedding_vectors,
+            metadatas=metadatas0,
+            **kwargs,
+        )
+
+    async def aadd_documents(
+        self, documents: List["Document"], **kwargs: Any
+    ) -> List[str]:
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata or {} for doc in documents]
+        return await self.aadd_texts(texts, metadatas, **kwargs)
+
 
 class MMVectorStore(ABC, Generic[S]):
     vector_reader_writer: VectorReaderWriter[S]
     embedding: MMEmbeddings
     content_serializer: MMContentSerializer
+    # ids known to be stored, for incremental ingestion (created on first use)
+    known_ids: Optional[BloomFilter] = None
+    # whether known_ids has seen every stored id (i.e. since a clear() all
+    # writes went through this store): only then do its misses prove absence
+    known_ids_exhaustive: bool = False
+    # whether ids in known_ids are taken as stored without a lookup
+    # (a new entry is then skipped with about the filter's error_rate)
+    known_ids_trusted: bool = False
+    # per-stage timings (see mm_metrics), also passed on to the reader-writer
+    metrics: MetricsCollector = NULL_METRICS
 
     def __init__(
         self,
@@ -87,11 +303,15 @@ class MMVectorStore(ABC, Generic[S]):
         vector_reader_writer: VectorReaderWriter[S],
         embedding: MMEmbeddings,
         content_serializer: MMContentSerializer,
+        metrics: Optional[MetricsCollector] = None,
         **kwargs: Any,
     ) -> None:
         self.vector_reader_writer = vector_reader_writer
         self.embedding = embedding
         self.content_serializer = content_serializer
+        if metrics is not None:
+            self.metrics = metrics
+            vector_reader_writer.metrics = metrics
         assert len(self.embedding.modalities - self.content_serializer.modalities) == 0
 
     @property
@@ -107,6 +327,81 @@ class MMVectorStore(ABC, Generic[S]):
         The implementation depends at least on what `S` is)
         """
 
+    def similarity_search_by_vector(
+        self, vector: VectorType, k: int = 4, **kwargs: Any
+    ) -> List[MMStoredDocument]:
+        """
+        Return docs most similar to an already-computed query vector
+        (a 1-D float32 array or a list of floats).
+        """
+        raise NotImplementedError
+
+    def similarity_search_batch(
+        self,
+        queries: List[MMContent],
+        k: int = 4,
+        filters: Optional[List[Optional[Dict[str, str]]]] = None,
+        **kwargs: Any,
+    ) -> List[List[MMStoredDocument]]:
+        """
+        Run several queries (with an optional filter each), results in input order.
+        Default: one similarity_search per query.
+        """
+        filters0 = per_query(filters, len(queries))
+        return [
+            self.similarity_search(query, k=k, filter=filter, **kwargs)
+            if filter
+            else self.similarity_search(query, k=k, **kwargs)
+            for query, filter in zip(queries, filters0)
+        ]
+
+    def _embed_contents(self, contents: List[MMContent]) -> VectorBatchType:
+        with self.metrics.timer("add.embed", items=len(contents)):
+            return self.embedding.embed_many_array(contents)
+
+    async def _aembed_contents(self, contents: List[MMContent]) -> VectorBatchType:
+        with self.metrics.timer("add.embed", items=len(contents)):
+            return await self.embedding.aembed_many_array(contents)
+
+    def _serialize_contents_parts(
+        self, contents: List[MMContent]
+    ) -> Tuple[List[Dict[str, str]], List[str]]:
+        """The per-modality serialized contents and the stored strings."""
+        with self.metrics.timer("add.serialize", items=len(contents)) as timer:
+            stored = [
+                self.content_serializer.serialize_content(content)
+                for content in contents
+            ]
+            blob_codec = self.content_serializer.blob_codec
+            contents_str = [blob_codec.encode(parts) for parts in stored]
+            if self.metrics.enabled:
+                timer.nbytes = sum(len(content_str) for content_str in contents_str)
+        return stored, contents_str
+
+    def _serialize_contents(self, contents: List[MMContent]) -> List[str]:
+        return self._serialize_contents_parts(contents)[1]
+
+    def _store_contents(
+        self,
+        contents_str: List[str],
+        vectors: VectorBatchType,
+        metadatas: List[dict],
+        **kwargs: Any,
+    ) -> List[str]:
+        with self.metrics.timer("add.store", items=len(contents_str)):
+            try:
+                written = self.vector_reader_writer.store_contents(
+                    contents_str=contents_str,
+                    vectors=vectors,
+                    metadatas=metadatas,
+                    **kwargs,
+                )
+            except MMBulkWriteError as exc:
+                self._remember_written(exc.inserted_ids, kwargs)
+                raise
+        self._remember_written(written, kwargs)
+        return written
+
     def add_contents(
         self,
         contents: List[MMContent],
@@ -114,16 +409,13 @@ class MMVectorStore(ABC, Generic[S]):
         **kwargs: Any,
     ) -> List[str]:
         """run contexts through the embedding and store the full resulting entries."""
-        embedding_vectors = self.embedding.embed_many(contents)
-        contents_str = [
-            self.content_serializer.serialize_content_to_stored_str(content)
-            for content in contents
-        ]
+        embedding_vectors = self._embed_contents(contents)
+        contents_str = self._serialize_contents(contents)
         if metadatas:
             metadatas0 = metadatas
         else:
             metadatas0 = [{} for _ in contents]
-        return self.vector_reader_writer.store_contents(
+        return self._store_contents(
             contents_str=contents_str,
             vectors=embedding_vectors,
             metadatas=metadatas0,
@@ -134,3 +426,465 @@ class MMVectorStore(ABC, Generic[S]):
         contents = [doc.content for doc in documents]
         metadatas = [doc.metadata or {} for doc in documents]
         return self.add_contents(contents, metadatas, **kwargs)
+
+    def _get_known_ids(self) -> BloomFilter:
+        if self.known_ids is None:
+            self.known_ids = BloomFilter()
+        return self.known_ids
+
+    def _remember_written(self, written: List[str], kwargs: Dict[str, Any]) -> None:
+        # only explicit (e.g. content-hash) ids can come up again
+        if kwargs.get("ids") is not None:
+            self._get_known_ids().update(written)
+
+    def save_known_ids(self, path: str) -> None:
+        """Write the known_ids Bloom filter to a file, for load_known_ids."""
+        self._get_known_ids().save(path)
+
+    def load_known_ids(self, path: str, trusted: bool = True) -> None:
+        """
+        Resume incremental ingestion with the known_ids saved (by
+        save_known_ids) after an earlier run. With `trusted`, entries
+        found in the filter are skipped without any lookup in the store:
+        unchanged documents then cost just a hash. This assumes their rows
+        have not been deleted since, and accepts that a new entry is skipped
+        with a probability about the filter's error_rate.
+        """
+        self.known_ids = BloomFilter.load(path)
+        self.known_ids_trusted = trusted
+        self.known_ids_exhaustive = False
+
+    def _select_new(
+        self,
+        stored_contents: List[Dict[str, str]],
+        metadatas: List[dict],
+        id_metadata_fields: Sequence[str],
+    ) -> Tuple[List[str], List[int]]:
+        """
+        Content-hash ids for all entries, and the indices of those to write:
+        i.e. not already stored (nor repeated earlier in the batch).
+        The ids are looked up in the store in a single batch, except:
+        the hits of the `known_ids` Bloom filter if it is trusted
+        (see known_ids_trusted), taken as stored, and its misses if it is
+        exhaustive (see known_ids_exhaustive). Otherwise filter hits are
+        looked up too, as the filter has a small false-positive rate.
+        """
+        known_ids = self._get_known_ids()
+        ids = [
+            content_hash_id(parts, metadata, id_metadata_fields)
+            for parts, metadata in zip(stored_contents, metadatas)
+        ]
+        stored: Set[str] = set()
+        # row_id -> metadata, for the ids to look up
+        to_check: Dict[str, dict] = {}
+        for row_id, metadata in zip(ids, metadatas):
+            if row_id in known_ids:
+                if self.known_ids_trusted:
+                    stored.add(row_id)
+                else:
+                    to_check[row_id] = metadata
+            elif not self.known_ids_exhaustive:
+                to_check[row_id] = metadata
+        if to_check:
+            found = self.vector_reader_writer.existing_ids(
+                list(to_check), metadatas=list(to_check.values())
+            )
+            known_ids.update(found)
+            stored |= found
+        new_indices: List[int] = []
+        seen: Set[str] = set()
+        for index, row_id in enumerate(ids):
+            if row_id not in stored and row_id not in seen:
+                seen.add(row_id)
+                new_indices.append(index)
+        return ids, new_indices
+
+    def add_contents_incremental(
+        self,
+        contents: List[MMContent],
+        metadatas: Optional[List[dict]] = None,
+        id_metadata_fields: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> List[str]:
+        """
+        Like add_contents, but with deterministic ids (a hash of the serialized
+        content and of the `id_metadata_fields` metadata, see content_hash_id):
+        entries already in the store are neither embedded nor written again.
+        To skip their lookup in the store too, across runs, see load_known_ids.
+        Return the ids of all entries (in input order), stored before or now.
+        """
+        if "ids" in kwargs:
+            raise ValueError("Explicit ids are not supported in incremental mode")
+        stored_contents, contents_str = self._serialize_contents_parts(contents)
+        metadatas0 = metadatas if metadatas else [{} for _ in contents]
+        ids, new_indices = self._select_new(
+            stored_contents, metadatas0, id_metadata_fields
+        )
+        if new_indices:
+            self._store_contents(
+                contents_str=[contents_str[index] for index in new_indices],
+                vectors=self._embed_contents(
+                    [contents[index] for index in new_indices]
+                ),
+                metadatas=[metadatas0[index] for index in new_indices],
+                ids=[ids[index] for index in new_indices],
+                **kwargs,
+            )
+        return ids
+
+    def add_documents_incremental(
+        self,
+        documents: List[MMDocument],
+        id_metadata_fields: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> List[str]:
+        contents = [doc.content for doc in documents]
+        metadatas = [doc.metadata or {} for doc in documents]
+        return self.add_contents_incremental(
+            contents, metadatas, id_metadata_fields=id_metadata_fields, **kwargs
+        )
+
+    def _prepare_documents(
+        self,
+        documents: List[MMDocument],
+        id_metadata_fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[str], VectorBatchType, List[dict], Optional[List[str]]]:
+        """
+        embed and serialize a batch of documents, ready for store_contents.
+        If id_metadata_fields is given (incremental mode), documents already
+        stored are left out and the content-hash ids are returned too.
+        """
+        contents = [doc.content for doc in documents]
+        stored_contents, contents_str = self._serialize_contents_parts(contents)
+        metadatas = [doc.metadata or {} for doc in documents]
+        if id_metadata_fields is None:
+            return (
+                contents_str,
+                self._embed_contents(contents),
+                metadatas,
+                None,
+            )
+        ids, new_indices = self._select_new(
+            stored_contents, metadatas, id_metadata_fields
+        )
+        return (
+            [contents_str[index] for index in new_indices],
+            self._embed_contents([contents[index] for index in new_indices]),
+            [metadatas[index] for index in new_indices],
+            [ids[index] for index in new_indices],
+        )
+
+    def add_documents_stream(
+        self,
+        documents: Iterable[MMDocument],
+        batch_size: int = 64,
+        max_pending_batches: int = 2,
+        incremental: bool = False,
+        id_metadata_fields: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> List[str]:
+        """
+        Ingest a (possibly lazy) stream of documents in batches, as a pipeline:
+        pulling from `documents` (e.g. a loader's lazy_load_and_split),
+        embedding+serializing and writing each run in their own thread,
+        with at most `max_pending_batches` batches queued between stages.
+        Memory stays bounded regardless of the stream length.
+        kwargs go to every store_contents call (so: no per-document `ids`).
+        With `incremental`, ids are content hashes (as in add_contents_incremental)
+        and documents already stored are skipped before embedding
+        (a document repeated within the stream may still be written twice,
+        over itself, as batches are prepared ahead of the writes).
+        Return the ids of the documents written.
+        """
+        if "ids" in kwargs:
+            raise ValueError("Explicit ids are not supported when streaming")
+        batches = prefetch(batched(documents, batch_size), max_pending_batches)
+        prepared = prefetch(
+            (
+                self._prepare_documents(
+                    batch, id_metadata_fields if incremental else None
+                )
+                for batch in batches
+            ),
+            max_pending_batches,
+        )
+        inserted: List[str] = []
+        for contents_str, vectors, metadatas, ids in prepared:
+            if not contents_str:
+                continue
+            written = self._store_contents(
+                contents_str=contents_str,
+                vectors=vectors,
+                metadatas=metadatas,
+                **({"ids": ids} if ids is not None else {}),
+                **kwargs,
+            )
+            inserted += written
+        return inserted
+
+    async def asimilarity_search(
+        self, query: MMContent, k: int = 4, **kwargs: Any
+    ) -> List[MMStoredDocument]:
+        """Asynchronous similarity_search. Default: run it in an executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(self.similarity_search, query, k=k, **kwargs)
+        )
+
+    async def aadd_contents(
+        self,
+        contents: List[MMContent],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        embedding_vectors = await self._aembed_contents(contents)
+        contents_str = self._serialize_contents(contents)
+        if metadatas:
+            metadatas0 = metadatas
+        else:
+            metadatas0 = [{} for _ in contents]
+        with self.metrics.timer("add.store", items=len(contents_str)):
+            try:
+                written = await self.vector_reader_writer.astore_contents(
+                    contents_str=contents_str,
+                    vectors=embedding_vectors,
+                    metadatas=metadatas0,
+                    **kwargs,
+                )
+            except MMBulkWriteError as exc:
+                self._remember_written(exc.inserted_ids, kwargs)
+                raise
+        self._remember_written(written, kwargs)
+        return written
+
+    async def aadd_documents(
+        self, documents: List[MMDocument], **kwargs: Any
+    ) -> List[str]:
+        contents = [doc.content for doc in documents]
+        metadatas = [doc.metadata or {} for doc in documents]
+        return await self.aadd_contents(contents, metadatas, **kwargs)
+
+
+class MMDefaultVectorStore(MMVectorStore[DefaultVSearchResult]):
+    """
+    Search logic shared by the mm vector stores whose reader-writer
+    returns DefaultVSearchResult tuples and takes a `metadata` filter.
+    """
+
+    @staticmethod
+    def _filter_to_metadata(filter_dict: Optional[Dict[str, str]]) -> Dict[str, Any]:
+        if filter_dict is None:
+            return {}
+        else:
+            return filter_dict
+
+    def similarity_search(
+        self,
+        query: MMContent,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMStoredDocument]:
+        """Return (mm) docs most similar to query."""
+        return self.similarity_search_by_vector(
+            vector=self._embed_query(query),
+            k=k,
+            filter=filter,
+            **kwargs,
+        )
+
+    def _embed_query(self, query: MMContent) -> VectorType:
+        with self.metrics.timer("search.embed", items=1):
+            return self.embedding.embed_one_array(query)
+
+    async def _aembed_query(self, query: MMContent) -> VectorType:
+        with self.metrics.timer("search.embed", items=1):
+            return await self.embedding.aembed_one_array(query)
+
+    def _search(
+        self, vector: VectorType, k: int, metadata: Dict[str, Any], **kwargs: Any
+    ) -> List[DefaultVSearchResult]:
+        with self.metrics.timer("search.query") as timer:
+            results = self.vector_reader_writer.search_by_vector(
+                vector=vector,
+                k=k,
+                metadata=metadata,
+                **kwargs,
+            )
+            timer.items = len(results)
+        return results
+
+    async def _asearch(
+        self, vector: VectorType, k: int, metadata: Dict[str, Any], **kwargs: Any
+    ) -> List[DefaultVSearchResult]:
+        with self.metrics.timer("search.query") as timer:
+            results = await self.vector_reader_writer.asearch_by_vector(
+                vector=vector,
+                k=k,
+                metadata=metadata,
+                **kwargs,
+            )
+            timer.items = len(results)
+        return results
+
+    def _to_stored_documents(
+        self, results: List[DefaultVSearchResult]
+    ) -> List[MMStoredDocument]:
+        with self.metrics.timer("search.deserialize", items=len(results)) as timer:
+            if self.metrics.enabled:
+                timer.nbytes = sum(len(result[1]) for result in results)
+            return [
+                MMStoredDocument(
+                    content=self.content_serializer.deserialize_stored_str_to_content(
+                        rbl, metadata=rme
+                    ),
+                    metadata=rme,
+                )
+                for (rid, rbl, rme, rsi) in results
+            ]
+
+    def _to_search_hits(self, results: List[DefaultVSearchResult]) -> List[MMSearchHit]:
+        return [
+            MMSearchHit(rid, rbl, rme, rsi, self.content_serializer)
+            for (rid, rbl, rme, rsi) in results
+        ]
+
+    def similarity_search_with_score_and_id(
+        self,
+        query: MMContent,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMSearchHit]:
+        """
+        Same search as similarity_search, returning MMSearchHit objects
+        (id and score included, content deserialized only if accessed).
+        """
+        return self.similarity_search_with_score_and_id_by_vector(
+            vector=self._embed_query(query),
+            k=k,
+            filter=filter,
+            **kwargs,
+        )
+
+    def similarity_search_with_score_and_id_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMSearchHit]:
+        search_metadata = self._filter_to_metadata(filter)
+        return self._to_search_hits(self._search(vector, k, search_metadata, **kwargs))
+
+    async def asimilarity_search_with_score_and_id(
+        self,
+        query: MMContent,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMSearchHit]:
+        return await self.asimilarity_search_with_score_and_id_by_vector(
+            vector=await self._aembed_query(query),
+            k=k,
+            filter=filter,
+            **kwargs,
+        )
+
+    async def asimilarity_search_with_score_and_id_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMSearchHit]:
+        search_metadata = self._filter_to_metadata(filter)
+        return self._to_search_hits(
+            await self._asearch(vector, k, search_metadata, **kwargs)
+        )
+
+    def similarity_search_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMStoredDocument]:
+        """Return (mm) docs most similar to a query vector."""
+        search_metadata = self._filter_to_metadata(filter)
+        return self._to_stored_documents(
+            self._search(vector, k, search_metadata, **kwargs)
+        )
+
+    async def asimilarity_search(
+        self,
+        query: MMContent,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMStoredDocument]:
+        return await self.asimilarity_search_by_vector(
+            vector=await self._aembed_query(query),
+            k=k,
+            filter=filter,
+            **kwargs,
+        )
+
+    async def asimilarity_search_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMStoredDocument]:
+        search_metadata = self._filter_to_metadata(filter)
+        return self._to_stored_documents(
+            await self._asearch(vector, k, search_metadata, **kwargs)
+        )
+
+    def similarity_search_batch(
+        self,
+        queries: List[MMContent],
+        k: int = 4,
+        filters: Optional[List[Optional[Dict[str, str]]]] = None,
+        **kwargs: Any,
+    ) -> List[List[MMStoredDocument]]:
+        """
+        Return (mm) docs most similar to each query, in input order.
+        All queries are embedded in one go, then searched concurrently.
+        """
+        per_query(filters, len(queries))
+        with self.metrics.timer("search.embed", items=len(queries)):
+            vectors = self.embedding.embed_many_array(queries)
+        return self.similarity_search_by_vectors(
+            vectors=vectors,
+            k=k,
+            filters=filters,
+            **kwargs,
+        )
+
+    def similarity_search_by_vectors(
+        self,
+        vectors: VectorBatchType,
+        k: int = 4,
+        filters: Optional[List[Optional[Dict[str, str]]]] = None,
+        **kwargs: Any,
+    ) -> List[List[MMStoredDocument]]:
+        search_metadatas = [
+            self._filter_to_metadata(filter)
+            for filter in per_query(filters, len(vectors))
+        ]
+        with self.metrics.timer("search.query") as timer:
+            results_list = self.vector_reader_writer.search_by_vectors(
+                vectors=vectors,
+                k=k,
+                metadatas=search_metadatas,
+                **kwargs,
+            )
+            timer.items = len(results_list)
+        return [self._to_stored_documents(results) for results in results_list]
+
+    def clear(self) -> None:
+        self.vector_reader_writer.clear()
+        # from now on, known_ids sees all the writes
+        self.known_ids = None
+        self.known_ids_exhaustive = True
@@ -0,0 +1,140 @@
+# Codecs for the stored blob of a MMContentSerializer, i.e. the string
+# holding the per-modality serialized content of a row.
+#
+# JSON blobs (the original format) are untagged and start with "{".
+# Any other format starts with "~<tag>:", so that the format of a blob
+# is known when reading it back, whatever codec the serializer now writes.
+import json
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Union
+
+try:
+    import orjson  # type: ignore
+
+    _json_loads: Callable[[str], Dict[str, str]] = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# opens the tag of a non-JSON blob
+TAG_MARKER = "~"
+
+
+class BlobCodec(ABC):
+    # None for untagged (JSON) formats
+    tag: Optional[str] = None
+
+    @abstractmethod
+    def encode(self, stored: Dict[str, str]) -> str:
+        """the full blob (including the format tag, if any)."""
+
+    @abstractmethod
+    def decode_payload(self, payload: str) -> Dict[str, str]:
+        """decode the blob after its format tag (if any)."""
+
+
+class JsonBlobCodec(BlobCodec):
+    """The original format: compact JSON with sorted keys."""
+
+    def encode(self, stored: Dict[str, str]) -> str:
+        return json.dumps(stored, separators=(",", ":"), sort_keys=True)
+
+    def decode_payload(self, payload: str) -> Dict[str, str]:
+        return _json_loads(payload)
+
+
+class OrjsonBlobCodec(BlobCodec):
+    """
+    Compact JSON with sorted keys too (hence untagged, readable by older
+    code), faster to produce. Not byte-identical to JsonBlobCodec's blobs:
+    non-ASCII characters are written as UTF-8, not as \\u escapes.
+    """
+
+    def __init__(self) -> None:
+        try:
+            import orjson  # type: ignore # noqa: F401
+        except ImportError as exc:
+            raise ImportError(
+                "Could not import orjson python package. "
+                "Please install it with `pip install orjson`."
+            ) from exc
+
+    def encode(self, stored: Dict[str, str]) -> str:
+        return orjson.dumps(stored, option=orjson.OPT_SORT_KEYS).decode()
+
+    def decode_payload(self, payload: str) -> Dict[str, str]:
+        return orjson.loads(payload)
+
+
+class LengthPrefixedBlobCodec(BlobCodec):
+    """
+    Dependency-free and escaping-free: "<len>:<modality><len>:<value>..."
+    (lengths in characters, modalities sorted).
+    """
+
+    tag = "lp"
+
+    def encode(self, stored: Dict[str, str]) -> str:
+        parts = [f"{TAG_MARKER}{self.tag}:"]
+        for modality, value in sorted(stored.items()):
+            parts.append(f"{len(modality)}:{modality}{len(value)}:{value}")
+        return "".join(parts)
+
+    def decode_payload(self, payload: str) -> Dict[str, str]:
+        stored: Dict[str, str] = {}
+        position = 0
+        key: Optional[str] = None
+        while position < len(payload):
+            colon = payload.index(":", position)
+            end = colon + 1 + int(payload[position:colon])
+            if end > len(payload):
+                raise ValueError("Truncated length-prefixed blob")
+            field = payload[colon + 1 : end]
+            if key is None:
+                key = field
+            else:
+                stored[key] = field
+                key = None
+            position = end
+        if key is not None:
+            raise ValueError("Truncated length-prefixed blob")
+        return stored
+
+
+_BLOB_CODEC_FACTORIES: Dict[str, Callable[[], BlobCodec]] = {
+    "json": JsonBlobCodec,
+    "orjson": OrjsonBlobCodec,
+    "length_prefixed": LengthPrefixedBlobCodec,
+}
+
+# tag => codec able to read it (instantiated when first needed)
+_TAGGED_CODEC_FACTORIES: Dict[str, Callable[[], BlobCodec]] = {
+    "lp": LengthPrefixedBlobCodec,
+}
+_tagged_codecs: Dict[str, BlobCodec] = {}
+
+
+def get_blob_codec(codec: Union[str, BlobCodec]) -> BlobCodec:
+    if isinstance(codec, BlobCodec):
+        return codec
+    if codec not in _BLOB_CODEC_FACTORIES:
+        raise ValueError(
+            f"Unknown blob codec '{codec}' "
+            f"(known: {', '.join(_BLOB_CODEC_FACTORIES)})"
+        )
+    return _BLOB_CODEC_FACTORIES[codec]()
+
+
+def decode_blob(blob: str) -> Dict[str, str]:
+    """Decode a blob written by any of the codecs (or untagged JSON)."""
+    if blob.startswith(TAG_MARKER):
+        colon = blob.find(":")
+        tag = blob[len(TAG_MARKER) : colon]
+        if colon < 0 or tag not in _TAGGED_CODEC_FACTORIES:
+            raise ValueError(f"Unknown blob format tag '{tag}'")
+        codec = _tagged_codecs.get(tag)
+        if codec is None:
+            codec = _TAGGED_CODEC_FACTORIES[tag]()
+            _tagged_codecs[tag] = codec
+        return codec.decode_payload(blob[colon + 1 :])
+    else:
+        return _json_loads(blob)
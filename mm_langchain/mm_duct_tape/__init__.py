@@ -1,13 +1,38 @@
+import asyncio
 import json
-from typing import Any, Iterable, List, Optional, Type, TypeVar
+import threading
+from contextlib import contextmanager
+from functools import partial
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
+from langchain.schema.document import Document
 from langchain.schema.embeddings import Embeddings as BaseEmbeddings
 from langchain.schema.vectorstore import VectorStore as BaseVectorStore
 
-from ..mm_types import MMContent, MMStoredDocument
+from ..mm_types import MMContent, MMDocument, MMStoredDocument
 from ..mm_abstract_embeddings import MMEmbeddings, MMContentSerializer
 from ..mm_abstract_vectorstores import MMVectorStore, VectorReaderWriter
-from .utils import compress_vector, deflate_vector
+from ..mm_vectors import VectorBatchType, VectorType, to_vector_list
+from ..mm_streaming import batched, prefetch
+from ..mm_model_registry import resolve_vector_dimension
+from ..mm_metrics import MetricsCollector
+from .utils import (
+    compress_vector,
+    compress_vector_blob,
+    deflate_vector,
+    deflate_vector_blob,
+)
 
 
 VST = TypeVar("VST", bound="BaseVectorStore")
@@ -17,26 +42,39 @@ class DummyVectorReaderWriter(VectorReaderWriter):
     def store_contents(
         self,
         contents_str: Iterable[str],
-        vectors: Iterable[List[float]],
+        vectors: VectorBatchType,
         metadatas: Optional[Iterable[dict]] = None,
         **kwargs: Any,
     ) -> List[str]:
         raise NotImplementedError("Placeholder")
 
-    def search_by_vector(self, vector: List[float], k: int = 4, **kwargs: Any) -> List:
+    def search_by_vector(self, vector: VectorType, k: int = 4, **kwargs: Any) -> List:
         raise NotImplementedError("Placeholder")
 
 
 def _wrap_for_base_vectorstore(
-    content: MMContent, emb_vector: List[float], content_serializer: MMContentSerializer
+    content: MMContent,
+    emb_vector: Optional[VectorType],
+    content_serializer: MMContentSerializer,
+    vector_codec: Optional[str] = None,
 ) -> str:
-    vector_dimension = len(emb_vector)
+    """
+    If emb_vector is None, the vector is not written in the text
+    and must reach DTPassthroughEmbeddings out-of-band (see `handoff`).
+    With a vector_codec (see mm_vector_codecs), the vector is written
+    as "embedding_blob" instead of the plain float32 "embedding_vector".
+    """
+    wrapped: Dict[str, Any] = {
+        "stored": content_serializer.serialize_content(content),
+    }
+    if emb_vector is not None and vector_codec is not None:
+        wrapped["embedding_blob"] = compress_vector_blob(emb_vector, vector_codec)
+    elif emb_vector is not None:
+        vector_dimension = len(emb_vector)
+        wrapped["embedding_vector"] = compress_vector(emb_vector, vector_dimension)
+        wrapped["vector_dimension"] = vector_dimension
     return json.dumps(
-        {
-            "stored": content_serializer.serialize_content(content),
-            "embedding_vector": compress_vector(emb_vector, vector_dimension),
-            "vector_dimension": vector_dimension,
-        },
+        wrapped,
         separators=(",", ":"),
         sort_keys=True,
     )
@@ -55,6 +93,14 @@ def _unwrap_from_base_vectorstore(
 
 
 class DTMMVectorStore(MMVectorStore):
+    """
+    If the DTPassthroughEmbeddings used by the base store is given,
+    vectors are handed to it out-of-band at ingestion time and
+    the stored texts hold only the serialized content.
+    Otherwise, vectors are written (base64) in the stored texts,
+    encoded with `vector_codec` if one is given (e.g. "float16", "int8").
+    """
+
     base_vector_store: BaseVectorStore
 
     def __init__(
@@ -62,53 +108,86 @@ class DTMMVectorStore(MMVectorStore):
         embedding: MMEmbeddings,
         content_serializer: MMContentSerializer,
         base_vector_store: BaseVectorStore,
+        passthrough_embedding: Optional["DTPassthroughEmbeddings"] = None,
+        vector_codec: Optional[str] = None,
+        metrics: Optional[MetricsCollector] = None,
     ):
         self.base_vector_store = base_vector_store
+        self.passthrough_embedding = passthrough_embedding
+        self.vector_codec = vector_codec
+        self._vector_search_mode = self._detect_vector_search_mode(base_vector_store)
         # this is going to be bypassed throughout:
         vector_rw = DummyVectorReaderWriter()
         super().__init__(
             vector_reader_writer=vector_rw,
             embedding=embedding,
             content_serializer=content_serializer,
+            metrics=metrics,
         )
 
-    def add_contents(
-        self,
-        contents: List[MMContent],
-        metadatas: Optional[List[dict]] = None,
-        **kwargs: Any,
+    @staticmethod
+    def _detect_vector_search_mode(base_vector_store: BaseVectorStore) -> str:
+        """
+        How queries can reach the base store:
+            "with_score_by_vector": similarity_search_with_score_by_vector
+            "by_vector": an overridden similarity_search_by_vector
+            "wrapped": only through a wrapped query (JSON + base64 vector)
+                that DTPassthroughEmbeddings turns back into the vector
+        """
+        store_class = type(base_vector_store)
+        if callable(
+            getattr(store_class, "similarity_search_with_score_by_vector", None)
+        ):
+            return "with_score_by_vector"
+        elif (
+            store_class.similarity_search_by_vector
+            is not BaseVectorStore.similarity_search_by_vector
+        ):
+            return "by_vector"
+        else:
+            return "wrapped"
+
+    def _wrap_contents(
+        self, contents: List[MMContent], embedding_vectors: Iterable[Any]
     ) -> List[str]:
-        embedding_vectors = self.embedding.embed_many(contents)
-        wrapped_contents_str = [
-            _wrap_for_base_vectorstore(
-                content=content,
-                emb_vector=emb_vector,
-                content_serializer=self.content_serializer,
-            )
-            for content, emb_vector in zip(contents, embedding_vectors)
-        ]
-        return self.base_vector_store.add_texts(
-            texts=wrapped_contents_str,
-            metadatas=metadatas,
-            **kwargs,
-        )
+        inline = self.passthrough_embedding is None
+        with self.metrics.timer("add.serialize", items=len(contents)) as timer:
+            texts = [
+                _wrap_for_base_vectorstore(
+                    content=content,
+                    emb_vector=emb_vector if inline else None,
+                    content_serializer=self.content_serializer,
+                    vector_codec=self.vector_codec,
+                )
+                for content, emb_vector in zip(contents, embedding_vectors)
+            ]
+            if self.metrics.enabled:
+                timer.nbytes = sum(len(text) for text in texts)
+        return texts
 
-    def similarity_search(
-        self, query: MMContent, k: int = 4, **kwargs: Any
+    @contextmanager
+    def _handoff(
+        self, texts: List[str], embedding_vectors: VectorBatchType
+    ) -> Iterator[None]:
+        if self.passthrough_embedding is None:
+            yield
+        else:
+            with self.passthrough_embedding.handoff(texts, embedding_vectors):
+                yield
+
+    def _unwrap_results(
+        self, base_documents: Iterable[Document]
+    ) -> List[MMStoredDocument]:
+        with self.metrics.timer("search.deserialize") as timer:
+            results = self._unwrap_documents(base_documents)
+            timer.items = len(results)
+        return results
+
+    def _unwrap_documents(
+        self, base_documents: Iterable[Document]
     ) -> List[MMStoredDocument]:
-        search_vector = self.embedding.embed_one(query)
-        wrapped_search_content_str = _wrap_for_base_vectorstore(
-            content=query,
-            emb_vector=search_vector,
-            content_serializer=self.content_serializer,
-        )
-        base_store_results = self.base_vector_store.similarity_search_with_score(
-            query=wrapped_search_content_str,
-            k=k,
-            **kwargs,
-        )
         results: List[MMStoredDocument] = []
-        for base_document, score in base_store_results:
+        for base_document in base_documents:
             wrapped_content_str = base_document.page_content
             metadata = base_document.metadata
             #
@@ -124,14 +203,164 @@ class DTMMVectorStore(MMVectorStore):
             #
         return results
 
+    def add_contents(
+        self,
+        contents: List[MMContent],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        embedding_vectors = self._embed_contents(contents)
+        texts = self._wrap_contents(contents, embedding_vectors)
+        with self._handoff(texts, embedding_vectors), self.metrics.timer(
+            "add.store", items=len(texts)
+        ):
+            return self.base_vector_store.add_texts(
+                texts=texts,
+                metadatas=metadatas,
+                **kwargs,
+            )
+
+    def add_documents_stream(
+        self,
+        documents: Iterable[MMDocument],
+        batch_size: int = 64,
+        max_pending_batches: int = 2,
+        incremental: bool = False,
+        id_metadata_fields: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> List[str]:
+        """
+        Only the pulling from `documents` is overlapped here: embedding
+        and writing both happen in the base store's add_texts.
+        (No incremental mode: base stores offer no lookup by id.)
+        """
+        if incremental:
+            raise NotImplementedError("Incremental ingestion needs id lookups")
+        if "ids" in kwargs:
+            raise ValueError("Explicit ids are not supported when streaming")
+        inserted: List[str] = []
+        for batch in prefetch(batched(documents, batch_size), max_pending_batches):
+            inserted += self.add_documents(batch, **kwargs)
+        return inserted
+
+    async def aadd_contents(
+        self,
+        contents: List[MMContent],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        with self.metrics.timer("add.embed", items=len(contents)):
+            embedding_vectors = await self.embedding.aembed_many_array(contents)
+        texts = self._wrap_contents(contents, embedding_vectors)
+        with self._handoff(texts, embedding_vectors), self.metrics.timer(
+            "add.store", items=len(texts)
+        ):
+            return await self.base_vector_store.aadd_texts(
+                texts=texts,
+                metadatas=metadatas,
+                **kwargs,
+            )
+
+    def _wrap_query(self, query: MMContent, search_vector: VectorType) -> str:
+        return _wrap_for_base_vectorstore(
+            content=query,
+            emb_vector=search_vector,
+            content_serializer=self.content_serializer,
+        )
+
+    def similarity_search(
+        self, query: MMContent, k: int = 4, **kwargs: Any
+    ) -> List[MMStoredDocument]:
+        with self.metrics.timer("search.embed", items=1):
+            search_vector = self.embedding.embed_one_array(query)
+        base_store = self.base_vector_store
+        with self.metrics.timer("search.query") as timer:
+            if self._vector_search_mode == "with_score_by_vector":
+                base_results = base_store.similarity_search_with_score_by_vector(
+                    embedding=to_vector_list(search_vector), k=k, **kwargs
+                )  # type: ignore
+                base_documents = [base_document for base_document, _ in base_results]
+            elif self._vector_search_mode == "by_vector":
+                base_documents = base_store.similarity_search_by_vector(
+                    embedding=to_vector_list(search_vector), k=k, **kwargs
+                )
+            else:
+                base_documents = [
+                    base_document
+                    for base_document, _ in base_store.similarity_search_with_score(
+                        query=self._wrap_query(query, search_vector), k=k, **kwargs
+                    )
+                ]
+            timer.items = len(base_documents)
+        return self._unwrap_results(base_documents)
+
+    async def asimilarity_search(
+        self, query: MMContent, k: int = 4, **kwargs: Any
+    ) -> List[MMStoredDocument]:
+        with self.metrics.timer("search.embed", items=1):
+            search_vector = await self.embedding.aembed_one_array(query)
+        base_store = self.base_vector_store
+        with self.metrics.timer("search.query") as timer:
+            if self._vector_search_mode == "with_score_by_vector":
+                # no async counterpart in the base VectorStore interface
+                base_results = await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    partial(
+                        base_store.similarity_search_with_score_by_vector,
+                        embedding=to_vector_list(search_vector),
+                        k=k,
+                        **kwargs,
+                    ),
+                )
+                base_documents = [base_document for base_document, _ in base_results]
+            elif self._vector_search_mode == "by_vector":
+                base_documents = await base_store.asimilarity_search_by_vector(
+                    embedding=to_vector_list(search_vector), k=k, **kwargs
+                )
+            else:
+                base_results = await base_store.asimilarity_search_with_score(
+                    query=self._wrap_query(query, search_vector), k=k, **kwargs
+                )
+                base_documents = [base_document for base_document, _ in base_results]
+            timer.items = len(base_documents)
+        return self._unwrap_results(base_documents)
+
 
 class DTPassthroughEmbeddings(BaseEmbeddings):
     def __init__(self, embedding_dimension: int) -> None:
         self.embedding_dimension = embedding_dimension
+        # id(text) => (text, vector) for the texts being ingested
+        self._handed_off: Dict[int, Tuple[str, VectorType]] = {}
+        self._handoff_lock = threading.Lock()
+
+    @contextmanager
+    def handoff(self, texts: List[str], vectors: VectorBatchType) -> Iterator[None]:
+        """
+        Make the vectors for these exact text objects available to
+        embed_documents while in the context (i.e. during add_texts).
+        Keyed on the object identity, so equal texts cannot get mixed up.
+        """
+        entries = {id(text): (text, vector) for text, vector in zip(texts, vectors)}
+        with self._handoff_lock:
+            self._handed_off.update(entries)
+        try:
+            yield
+        finally:
+            with self._handoff_lock:
+                for text_id in entries:
+                    self._handed_off.pop(text_id, None)
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """these texts are `wrapped_contents_str` kind of texts"""
-        return [self.embed_query(text) for text in texts]
+        vectors: List[List[float]] = []
+        for text in texts:
+            with self._handoff_lock:
+                entry = self._handed_off.get(id(text))
+            if entry is not None and entry[0] is text:
+                vectors.append(to_vector_list(entry[1]))
+            else:
+                vectors.append(self.embed_query(text))
+        return vectors
 
     def embed_query(self, text: str) -> List[float]:
         """
@@ -141,9 +370,17 @@ class DTPassthroughEmbeddings(BaseEmbeddings):
         """
         try:
             contents_obj = json.loads(text)
+        except Exception:
+            return [0.0] * self.embedding_dimension
+        if isinstance(contents_obj, dict) and "embedding_blob" in contents_obj:
+            return deflate_vector_blob(contents_obj["embedding_blob"])
+        elif isinstance(contents_obj, dict) and "embedding_vector" in contents_obj:
             vector_dimension = contents_obj["vector_dimension"]
             return deflate_vector(contents_obj["embedding_vector"], vector_dimension)
-        except Exception:
+        elif isinstance(contents_obj, dict) and "stored" in contents_obj:
+            # a wrapped text without vector: the handoff did not reach us
+            raise ValueError("No vector was handed off for this text")
+        else:
             return [0.0] * self.embedding_dimension
 
 
@@ -153,6 +390,9 @@ def duct_tape_make_multimodal(
     embedding: MMEmbeddings,
     content_serializer: MMContentSerializer,
     test_mm_content: MMContent = {"text": "This is a sample sentence."},
+    inline_vectors: bool = False,
+    vector_codec: Optional[str] = None,
+    vector_dimension: Optional[int] = None,
     **kwargs: Any,
 ) -> DTMMVectorStore:
     """
@@ -163,10 +403,20 @@ def duct_tape_make_multimodal(
     Requirements:
         base_vectorstore_class's constructor must have `embedding` param
         its `similarity_search_with_score` must have `query` and `k` params
+    Queries pass the vector directly if the base store supports it
+    (`similarity_search_with_score_by_vector` or `similarity_search_by_vector`).
+    Unless `inline_vectors`, the vectors are not stored in the document texts
+    (older rows with inline vectors are still read fine).
+    With `inline_vectors`, a `vector_codec` (mm_vector_codecs) can shrink them.
     """
 
-    # no way to set the dimension explicitly in the base v.store...
-    embedding_dimension = len(embedding.embed_one(test_mm_content))
+    # no way to set the dimension explicitly in the base v.store:
+    # it's given, or known for the model, or found with test_mm_content
+    embedding_dimension = resolve_vector_dimension(
+        embedding,
+        vector_dimension,
+        lambda: len(embedding.embed_one_array(test_mm_content)),
+    )
     passthrough_embedding = DTPassthroughEmbeddings(
         embedding_dimension=embedding_dimension
     )
@@ -179,4 +429,6 @@ def duct_tape_make_multimodal(
         embedding=embedding,
         content_serializer=content_serializer,
         base_vector_store=base_vector_store,
+        passthrough_embedding=None if inline_vectors else passthrough_embedding,
+        vector_codec=vector_codec,
     )
@@ -1,11 +1,32 @@
 from typing import List
-import struct
 import base64
 
+import numpy as np
 
-def compress_vector(vector: List[float], n: int) -> str:
-    return base64.b64encode(struct.pack("%if" % n, *vector)).decode()
+from ..mm_vectors import VectorType, as_vector_array
+from ..mm_vector_codecs import decode_vector, encode_vector
+
+# native-order float32, as struct.pack("%if") used to write
+_NATIVE_FLOAT32 = np.dtype("=f4")
+
+
+def compress_vector(vector: VectorType, n: int) -> str:
+    array = as_vector_array(vector)
+    if array.shape[0] != n:
+        raise ValueError(f"Expected a vector of dimension {n}, got {array.shape[0]}")
+    return base64.b64encode(array.astype(_NATIVE_FLOAT32, copy=False)).decode()
 
 
 def deflate_vector(compressed: str, n: int) -> List[float]:
-    return list(struct.unpack("%if" % n, base64.b64decode(compressed)))
+    return np.frombuffer(
+        base64.b64decode(compressed), dtype=_NATIVE_FLOAT32, count=n
+    ).tolist()
+
+
+def compress_vector_blob(vector: VectorType, codec: str) -> str:
+    """base64 of a versioned blob from mm_vector_codecs (any codec)."""
+    return base64.b64encode(encode_vector(vector, codec=codec)).decode()
+
+
+def deflate_vector_blob(compressed: str) -> List[float]:
+    return decode_vector(base64.b64decode(compressed)).tolist()
@@ -0,0 +1,236 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from PIL.Image import Image as PILImageType
+
+from .mm_abstract_embeddings import MMEmbeddings
+from .mm_vectors import VECTOR_DTYPE, VectorType, as_vector_array, as_vector_matrix
+
+
+def _is_decoded(image: PILImageType) -> bool:
+    # (the pixel buffer is "_im" in recent Pillow versions, "im" before)
+    attributes = vars(image)
+    return attributes.get("_im", attributes.get("im")) is not None
+
+
+def _image_source_digest(image: PILImageType) -> Optional[bytes]:
+    """
+    A hash of what identifies the encoded source of a not yet decoded
+    image, if known: its bytes (images opened from memory, e.g. downloaded)
+    or its file's path, size and modification time. This costs no decoding.
+    """
+    if _is_decoded(image):
+        # its pixels may have been edited in place since
+        return None
+    file_object = getattr(image, "fp", None)
+    filename = getattr(image, "filename", None)
+    if isinstance(file_object, io.BytesIO):
+        source = b"bytes:" + file_object.getvalue()
+    elif filename:
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        path = os.path.abspath(filename)
+        source = f"file:{path}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+    else:
+        return None
+    return hashlib.sha256(source).digest()
+
+
+def _value_to_bytes(value: Any) -> bytes:
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    elif isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    elif isinstance(value, PILImageType):
+        # an image still encoded is identified by its source; once decoded
+        # (e.g. by a first embedding), by its pixels, which may have changed
+        header = f"{value.mode}:{value.size[0]}x{value.size[1]}:".encode()
+        source_digest = _image_source_digest(value)
+        if source_digest is not None:
+            return header + b"source:" + source_digest
+        return header + b"pixels:" + value.tobytes()
+    else:
+        raise ValueError(f"Cannot make a cache key for a {type(value).__name__}")
+
+
+def embedding_cache_key(namespace: str, modality: str, value: Any) -> str:
+    """Content-addressed key: (model) namespace, modality and a hash of the value."""
+    hasher = hashlib.sha256()
+    hasher.update(namespace.encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(modality.encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(_value_to_bytes(value))
+    return hasher.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier vector cache: a bounded in-memory LRU and, optionally,
+    a persistent SQLite file. Keys are as from `embedding_cache_key`.
+    Safe to share across threads and across wrapped embeddings.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        sqlite_path: Optional[str] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.sqlite_path = sqlite_path
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection]
+        if sqlite_path is not None:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+        else:
+            self._db = None
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        # lock must be held
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vector
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=VECTOR_DTYPE)
+                    self._remember(key, vector)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def put_many(self, items: Dict[str, VectorType]) -> None:
+        vectors = {key: as_vector_array(vector).copy() for key, vector in items.items()}
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in vectors.items()],
+                )
+                self._db.commit()
+
+    def put(self, key: str, vector: VectorType) -> None:
+        self.put_many({key: vector})
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._lru),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def default_namespace(embedding: Any) -> str:
+    """The model name of an embedding, if it has one, else its class name."""
+    model_name = getattr(embedding, "model_name", None) or getattr(
+        embedding, "model", None
+    )
+    if isinstance(model_name, str):
+        return model_name
+    else:
+        return type(embedding).__name__
+
+
+class CachedMMEmbeddings(MMEmbeddings):
+    """
+    Wrap any MMEmbeddings so that per-modality vectors are looked up
+    in an EmbeddingCache first. Only the misses reach the wrapped model
+    (in a single batch per modality).
+    """
+
+    def __init__(
+        self,
+        embedding: MMEmbeddings,
+        cache: Optional[EmbeddingCache] = None,
+        namespace: Optional[str] = None,
+    ) -> None:
+        self.embedding = embedding
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.namespace = namespace or default_namespace(embedding)
+        self.modality_type_map = embedding.modality_type_map
+
+    def embed_by_modality(self, modality: str, value: Any) -> np.ndarray:
+        return self.embed_batch_by_modality(modality, [value])[0]
+
+    def embed_batch_by_modality(
+        self, modality: str, values: List[Any], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        keys = [
+            embedding_cache_key(self.namespace, modality, value) for value in values
+        ]
+        found: Dict[str, np.ndarray] = {}
+        # a key can repeat within a batch: compute it once
+        missing: Dict[str, Any] = {}
+        for key, value in zip(keys, values):
+            if key in found or key in missing:
+                continue
+            vector = self.cache.get(key)
+            if vector is None:
+                missing[key] = value
+            else:
+                found[key] = vector
+        if missing:
+            computed = self.embedding.embed_batch_by_modality(
+                modality, list(missing.values()), batch_size=batch_size
+            )
+            new_items = dict(zip(missing.keys(), as_vector_matrix(computed)))
+            self.cache.put_many(new_items)
+            found.update(new_items)
+        return as_vector_matrix([found[key] for key in keys])
+
+
+def __getattr__(name: str) -> Any:
+    # CachedEmbeddings subclasses LangChain's Embeddings, whose import
+    # (langchain.schema) is slow: it is only made when first needed
+    if name == "CachedEmbeddings":
+        from .mm_text_embedding_cache import CachedEmbeddings
+
+        return CachedEmbeddings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
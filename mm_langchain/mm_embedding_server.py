@@ -0,0 +1,308 @@
+# A shared embedding service: one worker process owns the model and
+# serves any number of querier processes over a local (Unix) socket.
+# Concurrent requests arriving within `max_latency` seconds of each other
+# are coalesced into a single batch per modality.
+# The socket is private to its owner and connections are authenticated
+# (the protocol unpickles what it receives): unless given, the key is
+# generated by the server and written, readable only by its owner, next
+# to the socket, where the clients of the same user find it.
+import argparse
+import multiprocessing
+import os
+import queue
+import secrets
+import stat
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .mm_abstract_embeddings import MMEmbeddings
+from .mm_vectors import as_vector_matrix
+
+# the generated authkey is at (socket address) + this
+AUTHKEY_FILE_SUFFIX = ".key"
+
+
+def read_authkey(address: str) -> bytes:
+    """The authkey generated by the server at `address`."""
+    try:
+        with open(address + AUTHKEY_FILE_SUFFIX, "rb") as k_file:
+            return k_file.read()
+    except FileNotFoundError:
+        raise ValueError(
+            f"No authkey given and no key file for the server at '{address}'"
+        )
+
+
+def _remove_stale(path: str, expect_socket: bool) -> None:
+    """Remove a leftover file, refusing to if it's not what we'd have left."""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if stat.S_ISSOCK(mode) if expect_socket else stat.S_ISREG(mode):
+        os.unlink(path)
+    else:
+        raise ValueError(f"Refusing to replace '{path}': unexpected file type")
+
+
+class _PendingRequest:
+    __slots__ = ("modality", "values", "done", "result", "error")
+
+    def __init__(self, modality: str, values: List[Any]) -> None:
+        self.modality = modality
+        self.values = values
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+
+class MMEmbeddingServer:
+    """
+    Serve `embedding` (any MMEmbeddings) at a Unix socket `address`.
+    Requests are queued and a single batcher thread runs the model:
+    after the first request of a batch it waits at most `max_latency`
+    seconds (or until `max_batch_size` values) for more requests to join.
+    Clients must authenticate with `authkey`: if not given, a random one
+    is generated and written to the key file (see read_authkey).
+    """
+
+    def __init__(
+        self,
+        embedding: MMEmbeddings,
+        address: str,
+        max_latency: float = 0.005,
+        max_batch_size: int = 64,
+        authkey: Optional[bytes] = None,
+    ) -> None:
+        self.embedding = embedding
+        self.address = address
+        self.max_latency = max_latency
+        self.max_batch_size = max_batch_size
+        self._write_authkey = authkey is None
+        self.authkey = authkey if authkey is not None else secrets.token_bytes(32)
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+
+    def _info(self) -> Dict[str, Any]:
+        return {
+            "modality_type_map": self.embedding.modality_type_map,
+            "model_name": getattr(self.embedding, "model_name", None),
+        }
+
+    def _collect_batch(self) -> List[_PendingRequest]:
+        batch = [self._queue.get()]
+        num_values = len(batch[0].values)
+        deadline = time.monotonic() + self.max_latency
+        while num_values < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            num_values += len(request.values)
+        return batch
+
+    def _run_batch(self, batch: List[_PendingRequest]) -> None:
+        by_modality: Dict[str, List[_PendingRequest]] = {}
+        for request in batch:
+            by_modality.setdefault(request.modality, []).append(request)
+        for modality, requests in by_modality.items():
+            try:
+                vectors = as_vector_matrix(
+                    self.embedding.embed_batch_by_modality(
+                        modality,
+                        [value for request in requests for value in request.values],
+                    )
+                )
+                offset = 0
+                for request in requests:
+                    request.result = vectors[offset : offset + len(request.values)]
+                    offset += len(request.values)
+            except Exception as exc:
+                for request in requests:
+                    request.error = exc
+            for request in requests:
+                request.done.set()
+        self.batches += 1
+        self.requests += len(batch)
+
+    def _batcher(self) -> None:
+        while True:
+            self._run_batch(self._collect_batch())
+
+    def _serve_connection(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    return
+                command = message[0]
+                if command == "embed":
+                    request = _PendingRequest(message[1], message[2])
+                    self._queue.put(request)
+                    request.done.wait()
+                    if request.error is not None:
+                        conn.send(("error", request.error))
+                    else:
+                        conn.send(("ok", request.result))
+                elif command == "info":
+                    conn.send(("ok", self._info()))
+                else:
+                    conn.send(("error", ValueError(f"Unknown command '{command}'")))
+
+    def serve_forever(self, ready: Optional[Any] = None) -> None:
+        """
+        Blocking. `ready` (e.g. a multiprocessing.Event) is set
+        once the socket accepts connections.
+        A leftover socket at `address` is removed first
+        (any other kind of file there is an error).
+        """
+        _remove_stale(self.address, expect_socket=True)
+        if self._write_authkey:
+            key_path = self.address + AUTHKEY_FILE_SUFFIX
+            _remove_stale(key_path, expect_socket=False)
+            key_fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(key_fd, "wb") as k_file:
+                k_file.write(self.authkey)
+        threading.Thread(target=self._batcher, daemon=True).start()
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            os.chmod(self.address, 0o600)
+            if ready is not None:
+                ready.set()
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError, OSError):
+                    # failed handshake (wrong key, or the client went away)
+                    continue
+                threading.Thread(
+                    target=self._serve_connection, args=(conn,), daemon=True
+                ).start()
+
+
+def _server_process_main(
+    embedding_factory: Callable[[], MMEmbeddings],
+    address: str,
+    ready: Any,
+    server_kwargs: Dict[str, Any],
+) -> None:
+    MMEmbeddingServer(embedding_factory(), address, **server_kwargs).serve_forever(
+        ready=ready
+    )
+
+
+def start_embedding_server(
+    embedding_factory: Callable[[], MMEmbeddings],
+    address: str,
+    startup_timeout: Optional[float] = 120.0,
+    **server_kwargs: Any,
+) -> multiprocessing.Process:
+    """
+    Run an MMEmbeddingServer in a new (daemon) process and return it
+    once it accepts connections. The model is created in that process
+    by `embedding_factory` (which must be picklable, e.g.
+    `functools.partial(MMHuggingFaceEmbeddings, model_name=...)`).
+    Stop it with `.terminate()`.
+    """
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(
+        target=_server_process_main,
+        args=(embedding_factory, address, ready, server_kwargs),
+        daemon=True,
+    )
+    process.start()
+    if not ready.wait(startup_timeout):
+        process.terminate()
+        raise ValueError(f"Embedding server at '{address}' did not start in time")
+    return process
+
+
+class MMEmbeddingClient(MMEmbeddings):
+    """
+    MMEmbeddings computed by an MMEmbeddingServer at `address`.
+    Each thread gets its own connection, so concurrent calls from
+    several threads (or processes) can be batched together by the server.
+    Without `authkey`, the one generated by the server is read
+    from its key file.
+    """
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None) -> None:
+        self.address = address
+        self.authkey = authkey if authkey is not None else read_authkey(address)
+        self._local = threading.local()
+        info = self._request(("info",))
+        self.modality_type_map = info["modality_type_map"]
+        # for lookups in mm_model_registry (and cache namespaces)
+        self.model_name: Optional[str] = info["model_name"]
+
+    def _connection(self) -> Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, message: Tuple) -> Any:
+        conn = self._connection()
+        try:
+            conn.send(message)
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            # drop the broken connection: the next call will reconnect
+            self._local.conn = None
+            conn.close()
+            raise
+        if status == "error":
+            raise payload
+        return payload
+
+    def embed_by_modality(self, modality: str, value: Any) -> np.ndarray:
+        return self.embed_batch_by_modality(modality, [value])[0]
+
+    def embed_batch_by_modality(
+        self, modality: str, values: List[Any], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        if not values:
+            return as_vector_matrix([])
+        # batch sizes are the server's business
+        return as_vector_matrix(self._request(("embed", modality, values)))
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+
+def main() -> None:
+    """Serve MMHuggingFaceEmbeddings (blocking)."""
+    from .mm_huggingface_embeddings import MMHuggingFaceEmbeddings
+
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("address", help="path of the Unix socket")
+    arg_parser.add_argument("--model", default="clip-ViT-B-32")
+    arg_parser.add_argument("--max-latency-ms", type=float, default=5.0)
+    arg_parser.add_argument("--max-batch-size", type=int, default=64)
+    args = arg_parser.parse_args()
+    #
+    MMEmbeddingServer(
+        MMHuggingFaceEmbeddings(model_name=args.model, lazy_loading=False),
+        args.address,
+        max_latency=args.max_latency_ms / 1000,
+        max_batch_size=args.max_batch_size,
+    ).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
+import importlib.util
+import threading
 from typing import Any, Dict, List, Optional, Set
 
+import numpy as np
 from PIL.Image import Image as PILImageType
 
 from langchain.pydantic_v1 import BaseModel, Field
 
 from .mm_abstract_embeddings import MMEmbeddings, MMContentSerializer
+from .mm_image_preprocessing import MMImagePreprocessor
+from .mm_metrics import MetricsCollector
+from .mm_vectors import as_vector_matrix
+
+
+_MODEL_LOADING_LOCK = threading.Lock()
 
 
 class MMHuggingFaceEmbeddings(BaseModel, MMEmbeddings):
@@ -12,38 +21,77 @@ class MMHuggingFaceEmbeddings(BaseModel, MMEmbeddings):
     Modality type map:
         "text" => str
         "image" => PIL.Image.Image
+
+    If an `image_preprocessor` is given, images are decoded and downscaled
+    to the model input size (see mm_image_preprocessing) before encoding.
+
+    The model is loaded upon the first embedding (or `load_model()`),
+    unless lazy_loading=False.
+
+    A `metrics` collector (see mm_metrics) can be passed at construction.
     """
 
     client: Any  #: :meta private:
     model_name: str
     cache_folder: Optional[str] = None
     model_kwargs: Dict[str, Any] = Field(default_factory=dict)
+    encode_batch_size: int = 32
+    image_preprocessor: Optional[MMImagePreprocessor] = None
+    lazy_loading: bool = True
 
     modality_type_map = {
         "text": str,
         "image": PILImageType,
     }
 
-    def __init__(self, **kwargs: Any):
-        super().__init__(**kwargs)
-        try:
-            import sentence_transformers  # type: ignore
+    class Config:
+        arbitrary_types_allowed = True
 
-        except ImportError as exc:
+    def __init__(self, metrics: Optional[MetricsCollector] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        if metrics is not None:
+            # not a pydantic field (it's a plain MMEmbeddings attribute)
+            object.__setattr__(self, "metrics", metrics)
+        # checked without importing it (and torch): that's the slow part
+        if importlib.util.find_spec("sentence_transformers") is None:
             raise ImportError(
                 "Could not import sentence_transformers python package. "
                 "Please install it with `pip install sentence-transformers`."
-            ) from exc
+            )
+        if not self.lazy_loading:
+            self.load_model()
 
-        self.client = sentence_transformers.SentenceTransformer(
-            self.model_name, cache_folder=self.cache_folder, **self.model_kwargs
-        )
+    def load_model(self) -> Any:
+        """Load the model if not done yet (thread-safe). Return the client."""
+        if self.client is None:
+            with _MODEL_LOADING_LOCK:
+                if self.client is None:
+                    import sentence_transformers  # type: ignore
 
-    def embed_by_modality(self, modality: str, value: Any) -> List[float]:
-        if modality == "text":
-            return self.client.encode([value])[0]
-        elif modality == "image":
-            return self.client.encode([value])[0]
+                    self.client = sentence_transformers.SentenceTransformer(
+                        self.model_name,
+                        cache_folder=self.cache_folder,
+                        **self.model_kwargs,
+                    )
+        return self.client
+
+    def embed_by_modality(self, modality: str, value: Any) -> np.ndarray:
+        return self.embed_batch_by_modality(modality, [value])[0]
+
+    def embed_batch_by_modality(
+        self, modality: str, values: List[Any], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        if modality in {"text", "image"}:
+            if modality == "image" and self.image_preprocessor is not None:
+                values = self.image_preprocessor.preprocess(values)
+            return as_vector_matrix(
+                self.load_model().encode(
+                    values,
+                    batch_size=batch_size or self.encode_batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                )
+            )
         else:
             raise ValueError(f"Unknown modality '{modality}'")
 
@@ -0,0 +1,140 @@
+import io
+import math
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Union
+
+from PIL import Image
+from PIL.Image import Image as PILImageType
+
+# an image to prepare: a file path, the encoded bytes or a PIL image
+ImageSourceType = Union[str, bytes, PILImageType]
+
+# input side of CLIP ViT models
+DEFAULT_TARGET_SIZE = 224
+
+
+def prepare_image(
+    source: ImageSourceType, target_size: int = DEFAULT_TARGET_SIZE
+) -> PILImageType:
+    """
+    Decode an image at (about) the resolution the model needs:
+    the result is RGB with its shorter side equal to target_size
+    (or the original image if it's smaller than that).
+
+    JPEG images not yet decoded are decoded in draft mode, i.e. already
+    scaled down by 1/2, 1/4 or 1/8 in the decoder, which saves most of
+    the decoding time and memory for large photos.
+    A given PIL image is left unchanged (the draft is made on a copy
+    reopened from its file or bytes).
+    """
+    if isinstance(source, str):
+        image = Image.open(source)
+    elif isinstance(source, bytes):
+        image = Image.open(io.BytesIO(source))
+    else:
+        reopenable = _pool_source(source)
+        if reopenable is not None:
+            # draft() alters the image it's called on: not the caller's one
+            return prepare_image(reopenable, target_size)
+        image = source
+    width, height = image.size
+    scale = target_size / min(width, height)
+    if scale < 1 and image is not source:
+        target = (math.ceil(width * scale), math.ceil(height * scale))
+        # no-op for non-JPEG images
+        image.draft("RGB", target)
+    image = image.convert("RGB")
+    if scale < 1:
+        # the draft may have reduced the size already: recompute
+        width, height = image.size
+        scale = target_size / min(width, height)
+        if scale < 1:
+            image = image.resize(
+                (round(width * scale), round(height * scale)),
+                Image.BICUBIC,
+                reducing_gap=2.0,
+            )
+    return image
+
+
+def _pool_source(image: ImageSourceType) -> Optional[Union[str, bytes]]:
+    """
+    What to send to a worker process in place of this image, if worth it:
+    a path or the encoded bytes of a not-yet-decoded PIL image.
+    (Pickling a PIL image would decode it in full, defeating the purpose.)
+    """
+    if isinstance(image, (str, bytes)):
+        return image
+    if not getattr(image, "tile", None):
+        # already decoded (or not backed by a file at all)
+        return None
+    filename = getattr(image, "filename", None)
+    if filename:
+        return filename
+    file_object = getattr(image, "fp", None)
+    if isinstance(file_object, io.BytesIO):
+        return file_object.getvalue()
+    return None
+
+
+class MMImagePreprocessor:
+    """
+    Batch version of `prepare_image`, running the decoding across a
+    process pool (created on first use, `max_workers` processes).
+    Images that cannot be shipped cheaply to another process
+    (e.g. already decoded) are prepared in-process.
+    Batches smaller than `min_pool_batch` do not use the pool at all.
+    The workers are spawned, not forked (the parent process may hold
+    model and tokenizer threads): scripts using the pool need the
+    `if __name__ == "__main__":` guard.
+    """
+
+    def __init__(
+        self,
+        target_size: int = DEFAULT_TARGET_SIZE,
+        max_workers: Optional[int] = None,
+        min_pool_batch: int = 4,
+    ) -> None:
+        self.target_size = target_size
+        self.max_workers = max_workers
+        self.min_pool_batch = min_pool_batch
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def preprocess(self, images: List[ImageSourceType]) -> List[PILImageType]:
+        pool_sources = [_pool_source(image) for image in images]
+        use_pool = (
+            sum(source is not None for source in pool_sources) >= self.min_pool_batch
+        )
+        if not use_pool:
+            return [prepare_image(image, self.target_size) for image in images]
+        executor = self._get_executor()
+        futures = [
+            executor.submit(prepare_image, source, self.target_size)
+            if source is not None
+            else None
+            for source in pool_sources
+        ]
+        return [
+            future.result()
+            if future is not None
+            else prepare_image(image, self.target_size)
+            for image, future in zip(images, futures)
+        ]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __getstate__(self) -> dict:
+        # the pool stays with the process that created it
+        return {**self.__dict__, "_executor": None}
@@ -0,0 +1,95 @@
+# Support for incremental ingestion: deterministic, content-derived row ids
+# and a local Bloom filter of the ids known to be already stored.
+import hashlib
+import json
+import math
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+
+def content_hash_id(
+    stored: Dict[str, str],
+    metadata: Optional[dict] = None,
+    id_metadata_fields: Sequence[str] = (),
+) -> str:
+    """
+    Row id from the serialized content (the per-modality strings of
+    MMContentSerializer.serialize_content) plus the chosen metadata fields.
+    The content is hashed in a canonical form (the original, JSON, blob
+    format) whatever the serializer's blob codec: switching codecs keeps ids.
+    The metadata fields matter when the serialized content does not identify
+    the document by itself (e.g. images serialized as a placeholder string:
+    use "image_url" there).
+    """
+    metadata0 = metadata or {}
+    id_metadata = {field: metadata0.get(field) for field in id_metadata_fields}
+    hasher = hashlib.sha256()
+    hasher.update(
+        json.dumps(stored, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    )
+    hasher.update(b"\x00")
+    hasher.update(
+        json.dumps(id_metadata, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    )
+    return hasher.hexdigest()
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings: no false negatives,
+    about `error_rate` false positives once `capacity` keys are added.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-6) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # double hashing: h1 + i * h2
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def save(self, path: str) -> None:
+        """Write the filter to a file (see `load`)."""
+        header = {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "count": self.count,
+        }
+        with open(path, "wb") as o_file:
+            o_file.write(json.dumps(header).encode("utf-8") + b"\n")
+            o_file.write(self._bits)
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        with open(path, "rb") as i_file:
+            header = json.loads(i_file.readline())
+            bloom = cls(capacity=header["capacity"], error_rate=header["error_rate"])
+            bits = i_file.read()
+        if len(bits) != len(bloom._bits):
+            raise ValueError(f"Truncated Bloom filter file '{path}'")
+        bloom._bits = bytearray(bits)
+        bloom.count = header["count"]
+        return bloom
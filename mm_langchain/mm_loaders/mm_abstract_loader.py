@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import TYPE_CHECKING, Iterator, List, Optional
 
 from ..mm_types import MMDocument
+from ..mm_metrics import NULL_METRICS, MetricsCollector
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter, TextSplitter
-from langchain.docstore.document import Document
+from langchain.schema.document import Document
+
+if TYPE_CHECKING:
+    # imported when needed, to keep querier processes light
+    from langchain.text_splitter import TextSplitter
 
 
 class MMDisjointBaseLoader(ABC):
@@ -13,65 +17,81 @@ class MMDisjointBaseLoader(ABC):
     each *either* a text or an image. Demo purposes.
     """
 
+    # per-stage timings (see mm_metrics)
+    metrics: MetricsCollector = NULL_METRICS
+
     @abstractmethod
     def load(self) -> List[MMDocument]:
-        """We don't bother with lazy loading for now"""
+        """Load all documents at once (see lazy_load)."""
 
-    def load_and_split(
+    def lazy_load(self) -> Iterator[MMDocument]:
+        """
+        Yield documents one at a time.
+        Default: iterate over load(); loaders that can stream override this.
+        """
+        yield from self.load()
+
+    def lazy_load_and_split(
         self,
-        text_splitter: Optional[TextSplitter] = None,
-    ) -> List[MMDocument]:
+        text_splitter: Optional["TextSplitter"] = None,
+    ) -> Iterator[MMDocument]:
+        """
+        Yield documents from lazy_load, splitting the texts.
+        Runs of adjacent text documents are split together, as soon
+        as an image (or the end of the stream) is met.
+        """
         if text_splitter is None:
-            _text_splitter: TextSplitter = RecursiveCharacterTextSplitter(
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            _text_splitter: "TextSplitter" = RecursiveCharacterTextSplitter(
                 # small, for demonstration purposes
                 chunk_size=256,
                 chunk_overlap=64,
             )
         else:
             _text_splitter = text_splitter
-        docs0 = self.load()
         # Draft implementation - temporarily rewrapping as 'Document's
-        documents = []
-        doc_buffer = []
-        for doc0 in docs0:
+        doc_buffer: List[MMDocument] = []
+        for doc0 in self.lazy_load():
             if "text" in doc0.content:
                 if "image" in doc0.content:
                     raise ValueError("Multi-modal doc encountered.")
                 doc_buffer.append(doc0)
             elif "image" in doc0.content:
                 # flush and split the buffer (with the rewrapping trick)
-                if doc_buffer:
-                    t_docs = [
-                        Document(
-                            page_content=b_doc.content["text"], metadata=b_doc.metadata
-                        )
-                        for b_doc in doc_buffer
-                    ]
-                    split_t_docs = _text_splitter.split_documents(t_docs)
-                    documents += [
-                        MMDocument(
-                            content={"text": split_t_doc.page_content},
-                            metadata=split_t_doc.metadata,
-                        )
-                        for split_t_doc in split_t_docs
-                    ]
-                    doc_buffer = []
+                yield from self._split(doc_buffer, _text_splitter)
+                doc_buffer = []
                 # add this image
-                documents.append(doc0)
+                yield doc0
         # flush the remaining part
-        if doc_buffer:
-            t_docs = [
-                Document(page_content=b_doc.content["text"], metadata=b_doc.metadata)
-                for b_doc in doc_buffer
-            ]
-            split_t_docs = _text_splitter.split_documents(t_docs)
-            documents += [
-                MMDocument(
-                    content={"text": split_t_doc.page_content},
-                    metadata=split_t_doc.metadata,
-                )
-                for split_t_doc in split_t_docs
-            ]
-            doc_buffer = []
+        yield from self._split(doc_buffer, _text_splitter)
+
+    def _split(
+        self, text_documents: List[MMDocument], text_splitter: "TextSplitter"
+    ) -> List[MMDocument]:
+        with self.metrics.timer("load.split", items=len(text_documents)):
+            return _split_text_documents(text_documents, text_splitter)
+
+    def load_and_split(
+        self,
+        text_splitter: Optional["TextSplitter"] = None,
+    ) -> List[MMDocument]:
+        return list(self.lazy_load_and_split(text_splitter=text_splitter))
+
 
-        return documents
+def _split_text_documents(
+    text_documents: List[MMDocument], text_splitter: "TextSplitter"
+) -> List[MMDocument]:
+    if not text_documents:
+        return []
+    t_docs = [
+        Document(page_content=t_doc.content["text"], metadata=t_doc.metadata)
+        for t_doc in text_documents
+    ]
+    return [
+        MMDocument(
+            content={"text": split_t_doc.page_content},
+            metadata=split_t_doc.metadata,
+        )
+        for split_t_doc in text_splitter.split_documents(t_docs)
+    ]
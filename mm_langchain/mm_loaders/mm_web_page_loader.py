@@ -1,5 +1,11 @@
-from typing import Any, Iterable, List, Union
+import io
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Union
+from urllib.parse import urljoin
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from PIL import Image
 from PIL.Image import Image as PILImageType
@@ -7,6 +13,7 @@ import bs4
 
 from .mm_abstract_loader import MMDisjointBaseLoader
 from ..mm_types import MMDocument
+from ..mm_metrics import MetricsCollector
 
 default_header_template = {
     "User-Agent": "",
@@ -32,60 +39,163 @@ def _build_metadata(soup: Any, url: str) -> dict:
     return metadata
 
 
-def _url_to_image(url: str) -> PILImageType:
-    # thanks: https://stackoverflow.com/questions/12020657
-    return Image.open(requests.get(url, stream=True).raw)
+def _url_to_image(
+    url: str,
+    session: requests.Session,
+    timeout: float,
+    metrics: Optional[MetricsCollector] = None,
+) -> PILImageType:
+    if metrics is None:
+        response = session.get(url, timeout=timeout)
+    else:
+        with metrics.timer("load.image", items=1) as timer:
+            response = session.get(url, timeout=timeout)
+            timer.nbytes = len(response.content)
+    response.raise_for_status()
+    # the download is complete here, decoding is deferred by PIL until needed
+    return Image.open(io.BytesIO(response.content))
 
 
 def _traverse(tree_base: Union[bs4.BeautifulSoup, bs4.element.Tag]) -> Iterable[dict]:
     """
     traverse the tree, escaping to *.text as soon as there
     are no 'img' in the subtree. Otherwise, go deeper and repeat.
+
+    Linear in the size of the tree: a single find_all marks the subtrees
+    containing images (walking up from each image until an already-marked
+    ancestor), then a non-recursive walk descends only into marked ones.
     """
     if tree_base.name == "img":
         yield {"image_url": tree_base["src"]}
-    else:
-        if len(tree_base.find_all("img")) == 0:
-            _txt = tree_base.text.strip()
+        return
+    # ids of the nodes having at least an 'img' in their subtree
+    with_images = set()
+    for img in tree_base.find_all("img"):
+        node = img
+        while node is not None and id(node) not in with_images:
+            with_images.add(id(node))
+            if node is tree_base:
+                break
+            node = node.parent
+    #
+    stack: List[bs4.element.PageElement] = [tree_base]
+    while stack:
+        element = stack.pop()
+        if isinstance(element, bs4.element.NavigableString):
+            _txt = element.text.strip()
             if _txt:
                 yield {"text": _txt}
+        elif isinstance(element, bs4.element.Tag):
+            if element.name == "img":
+                yield {"image_url": element["src"]}
+            elif id(element) not in with_images:
+                _txt = element.text.strip()
+                if _txt:
+                    yield {"text": _txt}
+            else:
+                stack.extend(reversed(list(element.children)))
         else:
-            for child in tree_base.children:
-                if isinstance(child, bs4.element.NavigableString):
-                    _txt = child.text.strip()
-                    if _txt:
-                        yield {"text": _txt}
-                elif isinstance(child, bs4.element.Tag):
-                    for piece in _traverse(child):
-                        yield piece
-                else:
-                    raise ValueError(f"Unexpected child: {child}")
+            raise ValueError(f"Unexpected child: {element}")
 
 
 class MMDisjointWebBaseLoader(MMDisjointBaseLoader):
+    """
+    Images are downloaded in parallel on a pool of `max_image_workers`
+    threads, through the loader's own session (connection pooling,
+    at most `max_connections_per_host` connections to each host).
+    Relative image URLs are resolved against the page URL.
+    `parser` is passed to BeautifulSoup ("lxml" is faster, if installed).
+    """
+
     def __init__(
         self,
         url: str,
+        max_image_workers: int = 8,
+        max_connections_per_host: int = 8,
+        timeout: float = 20.0,
+        parser: str = "html.parser",
+        metrics: Optional[MetricsCollector] = None,
     ) -> None:
+        if parser == "lxml":
+            try:
+                import lxml  # type: ignore # noqa: F401
+
+            except ImportError as exc:
+                raise ImportError(
+                    "Could not import lxml python package. "
+                    "Please install it with `pip install lxml`."
+                ) from exc
         self.url = url
+        self.parser = parser
+        if metrics is not None:
+            self.metrics = metrics
+        self.max_image_workers = max_image_workers
+        self.timeout = timeout
         session = requests.Session()
         session.headers = dict(default_header_template)
+        # pool_block: wait for a free connection rather than opening more
+        adapter = HTTPAdapter(
+            pool_connections=max(10, max_image_workers),
+            pool_maxsize=max_connections_per_host,
+            pool_block=True,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
         self.session = session
 
+    def _fetch_images(self, image_urls: Iterable[str]) -> Iterator[PILImageType]:
+        """
+        Yield the images in the order of `image_urls`, keeping at most
+        a couple of pool-fulls of downloads ahead of the consumer.
+        """
+        lookahead = 2 * self.max_image_workers
+        executor = ThreadPoolExecutor(max_workers=self.max_image_workers)
+        pending: Deque[Future] = deque()
+        try:
+            for image_url in image_urls:
+                pending.append(
+                    executor.submit(
+                        _url_to_image,
+                        image_url,
+                        self.session,
+                        self.timeout,
+                        self.metrics if self.metrics.enabled else None,
+                    )
+                )
+                if len(pending) > lookahead:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def _scrape(
         self,
         url: str,
     ) -> Any:
-        parser = "html.parser"
-        html_doc = self.session.get(url)
-        return bs4.BeautifulSoup(html_doc.text, parser)
+        with self.metrics.timer("load.scrape", items=1) as timer:
+            html_doc = self.session.get(url, timeout=self.timeout)
+            timer.nbytes = len(html_doc.content)
+            return bs4.BeautifulSoup(html_doc.text, self.parser)
 
     def load(self) -> List[MMDocument]:
+        return list(self.lazy_load())
+
+    def lazy_load(self) -> Iterator[MMDocument]:
         soup = self._scrape(self.url)
         global_metadata = _build_metadata(soup, self.url)
-        traversed = list(_traverse(soup))
+        with self.metrics.timer("load.traverse") as timer:
+            traversed = [
+                {"image_url": urljoin(self.url, trav["image_url"])}
+                if "image_url" in trav
+                else trav
+                for trav in _traverse(soup)
+            ]
+            timer.items = len(traversed)
+        images = self._fetch_images(
+            trav["image_url"] for trav in traversed if "image_url" in trav
+        )
         # combine adjacent texts
-        documents = []
         buffer = []
         for trav in traversed:
             if "text" in trav and trav["text"]:
@@ -94,28 +204,21 @@ class MMDisjointWebBaseLoader(MMDisjointBaseLoader):
                 # flush buffer
                 if buffer:
                     full_txt = "\n".join(buffer)
-                    documents.append(
-                        MMDocument(content={"text": full_txt}, metadata=global_metadata)
+                    yield MMDocument(
+                        content={"text": full_txt}, metadata=global_metadata
                     )
                 buffer = []
                 # append image
-                documents.append(
-                    MMDocument(
-                        content={"image": _url_to_image(trav["image_url"])},
-                        metadata={
-                            **global_metadata,
-                            **{"image_url": trav["image_url"]},
-                        },
-                    )
+                yield MMDocument(
+                    content={"image": next(images)},
+                    metadata={
+                        **global_metadata,
+                        **{"image_url": trav["image_url"]},
+                    },
                 )
             else:
                 raise ValueError(str(trav))
         # flush buffer
         if buffer:
             full_txt = "\n".join(buffer)
-            documents.append(
-                MMDocument(content={"text": full_txt}, metadata=global_metadata)
-            )
-        buffer = []
-        #
-        return documents
+            yield MMDocument(content={"text": full_txt}, metadata=global_metadata)
@@ -0,0 +1,691 @@
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+
+from .mm_types import DefaultVSearchResult
+from .mm_abstract_vectorstores import (
+    MMDefaultVectorStore,
+    VectorReaderWriter,
+    per_query,
+)
+from .mm_abstract_embeddings import MMEmbeddings, MMContentSerializer
+from .mm_vector_codecs import get_vector_codec
+from .mm_model_registry import resolve_vector_dimension
+from .mm_metrics import MetricsCollector
+from .mm_vectors import (
+    VECTOR_DTYPE,
+    VectorBatchType,
+    VectorType,
+    as_vector_array,
+    as_vector_matrix,
+)
+
+# codecs whose rows are scanned faster than the exact float32 product
+# ("float16" is not: NumPy's conversion to float32 costs more than that)
+FIRST_PASS_CODECS = ("int8", "bit")
+
+
+@contextmanager
+def _replacing_file(path: str, mode: str = "wb") -> Iterator[IO]:
+    """
+    Write to a temporary file moved over `path` once complete: a file
+    being memory-mapped (e.g. by a loaded store) is never overwritten.
+    """
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, mode) as o_file:
+            yield o_file
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # zero vectors stay zero (and score zero against anything)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class NumpyVectorReaderWriter(VectorReaderWriter[DefaultVSearchResult]):
+    """
+    In-process, exact (brute-force) cosine search on a float32 matrix.
+
+    Rows are stored unit-normalized in a preallocated buffer that doubles
+    when full; a search is a single matrix-vector product plus argpartition.
+    Storing an existing id overwrites that row (as a Cassandra put would),
+    deleting marks rows as tombstones (dropped for good by `save`).
+    The `metadata` search parameter is an equality filter, as in
+    CassandraVectorReaderWriter. Use `save`/`load` to persist.
+
+    With a `compact_codec` (one of FIRST_PASS_CODECS, see mm_vector_codecs),
+    searches are two-stage: a first pass on the compact copy of the rows
+    picks `k * oversample` candidates, which are then rescored exactly.
+    Combined with `load(..., mmap=True)`, only the compact copy needs
+    to be in memory, the full vectors being read just for the candidates.
+    """
+
+    def __init__(
+        self,
+        vector_dimension: int,
+        initial_capacity: int = 1024,
+        compact_codec: Optional[str] = None,
+        oversample: int = 4,
+    ) -> None:
+        if compact_codec is not None and compact_codec not in FIRST_PASS_CODECS:
+            raise ValueError(
+                f"Unsupported compact_codec '{compact_codec}' "
+                f"(choose from {', '.join(FIRST_PASS_CODECS)})"
+            )
+        self.vector_dimension = vector_dimension
+        self.compact_codec = compact_codec
+        self.oversample = oversample
+        self._matrix = np.zeros(
+            (max(1, initial_capacity), vector_dimension), dtype=VECTOR_DTYPE
+        )
+        self._compact: Optional[np.ndarray] = self._empty_compact(self._matrix.shape[0])
+        self._alive = np.zeros(self._matrix.shape[0], dtype=bool)
+        self._size = 0
+        self._num_deleted = 0
+        self._ids: List[str] = []
+        self._bodies: List[str] = []
+        self._metadatas: List[dict] = []
+        self._position_by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size - self._num_deleted
+
+    def _empty_compact(self, capacity: int) -> Optional[np.ndarray]:
+        if self.compact_codec is None:
+            return None
+        row_size = get_vector_codec(self.compact_codec).row_size(self.vector_dimension)
+        return np.zeros((capacity, row_size), dtype=np.uint8)
+
+    def _reserve(self, capacity: int) -> None:
+        """Make room for `capacity` rows in a writable buffer."""
+        if capacity > self._matrix.shape[0] or not self._matrix.flags.writeable:
+            new_capacity = self._matrix.shape[0]
+            while new_capacity < capacity:
+                new_capacity *= 2
+            new_matrix = np.zeros(
+                (new_capacity, self.vector_dimension), dtype=VECTOR_DTYPE
+            )
+            new_matrix[: self._size] = self._matrix[: self._size]
+            self._matrix = new_matrix
+            new_alive = np.zeros(new_capacity, dtype=bool)
+            new_alive[: self._size] = self._alive[: self._size]
+            self._alive = new_alive
+            if self._compact is not None:
+                new_compact = self._empty_compact(new_capacity)
+                new_compact[: self._size] = self._compact[: self._size]
+                self._compact = new_compact
+
+    def store_contents(
+        self,
+        contents_str: Iterable[str],
+        vectors: VectorBatchType,
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        contents0 = list(contents_str)
+        vectors0 = _normalize_rows(as_vector_matrix(vectors))
+        metadatas0 = list(metadatas) if metadatas else [{}] * len(contents0)
+        ids0 = list(ids) if ids else [uuid.uuid4().hex for _ in contents0]
+        if not (len(contents0) == len(vectors0) == len(metadatas0) == len(ids0)):
+            raise ValueError("Mismatching lengths of contents/vectors/metadatas/ids")
+        if len(vectors0) > 0 and vectors0.shape[1] != self.vector_dimension:
+            raise ValueError(
+                f"Expected vectors of dimension {self.vector_dimension}, "
+                f"got {vectors0.shape[1]}"
+            )
+        #
+        self._reserve(self._size + len(ids0))
+        positions: List[int] = []
+        for xco, xve, xme, xid in zip(contents0, vectors0, metadatas0, ids0):
+            position = self._position_by_id.get(xid)
+            if position is None:
+                position = self._size
+                self._size += 1
+                self._ids.append(xid)
+                self._bodies.append(xco)
+                self._metadatas.append(xme)
+                self._position_by_id[xid] = position
+            else:
+                self._bodies[position] = xco
+                self._metadatas[position] = xme
+            self._matrix[position] = xve
+            self._alive[position] = True
+            positions.append(position)
+        if self._compact is not None and positions:
+            self._compact[positions] = self._encode_compact(vectors0)
+        return ids0
+
+    def _encode_compact(self, normalized_rows: np.ndarray) -> np.ndarray:
+        codec = get_vector_codec(self.compact_codec)
+        return np.frombuffer(
+            codec.encode_rows(normalized_rows), dtype=np.uint8
+        ).reshape(len(normalized_rows), -1)
+
+    def _compact_candidates(
+        self,
+        query: np.ndarray,
+        candidates: Optional[np.ndarray],
+        n: int,
+        chunk_size: int = 4096,
+    ) -> np.ndarray:
+        """First stage: the n best positions according to the compact rows."""
+        assert self._compact is not None and self.compact_codec is not None
+        codec = get_vector_codec(self.compact_codec)
+        num_rows = self._size if candidates is None else len(candidates)
+        scores = np.empty(num_rows, dtype=VECTOR_DTYPE)
+        for start in range(0, num_rows, chunk_size):
+            end = min(start + chunk_size, num_rows)
+            if candidates is None:
+                rows = self._compact[start:end]
+            else:
+                rows = self._compact[candidates[start:end]]
+            scores[start:end] = codec.dot_rows(rows, self.vector_dimension, query)
+        best = _top_k(scores, n)
+        return best if candidates is None else candidates[best]
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Tombstone the given rows (unknown ids are ignored). Return how many."""
+        deleted = 0
+        for row_id in ids:
+            position = self._position_by_id.pop(row_id, None)
+            if position is not None:
+                self._alive[position] = False
+                deleted += 1
+        self._num_deleted += deleted
+        return deleted
+
+    def existing_ids(
+        self, ids: List[str], metadatas: Optional[List[dict]] = None
+    ) -> Set[str]:
+        return {row_id for row_id in ids if row_id in self._position_by_id}
+
+    def _matches(self, position: int, metadata: dict) -> bool:
+        row_md = self._metadatas[position]
+        return all(row_md.get(mk) == mv for mk, mv in metadata.items())
+
+    def _filter_positions(
+        self, positions: np.ndarray, metadata: Optional[dict]
+    ) -> np.ndarray:
+        """Restrict positions to live rows matching the metadata filter."""
+        if self._num_deleted > 0:
+            positions = positions[self._alive[positions]]
+        if metadata:
+            positions = np.fromiter(
+                (pos for pos in positions.tolist() if self._matches(pos, metadata)),
+                dtype=np.intp,
+            )
+        return positions
+
+    def _candidate_positions(self, metadata: Optional[dict]) -> Optional[np.ndarray]:
+        """None means 'all rows'."""
+        if not metadata and self._num_deleted == 0:
+            return None
+        return self._filter_positions(np.arange(self._size), metadata)
+
+    def _score_positions(
+        self,
+        query: np.ndarray,
+        candidates: Optional[np.ndarray],
+        k: int,
+    ) -> List[DefaultVSearchResult]:
+        """Exact top-k among the candidate positions (None = all rows)."""
+        if self._compact is not None and k > 0:
+            candidates = self._compact_candidates(
+                query, candidates, k * self.oversample
+            )
+        if candidates is None:
+            scores = self._matrix[: self._size] @ query
+        else:
+            scores = self._matrix[candidates] @ query
+        if k <= 0 or len(scores) == 0:
+            return []
+        top = _top_k(scores, k)
+        positions = top if candidates is None else candidates[top]
+        return self._results_at(positions, scores[top])
+
+    def _results_at(
+        self, positions: np.ndarray, scores: np.ndarray
+    ) -> List[DefaultVSearchResult]:
+        return [
+            (
+                self._ids[position],
+                self._bodies[position],
+                self._metadatas[position],
+                float(score),
+            )
+            for position, score in zip(positions.tolist(), scores.tolist())
+        ]
+
+    @staticmethod
+    def _normalize_query(vector: VectorType) -> np.ndarray:
+        query = as_vector_array(vector)
+        query_norm = np.linalg.norm(query)
+        if query_norm > 0:
+            query = query / query_norm
+        return query
+
+    def search_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        metadata: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[DefaultVSearchResult]:
+        return self._score_positions(
+            self._normalize_query(vector),
+            self._candidate_positions(metadata),
+            k,
+        )
+
+    def search_by_vectors(
+        self,
+        vectors: VectorBatchType,
+        k: int = 4,
+        metadatas: Optional[List[Optional[dict]]] = None,
+        max_workers: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[List[DefaultVSearchResult]]:
+        """
+        Unfiltered batches are scored with a single matrix-matrix product;
+        filtered queries (and all of them in two-stage mode)
+        fall back to one search_by_vector each.
+        """
+        queries = _normalize_rows(as_vector_matrix(vectors))
+        metadatas0 = per_query(metadatas, len(queries), "metadatas")
+        results: List[List[DefaultVSearchResult]] = [[] for _ in range(len(queries))]
+        plain = [
+            query_i
+            for query_i, metadata in enumerate(metadatas0)
+            if not metadata and self._num_deleted == 0 and self._compact is None
+        ]
+        if plain and k > 0 and self._size > 0:
+            # (n_rows, n_plain_queries)
+            all_scores = self._matrix[: self._size] @ queries[plain].T
+            for column, query_i in enumerate(plain):
+                scores = all_scores[:, column]
+                top = _top_k(scores, k)
+                results[query_i] = self._results_at(top, scores[top])
+        plain_set = set(plain)
+        for query_i, metadata in enumerate(metadatas0):
+            if query_i not in plain_set:
+                results[query_i] = self.search_by_vector(
+                    queries[query_i], k=k, metadata=metadata, **kwargs
+                )
+        return results
+
+    def clear(self) -> None:
+        self._matrix = np.zeros((1, self.vector_dimension), dtype=VECTOR_DTYPE)
+        self._compact = self._empty_compact(1)
+        self._alive = np.zeros(1, dtype=bool)
+        self._size = 0
+        self._num_deleted = 0
+        self._ids = []
+        self._bodies = []
+        self._metadatas = []
+        self._position_by_id = {}
+
+    def save(self, path: str) -> None:
+        """
+        Write `<path>.npy` (the vectors, in the .npy format so that they can
+        be memory-mapped back) and `<path>.json` (ids, bodies, metadata),
+        plus `<path>.compact.npy` if there is a compact codec.
+        Tombstoned rows are not written. The files are replaced, not
+        overwritten, so saving over the files a store was loaded from
+        (memory-mapped) is safe.
+        """
+        saved = self._saved_positions()
+        with _replacing_file(f"{path}.npy") as o_file:
+            np.save(o_file, self._matrix[saved])
+        if self._compact is not None:
+            with _replacing_file(f"{path}.compact.npy") as o_file:
+                np.save(o_file, self._compact[saved])
+        with _replacing_file(f"{path}.json", "w") as o_file:
+            json.dump(
+                {
+                    "vector_dimension": self.vector_dimension,
+                    "compact_codec": self.compact_codec,
+                    "oversample": self.oversample,
+                    "ids": [self._ids[pos] for pos in saved.tolist()],
+                    "bodies": [self._bodies[pos] for pos in saved.tolist()],
+                    "metadatas": [self._metadatas[pos] for pos in saved.tolist()],
+                },
+                o_file,
+                separators=(",", ":"),
+            )
+
+    def _saved_positions(self) -> np.ndarray:
+        return np.flatnonzero(self._alive[: self._size])
+
+    def _load_payload(self, path: str, payload: Dict[str, Any], mmap: bool) -> None:
+        if not payload["ids"]:
+            return
+        matrix = np.load(f"{path}.npy", mmap_mode="r" if mmap else None)
+        self._matrix = matrix
+        if self.compact_codec is not None:
+            # always in memory: it's what the first search stage scans
+            self._compact = np.load(f"{path}.compact.npy")
+        self._alive = np.ones(matrix.shape[0], dtype=bool)
+        self._size = matrix.shape[0]
+        self._ids = payload["ids"]
+        self._bodies = payload["bodies"]
+        self._metadatas = payload["metadatas"]
+        self._position_by_id = {row_id: pos for pos, row_id in enumerate(self._ids)}
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "NumpyVectorReaderWriter":
+        """
+        Load what `save` wrote. With mmap=True the vectors are memory-mapped
+        read-only and copied to memory only upon the first write.
+        """
+        with open(f"{path}.json") as i_file:
+            payload = json.load(i_file)
+        rw = cls(
+            vector_dimension=payload["vector_dimension"],
+            compact_codec=payload.get("compact_codec"),
+            oversample=payload.get("oversample", 4),
+        )
+        rw._load_payload(path, payload, mmap=mmap)
+        return rw
+
+
+def _assign_to_centroids(
+    data: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536
+) -> np.ndarray:
+    """Index of the (cosine-)nearest centroid for each row of data, chunked."""
+    assignments = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start : start + chunk_size]
+        assignments[start : start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def _spherical_kmeans(
+    data: np.ndarray, n_clusters: int, n_iterations: int, seed: int
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=n_clusters, replace=False)].copy()
+    for _ in range(n_iterations):
+        assignments = _assign_to_centroids(data, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        # empty clusters keep their previous centroid
+        nonempty = np.bincount(assignments, minlength=n_clusters) > 0
+        centroids[nonempty] = _normalize_rows(sums[nonempty])
+    return centroids
+
+
+class IVFVectorReaderWriter(NumpyVectorReaderWriter):
+    """
+    Approximate search through an inverted-file index on top of the
+    NumpyVectorReaderWriter storage.
+
+    Rows are bucketed by their nearest of `n_lists` centroids (spherical
+    k-means, trained automatically once `train_size` rows are stored, or
+    explicitly with `train`); a search scores only the rows in the `nprobe`
+    buckets closest to the query (the recall/latency knob, also
+    overridable per search). Until trained, search is exact.
+    Deletions are tombstones; `save`/`load` also persist the index.
+    """
+
+    def __init__(
+        self,
+        vector_dimension: int,
+        n_lists: int = 256,
+        nprobe: int = 8,
+        train_size: Optional[int] = None,
+        kmeans_iterations: int = 10,
+        seed: int = 0,
+        initial_capacity: int = 1024,
+        compact_codec: Optional[str] = None,
+        oversample: int = 4,
+    ) -> None:
+        super().__init__(
+            vector_dimension=vector_dimension,
+            initial_capacity=initial_capacity,
+            compact_codec=compact_codec,
+            oversample=oversample,
+        )
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.train_size = train_size if train_size is not None else 32 * n_lists
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+        self._list_of_position: Dict[int, int] = {}
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def _add_to_lists(self, positions: np.ndarray, assignments: np.ndarray) -> None:
+        for position, list_i in zip(positions.tolist(), assignments.tolist()):
+            previous = self._list_of_position.get(position)
+            if previous == list_i:
+                continue
+            if previous is not None:
+                # an overwritten row moving to another bucket
+                self._lists[previous].remove(position)
+                self._list_arrays[previous] = None
+            self._lists[list_i].append(position)
+            self._list_arrays[list_i] = None
+            self._list_of_position[position] = list_i
+
+    def _list_array(self, list_i: int) -> np.ndarray:
+        array = self._list_arrays[list_i]
+        if array is None:
+            array = np.asarray(self._lists[list_i], dtype=np.intp)
+            self._list_arrays[list_i] = array
+        return array
+
+    def _set_index(
+        self, centroids: np.ndarray, positions: np.ndarray, assignments: np.ndarray
+    ) -> None:
+        self._centroids = centroids
+        self._lists = [[] for _ in range(len(centroids))]
+        self._list_arrays = [None for _ in range(len(centroids))]
+        self._list_of_position = {}
+        self._add_to_lists(positions, assignments)
+
+    def train(self, sample_size: Optional[int] = None) -> None:
+        """(Re)build the centroids from (a sample of) the live rows."""
+        positions = self._saved_positions()
+        if len(positions) == 0:
+            raise ValueError("Cannot train an IVF index on an empty store")
+        sample = positions
+        if sample_size is not None and sample_size < len(positions):
+            rng = np.random.default_rng(self.seed)
+            sample = rng.choice(positions, size=sample_size, replace=False)
+        centroids = _spherical_kmeans(
+            self._matrix[sample],
+            n_clusters=min(self.n_lists, len(sample)),
+            n_iterations=self.kmeans_iterations,
+            seed=self.seed,
+        )
+        self._set_index(
+            centroids,
+            positions,
+            _assign_to_centroids(self._matrix[positions], centroids),
+        )
+
+    def store_contents(
+        self,
+        contents_str: Iterable[str],
+        vectors: VectorBatchType,
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        stored_ids = super().store_contents(
+            contents_str=contents_str,
+            vectors=vectors,
+            metadatas=metadatas,
+            ids=ids,
+            **kwargs,
+        )
+        if self._centroids is not None:
+            positions = np.asarray(
+                [self._position_by_id[row_id] for row_id in stored_ids],
+                dtype=np.intp,
+            )
+            self._add_to_lists(
+                positions,
+                _assign_to_centroids(self._matrix[positions], self._centroids),
+            )
+        elif len(self) >= self.train_size:
+            self.train()
+        return stored_ids
+
+    def search_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        metadata: Optional[dict] = None,
+        nprobe: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[DefaultVSearchResult]:
+        if self._centroids is None:
+            return super().search_by_vector(vector, k=k, metadata=metadata, **kwargs)
+        query = self._normalize_query(vector)
+        probed = _top_k(self._centroids @ query, nprobe or self.nprobe)
+        candidates = np.concatenate(
+            [self._list_array(list_i) for list_i in probed.tolist()]
+        )
+        return self._score_positions(
+            query,
+            self._filter_positions(candidates, metadata),
+            k,
+        )
+
+    def search_by_vectors(
+        self,
+        vectors: VectorBatchType,
+        k: int = 4,
+        metadatas: Optional[List[Optional[dict]]] = None,
+        max_workers: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[List[DefaultVSearchResult]]:
+        if self._centroids is None:
+            return super().search_by_vectors(
+                vectors, k=k, metadatas=metadatas, **kwargs
+            )
+        queries = as_vector_matrix(vectors)
+        metadatas0 = per_query(metadatas, len(queries), "metadatas")
+        return [
+            self.search_by_vector(query, k=k, metadata=metadata, nprobe=nprobe)
+            for query, metadata in zip(queries, metadatas0)
+        ]
+
+    def clear(self) -> None:
+        super().clear()
+        self._centroids = None
+        self._lists = []
+        self._list_arrays = []
+        self._list_of_position = {}
+
+    def save(self, path: str) -> None:
+        """Same as NumpyVectorReaderWriter.save, plus `<path>.ivf.npz` (the index)."""
+        super().save(path)
+        saved = self._saved_positions()
+        if self._centroids is not None:
+            centroids = self._centroids
+            assignments = np.asarray(
+                [self._list_of_position[pos] for pos in saved.tolist()],
+                dtype=np.int32,
+            )
+        else:
+            centroids = np.zeros((0, self.vector_dimension), dtype=VECTOR_DTYPE)
+            assignments = np.zeros(0, dtype=np.int32)
+        with _replacing_file(f"{path}.ivf.npz") as o_file:
+            np.savez(
+                o_file,
+                centroids=centroids,
+                assignments=assignments,
+                params=np.asarray(
+                    [self.n_lists, self.nprobe, self.train_size, self.kmeans_iterations]
+                ),
+            )
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "IVFVectorReaderWriter":
+        with open(f"{path}.json") as i_file:
+            payload = json.load(i_file)
+        with np.load(f"{path}.ivf.npz") as index_data:
+            n_lists, nprobe, train_size, kmeans_iterations = index_data[
+                "params"
+            ].tolist()
+            centroids = index_data["centroids"]
+            assignments = index_data["assignments"]
+        rw = cls(
+            vector_dimension=payload["vector_dimension"],
+            n_lists=n_lists,
+            nprobe=nprobe,
+            train_size=train_size,
+            kmeans_iterations=kmeans_iterations,
+            compact_codec=payload.get("compact_codec"),
+            oversample=payload.get("oversample", 4),
+        )
+        rw._load_payload(path, payload, mmap=mmap)
+        if len(centroids) > 0:
+            # saved rows are stored compacted, in position order
+            rw._set_index(centroids, np.arange(len(assignments)), assignments)
+        return rw
+
+
+class MMNumpyVectorStore(MMDefaultVectorStore):
+    """
+    Offline stand-in for MMCassandra: same API, everything in-process.
+    Pass a (e.g. loaded) `vector_reader_writer` to resume a saved store.
+    """
+
+    def __init__(
+        self,
+        embedding: MMEmbeddings,
+        content_serializer: MMContentSerializer,
+        vector_reader_writer: Optional[NumpyVectorReaderWriter] = None,
+        *pargs: Any,
+        vector_dimension: Optional[int] = None,
+        metrics: Optional[MetricsCollector] = None,
+        **kwargs: Any,
+    ) -> None:
+        if vector_reader_writer is None:
+            self._embedding_dimension = resolve_vector_dimension(
+                embedding,
+                vector_dimension,
+                lambda: len(
+                    embedding.embed_one_array({"text": "This is a sample sentence."})
+                ),
+            )
+            vector_rw = NumpyVectorReaderWriter(
+                vector_dimension=self._embedding_dimension,
+            )
+        else:
+            self._embedding_dimension = vector_reader_writer.vector_dimension
+            vector_rw = vector_reader_writer
+        super().__init__(
+            vector_reader_writer=vector_rw,
+            embedding=embedding,
+            content_serializer=content_serializer,
+            metrics=metrics,
+        )
@@ -0,0 +1,226 @@
+# Per-stage instrumentation: the components (stores, reader-writers,
+# embeddings, loaders) report to a MetricsCollector how long each stage
+# took, how many items it processed and, where cheap to know, how many bytes
+# (for text: characters). The default collector does nothing at all.
+#
+# Stage names used across the package:
+#   add.embed, add.serialize, add.store            (MMVectorStore ingestion)
+#   search.embed, search.query, search.deserialize (MMDefaultVectorStore)
+#   embed.<modality>                               (MMEmbeddings.embed_many_array)
+#   cassandra.write, cassandra.ann_query, cassandra.rescore
+#   load.scrape, load.traverse, load.image, load.split (loaders)
+# (the stages of a layer include the time spent in the layers below.)
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Sequence
+
+# histogram buckets (upper bounds, seconds)
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class StageTimer:
+    """
+    Context manager timing a stage; `items` and `nbytes` can be
+    set (or updated) inside the block. Recorded also if the block raises.
+    """
+
+    __slots__ = ("collector", "stage", "items", "nbytes", "_t0")
+
+    def __init__(
+        self, collector: "MetricsCollector", stage: str, items: int, nbytes: int
+    ) -> None:
+        self.collector = collector
+        self.stage = stage
+        self.items = items
+        self.nbytes = nbytes
+        self._t0 = 0.0
+
+    def __enter__(self) -> "StageTimer":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.collector.record(
+            self.stage, time.perf_counter() - self._t0, self.items, self.nbytes
+        )
+
+
+class _NullTimer:
+    # shared by all no-op timings: settable attributes, nothing recorded
+    __slots__ = ("items", "nbytes")
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsCollector(ABC):
+    # False only for the no-op collector: callers can skip computing
+    # values (e.g. byte counts) that would be discarded anyway
+    enabled: bool = True
+
+    @abstractmethod
+    def record(
+        self, stage: str, seconds: float, items: int = 0, nbytes: int = 0
+    ) -> None:
+        """Receive a completed stage. Must be thread-safe."""
+
+    def timer(self, stage: str, items: int = 0, nbytes: int = 0) -> Any:
+        return StageTimer(self, stage, items, nbytes)
+
+
+class NullMetricsCollector(MetricsCollector):
+    """The default: records nothing, no clock reads."""
+
+    enabled = False
+
+    def record(
+        self, stage: str, seconds: float, items: int = 0, nbytes: int = 0
+    ) -> None:
+        pass
+
+    def timer(self, stage: str, items: int = 0, nbytes: int = 0) -> Any:
+        return _NULL_TIMER
+
+
+NULL_METRICS = NullMetricsCollector()
+
+
+class CallbackMetricsCollector(MetricsCollector):
+    """
+    Forward each record to `callback(stage, seconds, items, nbytes)`,
+    e.g. to feed an OpenTelemetry histogram or a StatsD client.
+    """
+
+    def __init__(self, callback: Callable[[str, float, int, int], None]) -> None:
+        self.callback = callback
+
+    def record(
+        self, stage: str, seconds: float, items: int = 0, nbytes: int = 0
+    ) -> None:
+        self.callback(stage, seconds, items, nbytes)
+
+
+class _StageStats:
+    __slots__ = ("count", "seconds", "items", "nbytes", "bucket_counts")
+
+    def __init__(self, num_buckets: int) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.items = 0
+        self.nbytes = 0
+        # last one: above all bounds
+        self.bucket_counts = [0] * (num_buckets + 1)
+
+
+class InMemoryMetricsCollector(MetricsCollector):
+    """
+    Aggregate per stage (count, total seconds/items/bytes and a histogram
+    of the durations), to be read with `snapshot` or exported as
+    Prometheus text exposition format with `to_prometheus_text`.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = sorted(buckets)
+        self._stats: Dict[str, _StageStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, stage: str, seconds: float, items: int = 0, nbytes: int = 0
+    ) -> None:
+        bucket_i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            stats = self._stats.get(stage)
+            if stats is None:
+                stats = _StageStats(len(self.buckets))
+                self._stats[stage] = stats
+            stats.count += 1
+            stats.seconds += seconds
+            stats.items += items
+            stats.nbytes += nbytes
+            stats.bucket_counts[bucket_i] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """stage => count, seconds, items, bytes, mean_seconds."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": stats.count,
+                    "seconds": stats.seconds,
+                    "items": stats.items,
+                    "bytes": stats.nbytes,
+                    "mean_seconds": stats.seconds / stats.count,
+                }
+                for stage, stats in self._stats.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+
+    def to_prometheus_text(self, namespace: str = "mm_langchain") -> str:
+        with self._lock:
+            stats_items = sorted(
+                (
+                    stage,
+                    stats.count,
+                    stats.seconds,
+                    stats.items,
+                    stats.nbytes,
+                    list(stats.bucket_counts),
+                )
+                for stage, stats in self._stats.items()
+            )
+        duration = f"{namespace}_stage_duration_seconds"
+        lines: List[str] = [
+            f"# HELP {duration} Duration of the instrumented stages.",
+            f"# TYPE {duration} histogram",
+        ]
+        for stage, count, seconds, _, _, bucket_counts in stats_items:
+            label = _prometheus_label(stage)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{duration}_bucket{{stage="{label}",le="{bound:g}"}} {cumulative}'
+                )
+            lines.append(f'{duration}_bucket{{stage="{label}",le="+Inf"}} {count}')
+            lines.append(f'{duration}_sum{{stage="{label}"}} {seconds!r}')
+            lines.append(f'{duration}_count{{stage="{label}"}} {count}')
+        for name, help_text, field_i in [
+            ("items", "Items processed by the instrumented stages.", 3),
+            ("bytes", "Bytes processed by the instrumented stages.", 4),
+        ]:
+            metric = f"{namespace}_stage_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for stats_item in stats_items:
+                label = _prometheus_label(stats_item[0])
+                lines.append(f'{metric}{{stage="{label}"}} {stats_item[field_i]}')
+        return "\n".join(lines) + "\n"
+
+
+def _prometheus_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,55 @@
+# Embedding dimensions of well-known models, so that stores can be set up
+# without loading the model and running a probe embedding.
+from typing import Any, Callable, Dict, Optional
+
+KNOWN_EMBEDDING_DIMENSIONS: Dict[str, int] = {
+    # sentence-transformers CLIP models
+    "clip-ViT-B-32": 512,
+    "clip-ViT-B-16": 512,
+    "clip-ViT-L-14": 768,
+    # sentence-transformers text models
+    "all-MiniLM-L6-v2": 384,
+    "all-MiniLM-L12-v2": 384,
+    "all-mpnet-base-v2": 768,
+    "multi-qa-MiniLM-L6-cos-v1": 384,
+    # OpenAI
+    "text-embedding-ada-002": 1536,
+}
+
+
+def register_embedding_dimension(model_name: str, dimension: int) -> None:
+    KNOWN_EMBEDDING_DIMENSIONS[model_name] = dimension
+
+
+def known_embedding_dimension(embedding: Any) -> Optional[int]:
+    """
+    The dimension of an embedding object's model, if known from the registry
+    (looking at its `model_name` or `model` attribute, and through wrappers
+    exposing the wrapped object as `embedding`, such as CachedMMEmbeddings).
+    """
+    model_name = getattr(embedding, "model_name", None) or getattr(
+        embedding, "model", None
+    )
+    if isinstance(model_name, str):
+        # also accept e.g. "sentence-transformers/clip-ViT-B-32"
+        for name in (model_name, model_name.split("/")[-1]):
+            if name in KNOWN_EMBEDDING_DIMENSIONS:
+                return KNOWN_EMBEDDING_DIMENSIONS[name]
+    wrapped = getattr(embedding, "embedding", None)
+    if wrapped is not None and wrapped is not embedding:
+        return known_embedding_dimension(wrapped)
+    return None
+
+
+def resolve_vector_dimension(
+    embedding: Any,
+    vector_dimension: Optional[int],
+    probe: Callable[[], int],
+) -> int:
+    """Explicit dimension if given, else from the registry, else probe the model."""
+    if vector_dimension is not None:
+        return vector_dimension
+    known_dimension = known_embedding_dimension(embedding)
+    if known_dimension is not None:
+        return known_dimension
+    return probe()
@@ -0,0 +1,480 @@
+import asyncio
+import heapq
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .mm_types import DefaultVSearchResult, MMContent, MMStoredDocument
+from .mm_abstract_vectorstores import (
+    MMBulkWriteError,
+    MMDefaultVectorStore,
+    MMSearchHit,
+    VectorReaderWriter,
+    per_query,
+)
+from .mm_abstract_embeddings import MMEmbeddings, MMContentSerializer
+from .mm_metrics import NULL_METRICS, MetricsCollector
+from .mm_vectors import VECTOR_DTYPE, VectorBatchType, VectorType
+
+FUSION_METHODS = ("weighted_sum", "rrf")
+
+
+def fuse_results(
+    results_by_modality: Dict[str, List[DefaultVSearchResult]],
+    weights: Dict[str, float],
+    k: int,
+    fusion: str = "weighted_sum",
+    rrf_k: int = 60,
+) -> List[DefaultVSearchResult]:
+    """
+    Merge per-modality search results into the top k, scored by:
+        "weighted_sum": sum over the indexes of weight * similarity
+        "rrf": reciprocal rank fusion, sum of weight / (rrf_k + rank)
+    divided by the total weight of the queried indexes (so that scores
+    stay on the scale of a single index). An entry missing from an index
+    gets nothing from it: with entries having one modality each,
+    the weights decide how they rank against each other.
+    """
+    if fusion not in FUSION_METHODS:
+        raise ValueError(
+            f"Unknown fusion '{fusion}' (known: {', '.join(FUSION_METHODS)})"
+        )
+    total_weight = sum(weights[modality] for modality in results_by_modality) or 1.0
+    scores: Dict[str, float] = {}
+    entries: Dict[str, DefaultVSearchResult] = {}
+    for modality, results in results_by_modality.items():
+        weight = weights[modality] / total_weight
+        for rank, result in enumerate(results, start=1):
+            row_id = result[0]
+            if fusion == "weighted_sum":
+                contribution = weight * result[3]
+            else:
+                contribution = weight / (rrf_k + rank)
+            scores[row_id] = scores.get(row_id, 0.0) + contribution
+            entries.setdefault(row_id, result)
+    return [
+        (row_id, entries[row_id][1], entries[row_id][2], score)
+        for row_id, score in heapq.nlargest(k, scores.items(), key=itemgetter(1))
+    ]
+
+
+class MultiVectorReaderWriter(VectorReaderWriter[DefaultVSearchResult]):
+    """
+    One reader-writer (index) per modality. Each entry is written, with
+    the same id, blob and metadata, to the index of every modality it has,
+    with that modality's vector: re-weighting is then a query-time choice.
+
+    store_contents expects vectors as a (n, len(modalities), dimension)
+    array, NaN where an entry lacks a modality (see `stack_vectors`).
+    Searches query every index with nonzero weight (concurrently),
+    retrieving `k * fusion_oversample` candidates each, and fuse them
+    (see fuse_results). `weights` and `fusion` can be overridden per search,
+    and `modalities` restricts it to some indexes.
+    The reader-writers get the metrics collector set on this one.
+    Call `close` to release the search threads.
+    """
+
+    def __init__(
+        self,
+        vector_reader_writers: Dict[str, VectorReaderWriter[DefaultVSearchResult]],
+        weights: Optional[Dict[str, float]] = None,
+        fusion: str = "weighted_sum",
+        rrf_k: int = 60,
+        fusion_oversample: int = 1,
+    ) -> None:
+        if fusion not in FUSION_METHODS:
+            raise ValueError(
+                f"Unknown fusion '{fusion}' (known: {', '.join(FUSION_METHODS)})"
+            )
+        self.vector_reader_writers = vector_reader_writers
+        self.modalities = list(vector_reader_writers.keys())
+        self.weights = {modality: 1.0 for modality in self.modalities}
+        self.weights.update(weights or {})
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.fusion_oversample = fusion_oversample
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._metrics: MetricsCollector = NULL_METRICS
+
+    @property
+    def metrics(self) -> MetricsCollector:  # type: ignore[override]
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics: MetricsCollector) -> None:
+        self._metrics = metrics
+        for vector_rw in self.vector_reader_writers.values():
+            vector_rw.metrics = metrics
+
+    def stack_vectors(
+        self, by_modality: Dict[str, Tuple[List[int], np.ndarray]], num_entries: int
+    ) -> np.ndarray:
+        """
+        The store_contents vectors from the output of
+        MMEmbeddings.embed_many_by_modality.
+        """
+        unknown = by_modality.keys() - set(self.modalities)
+        if unknown:
+            raise ValueError(f"No reader-writer for modalities {sorted(unknown)}")
+        if not by_modality:
+            return np.zeros((num_entries, len(self.modalities), 0), dtype=VECTOR_DTYPE)
+        dimension = next(iter(by_modality.values()))[1].shape[1]
+        stacked = np.full(
+            (num_entries, len(self.modalities), dimension), np.nan, dtype=VECTOR_DTYPE
+        )
+        for modality_i, modality in enumerate(self.modalities):
+            if modality in by_modality:
+                indices, vectors = by_modality[modality]
+                stacked[np.asarray(indices, dtype=np.intp), modality_i] = vectors
+        return stacked
+
+    def _split_rows(
+        self,
+        contents_str: Iterable[str],
+        vectors: VectorBatchType,
+        metadatas: Optional[Iterable[dict]],
+        ids: Optional[Iterable[str]],
+    ) -> Tuple[List[str], List[Tuple[str, Dict[str, Any]]]]:
+        """The entry ids, and the store_contents arguments for each index."""
+        contents0 = list(contents_str)
+        if not contents0:
+            return [], []
+        stacked = np.asarray(vectors, dtype=VECTOR_DTYPE)
+        if stacked.ndim != 3 or stacked.shape[:2] != (
+            len(contents0),
+            len(self.modalities),
+        ):
+            raise ValueError(
+                "Expected vectors of shape (entries, modalities, dimension), "
+                f"got {stacked.shape}"
+            )
+        metadatas0 = list(metadatas) if metadatas else [{}] * len(contents0)
+        ids0 = list(ids) if ids else [uuid.uuid4().hex for _ in contents0]
+        writes: List[Tuple[str, Dict[str, Any]]] = []
+        for modality_i, modality in enumerate(self.modalities):
+            rows = np.flatnonzero(~np.isnan(stacked[:, modality_i, 0])).tolist()
+            if rows:
+                writes.append(
+                    (
+                        modality,
+                        {
+                            "contents_str": [contents0[row] for row in rows],
+                            "vectors": stacked[rows, modality_i],
+                            "metadatas": [metadatas0[row] for row in rows],
+                            "ids": [ids0[row] for row in rows],
+                        },
+                    )
+                )
+        return ids0, writes
+
+    @staticmethod
+    def _outcome(ids0: List[str], failures: Dict[str, Exception]) -> List[str]:
+        inserteds = [row_id for row_id in ids0 if row_id not in failures]
+        if failures:
+            raise MMBulkWriteError(inserted_ids=inserteds, failures=failures)
+        return inserteds
+
+    def store_contents(
+        self,
+        contents_str: Iterable[str],
+        vectors: VectorBatchType,
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """
+        If some rows fail in some index, the others are still written
+        and a MMBulkWriteError is raised at the end.
+        """
+        ids0, writes = self._split_rows(contents_str, vectors, metadatas, ids)
+        failures: Dict[str, Exception] = {}
+        for modality, write_args in writes:
+            try:
+                self.vector_reader_writers[modality].store_contents(
+                    **write_args, **kwargs
+                )
+            except MMBulkWriteError as exc:
+                failures.update(exc.failures)
+        return self._outcome(ids0, failures)
+
+    async def astore_contents(
+        self,
+        contents_str: Iterable[str],
+        vectors: VectorBatchType,
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        ids0, writes = self._split_rows(contents_str, vectors, metadatas, ids)
+        outcomes = await asyncio.gather(
+            *(
+                self.vector_reader_writers[modality].astore_contents(
+                    **write_args, **kwargs
+                )
+                for modality, write_args in writes
+            ),
+            return_exceptions=True,
+        )
+        failures: Dict[str, Exception] = {}
+        for outcome in outcomes:
+            if isinstance(outcome, MMBulkWriteError):
+                failures.update(outcome.failures)
+            elif isinstance(outcome, BaseException):
+                raise outcome
+        return self._outcome(ids0, failures)
+
+    def _search_plan(
+        self,
+        k: int,
+        weights: Optional[Dict[str, float]],
+        fusion: Optional[str],
+        modalities: Optional[Iterable[str]],
+    ) -> Tuple[Dict[str, float], str, int]:
+        """Weights of the indexes to query, fusion method, per-index k."""
+        weights0 = {**self.weights, **(weights or {})}
+        searched = (
+            self.vector_reader_writers.keys() if modalities is None else set(modalities)
+        )
+        active = {
+            modality: weight
+            for modality, weight in weights0.items()
+            if weight != 0
+            and modality in self.vector_reader_writers
+            and modality in searched
+        }
+        return active, fusion or self.fusion, k * self.fusion_oversample
+
+    def search_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        weights: Optional[Dict[str, float]] = None,
+        fusion: Optional[str] = None,
+        modalities: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> List[DefaultVSearchResult]:
+        active, fusion0, index_k = self._search_plan(k, weights, fusion, modalities)
+        if len(active) <= 1:
+            results_by_modality = {
+                modality: self.vector_reader_writers[modality].search_by_vector(
+                    vector, k=index_k, **kwargs
+                )
+                for modality in active
+            }
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=len(self.modalities))
+            futures = {
+                modality: self._executor.submit(
+                    self.vector_reader_writers[modality].search_by_vector,
+                    vector,
+                    k=index_k,
+                    **kwargs,
+                )
+                for modality in active
+            }
+            results_by_modality = {
+                modality: future.result() for modality, future in futures.items()
+            }
+        return fuse_results(
+            results_by_modality, active, k, fusion=fusion0, rrf_k=self.rrf_k
+        )
+
+    async def asearch_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        weights: Optional[Dict[str, float]] = None,
+        fusion: Optional[str] = None,
+        modalities: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> List[DefaultVSearchResult]:
+        active, fusion0, index_k = self._search_plan(k, weights, fusion, modalities)
+        searched = list(active.keys())
+        results = await asyncio.gather(
+            *(
+                self.vector_reader_writers[modality].asearch_by_vector(
+                    vector, k=index_k, **kwargs
+                )
+                for modality in searched
+            )
+        )
+        return fuse_results(
+            dict(zip(searched, results)), active, k, fusion=fusion0, rrf_k=self.rrf_k
+        )
+
+    def existing_ids(
+        self, ids: List[str], metadatas: Optional[List[dict]] = None
+    ) -> Set[str]:
+        found: Set[str] = set()
+        for vector_rw in self.vector_reader_writers.values():
+            remaining = [
+                row_i for row_i, row_id in enumerate(ids) if row_id not in found
+            ]
+            found |= vector_rw.existing_ids(
+                [ids[row_i] for row_i in remaining],
+                metadatas=(
+                    None
+                    if metadatas is None
+                    else [metadatas[row_i] for row_i in remaining]
+                ),
+            )
+        return found
+
+    def clear(self) -> None:
+        for vector_rw in self.vector_reader_writers.values():
+            vector_rw.clear()
+
+    def close(self) -> None:
+        """Shut down the search threads (recreated if searching again)."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+class MMMultiVectorStore(MMDefaultVectorStore):
+    """
+    Each modality's vector is stored in its own reader-writer and
+    the per-modality results are fused at query time (instead of storing
+    the average of the per-modality vectors): see MultiVectorReaderWriter.
+    A query is searched in the indexes of its own modalities (unless
+    `modalities=[...]` is passed, e.g. to find images from a text query)
+    having nonzero weight, e.g. `similarity_search(query, weights={"image": 0})`
+    skips the images; `fusion="rrf"` switches to rank fusion.
+
+        MMMultiVectorStore(
+            embedding=embeddings,
+            content_serializer=serializer,
+            vector_reader_writers={
+                "text": NumpyVectorReaderWriter(512),
+                "image": NumpyVectorReaderWriter(512),
+            },
+            weights={"text": 1.0, "image": 0.5},
+        )
+    """
+
+    vector_reader_writer: MultiVectorReaderWriter
+
+    def __init__(
+        self,
+        embedding: MMEmbeddings,
+        content_serializer: MMContentSerializer,
+        vector_reader_writers: Dict[str, VectorReaderWriter[DefaultVSearchResult]],
+        *pargs: Any,
+        weights: Optional[Dict[str, float]] = None,
+        fusion: str = "weighted_sum",
+        rrf_k: int = 60,
+        fusion_oversample: int = 1,
+        metrics: Optional[MetricsCollector] = None,
+        **kwargs: Any,
+    ) -> None:
+        missing = embedding.modalities - vector_reader_writers.keys()
+        if missing:
+            raise ValueError(f"No reader-writer for modalities {sorted(missing)}")
+        super().__init__(
+            vector_reader_writer=MultiVectorReaderWriter(
+                vector_reader_writers,
+                weights=weights,
+                fusion=fusion,
+                rrf_k=rrf_k,
+                fusion_oversample=fusion_oversample,
+            ),
+            embedding=embedding,
+            content_serializer=content_serializer,
+            metrics=metrics,
+        )
+
+    def _embed_contents(self, contents: List[MMContent]) -> VectorBatchType:
+        with self.metrics.timer("add.embed", items=len(contents)):
+            return self.vector_reader_writer.stack_vectors(
+                self.embedding.embed_many_by_modality(contents), len(contents)
+            )
+
+    async def _aembed_contents(self, contents: List[MMContent]) -> VectorBatchType:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._embed_contents, contents
+        )
+
+    @staticmethod
+    def _query_kwargs(query: MMContent, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {"modalities": list(query.keys()), **kwargs}
+
+    def similarity_search(
+        self,
+        query: MMContent,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMStoredDocument]:
+        return super().similarity_search(
+            query, k=k, filter=filter, **self._query_kwargs(query, kwargs)
+        )
+
+    async def asimilarity_search(
+        self,
+        query: MMContent,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMStoredDocument]:
+        return await super().asimilarity_search(
+            query, k=k, filter=filter, **self._query_kwargs(query, kwargs)
+        )
+
+    def similarity_search_with_score_and_id(
+        self,
+        query: MMContent,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMSearchHit]:
+        return super().similarity_search_with_score_and_id(
+            query, k=k, filter=filter, **self._query_kwargs(query, kwargs)
+        )
+
+    async def asimilarity_search_with_score_and_id(
+        self,
+        query: MMContent,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List[MMSearchHit]:
+        return await super().asimilarity_search_with_score_and_id(
+            query, k=k, filter=filter, **self._query_kwargs(query, kwargs)
+        )
+
+    def similarity_search_batch(
+        self,
+        queries: List[MMContent],
+        k: int = 4,
+        filters: Optional[List[Optional[Dict[str, str]]]] = None,
+        **kwargs: Any,
+    ) -> List[List[MMStoredDocument]]:
+        """Queries with the same modalities are searched as one batch."""
+        if "modalities" in kwargs:
+            return super().similarity_search_batch(
+                queries, k=k, filters=filters, **kwargs
+            )
+        filters0 = per_query(filters, len(queries))
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for query_i, query in enumerate(queries):
+            groups.setdefault(tuple(sorted(query.keys())), []).append(query_i)
+        results: List[List[MMStoredDocument]] = [[] for _ in queries]
+        for modalities, indices in groups.items():
+            group_results = super().similarity_search_batch(
+                [queries[query_i] for query_i in indices],
+                k=k,
+                filters=[filters0[query_i] for query_i in indices],
+                modalities=modalities,
+                **kwargs,
+            )
+            for query_i, query_results in zip(indices, group_results):
+                results[query_i] = query_results
+        return results
+
+    def close(self) -> None:
+        """Release the search threads of the reader-writer."""
+        self.vector_reader_writer.close()
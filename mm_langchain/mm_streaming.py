@@ -0,0 +1,66 @@
+import queue
+import threading
+from typing import Any, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+# marks the end of the stream in the queue
+_END = object()
+
+
+def batched(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """Group an iterable into lists of (at most) batch_size items."""
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prefetch(items: Iterable[T], max_pending: int = 2) -> Iterator[T]:
+    """
+    Iterate `items` in a background thread, keeping at most `max_pending`
+    items ready ahead of the consumer. This makes a bounded pipeline stage:
+    chaining prefetch() calls runs each stage in its own thread.
+    Exceptions raised while iterating `items` are re-raised to the consumer;
+    if the consumer stops early, the background thread stops as well.
+    """
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_pending))
+    stopped = threading.Event()
+
+    def _put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in items:
+                if not _put((item, None)):
+                    return
+        except BaseException as exc:
+            _put((_END, exc))
+            return
+        _put((_END, None))
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, exc = buffer.get()
+            if item is _END:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from langchain.schema.embeddings import Embeddings
+
+from .mm_embedding_cache import EmbeddingCache, default_namespace, embedding_cache_key
+from .mm_vectors import as_vector_array, as_vector_matrix
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Same as CachedMMEmbeddings, for plain (text-only) LangChain Embeddings.
+    Queries and documents are cached separately, as some models
+    embed them differently.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        cache: Optional[EmbeddingCache] = None,
+        namespace: Optional[str] = None,
+    ) -> None:
+        self.embedding = embedding
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.namespace = namespace or default_namespace(embedding)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [
+            embedding_cache_key(self.namespace, "text:document", text) for text in texts
+        ]
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            vector = self.cache.get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+        if missing:
+            computed = self.embedding.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), as_vector_matrix(computed)))
+            self.cache.put_many(new_items)
+            found.update(new_items)
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_cache_key(self.namespace, "text:query", text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = as_vector_array(self.embedding.embed_query(text))
+            self.cache.put(key, vector)
+        return vector.tolist()
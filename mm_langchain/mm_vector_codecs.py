@@ -0,0 +1,250 @@
+# Binary vector codecs, working on whole batches at once.
+#
+# Every blob starts with an 8-byte header:
+#     b"MV", format version (uint8), codec id (uint8), dimension (uint32 LE)
+# followed by the rows, fixed-size and back-to-back (so a blob may hold
+# one vector or a whole batch). All numbers are little-endian.
+#
+# Codecs:
+#     "float32": lossless                                  4 bytes/component
+#     "float16": half precision                            2 bytes/component
+#     "int8":    per-vector scale (float32) + int8 values  1 byte/component
+#     "bit":     sign only, decoded as +1/-1               1 bit/component
+import struct
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .mm_vectors import VECTOR_DTYPE, VectorBatchType, VectorType, as_vector_matrix
+
+CODEC_FORMAT_VERSION = 1
+
+_MAGIC = b"MV"
+_HEADER = struct.Struct("<2sBBI")
+HEADER_SIZE = _HEADER.size
+
+
+class VectorCodec(ABC):
+    name: str
+    codec_id: int
+
+    @abstractmethod
+    def row_size(self, dimension: int) -> int:
+        """Bytes taken by one encoded vector."""
+
+    @abstractmethod
+    def encode_rows(self, matrix: np.ndarray) -> bytes:
+        """Encode a 2-D float32 matrix into its rows, back-to-back."""
+
+    @abstractmethod
+    def decode_rows(self, payload: bytes, dimension: int) -> np.ndarray:
+        """Decode back-to-back rows into a 2-D float32 matrix."""
+
+    def dot_rows(self, payload: bytes, dimension: int, query: np.ndarray) -> np.ndarray:
+        """
+        Dot products of the (decoded) rows with a query vector.
+        Codecs can do this without fully decoding the rows.
+        """
+        return self.decode_rows(payload, dimension) @ query
+
+
+class Float32Codec(VectorCodec):
+    name = "float32"
+    codec_id = 1
+
+    def row_size(self, dimension: int) -> int:
+        return 4 * dimension
+
+    def encode_rows(self, matrix: np.ndarray) -> bytes:
+        return matrix.astype("<f4", copy=False).tobytes()
+
+    def decode_rows(self, payload: bytes, dimension: int) -> np.ndarray:
+        # a read-only view over the payload (no copy on little-endian hosts)
+        return (
+            np.frombuffer(payload, dtype="<f4")
+            .reshape(-1, dimension)
+            .astype(VECTOR_DTYPE, copy=False)
+        )
+
+
+class Float16Codec(VectorCodec):
+    name = "float16"
+    codec_id = 2
+
+    def row_size(self, dimension: int) -> int:
+        return 2 * dimension
+
+    def encode_rows(self, matrix: np.ndarray) -> bytes:
+        return matrix.astype("<f2").tobytes()
+
+    def decode_rows(self, payload: bytes, dimension: int) -> np.ndarray:
+        return (
+            np.frombuffer(payload, dtype="<f2")
+            .reshape(-1, dimension)
+            .astype(VECTOR_DTYPE)
+        )
+
+
+class Int8Codec(VectorCodec):
+    """Symmetric quantization: value ~= scale * q, q in [-127, 127]."""
+
+    name = "int8"
+    codec_id = 3
+
+    @staticmethod
+    def _row_dtype(dimension: int) -> np.dtype:
+        return np.dtype([("scale", "<f4"), ("values", "i1", (dimension,))])
+
+    def row_size(self, dimension: int) -> int:
+        return 4 + dimension
+
+    def encode_rows(self, matrix: np.ndarray) -> bytes:
+        rows = np.empty(matrix.shape[0], dtype=self._row_dtype(matrix.shape[1]))
+        scales = np.abs(matrix).max(axis=1, initial=0.0) / 127.0
+        safe_scales = np.where(scales > 0, scales, 1.0)
+        rows["scale"] = scales
+        rows["values"] = np.rint(matrix / safe_scales[:, None])
+        return rows.tobytes()
+
+    def decode_rows(self, payload: bytes, dimension: int) -> np.ndarray:
+        rows = np.frombuffer(payload, dtype=self._row_dtype(dimension))
+        return (rows["values"] * rows["scale"][:, None]).astype(VECTOR_DTYPE)
+
+    def dot_rows(self, payload: bytes, dimension: int, query: np.ndarray) -> np.ndarray:
+        rows = np.frombuffer(payload, dtype=self._row_dtype(dimension))
+        return (rows["values"] @ query) * rows["scale"]
+
+
+class BitCodec(VectorCodec):
+    """Keeps the sign only: good enough for a first-pass cosine/Hamming scan."""
+
+    name = "bit"
+    codec_id = 4
+
+    def row_size(self, dimension: int) -> int:
+        return (dimension + 7) // 8
+
+    def encode_rows(self, matrix: np.ndarray) -> bytes:
+        return np.packbits(matrix > 0, axis=1).tobytes()
+
+    def decode_rows(self, payload: bytes, dimension: int) -> np.ndarray:
+        packed = np.frombuffer(payload, dtype=np.uint8).reshape(
+            -1, self.row_size(dimension)
+        )
+        bits = np.unpackbits(packed, axis=1, count=dimension)
+        return bits.astype(VECTOR_DTYPE) * 2 - 1
+
+    def dot_rows(self, payload: bytes, dimension: int, query: np.ndarray) -> np.ndarray:
+        # table lookup, one byte at a time: with s = 2 * bit - 1,
+        # s . q = 2 * (sum of q over the set bits) - sum(q)
+        row_size = self.row_size(dimension)
+        packed = np.frombuffer(payload, dtype=np.uint8).reshape(-1, row_size)
+        padded_query = np.zeros(8 * row_size, dtype=VECTOR_DTYPE)
+        padded_query[:dimension] = query
+        byte_bits = np.unpackbits(
+            np.arange(256, dtype=np.uint8)[:, None], axis=1
+        ).astype(VECTOR_DTYPE)
+        # (row_size, 256): sum of the query over the bits of each byte value
+        table = padded_query.reshape(row_size, 8) @ byte_bits.T
+        set_sums = table[np.arange(row_size), packed].sum(axis=1)
+        return 2 * set_sums - query.sum()
+
+
+VECTOR_CODECS: Dict[str, VectorCodec] = {
+    codec.name: codec
+    for codec in (Float32Codec(), Float16Codec(), Int8Codec(), BitCodec())
+}
+_CODECS_BY_ID: Dict[int, VectorCodec] = {
+    codec.codec_id: codec for codec in VECTOR_CODECS.values()
+}
+
+
+def get_vector_codec(name: str) -> VectorCodec:
+    try:
+        return VECTOR_CODECS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown vector codec '{name}' (known: {', '.join(VECTOR_CODECS)})"
+        )
+
+
+def _header(codec: VectorCodec, dimension: int) -> bytes:
+    return _HEADER.pack(_MAGIC, CODEC_FORMAT_VERSION, codec.codec_id, dimension)
+
+
+def _parse_header(blob: bytes) -> Tuple[VectorCodec, int]:
+    if len(blob) < HEADER_SIZE:
+        raise ValueError("Vector blob too short")
+    magic, version, codec_id, dimension = _HEADER.unpack_from(blob)
+    if magic != _MAGIC:
+        raise ValueError("Not a vector blob")
+    if version != CODEC_FORMAT_VERSION:
+        raise ValueError(f"Unsupported vector blob version {version}")
+    if codec_id not in _CODECS_BY_ID:
+        raise ValueError(f"Unknown vector codec id {codec_id}")
+    return _CODECS_BY_ID[codec_id], dimension
+
+
+def encode_vectors(vectors: VectorBatchType, codec: str = "float32") -> bytes:
+    """Encode a whole batch into a single blob."""
+    vector_codec = get_vector_codec(codec)
+    matrix = as_vector_matrix(vectors)
+    return _header(vector_codec, matrix.shape[1]) + vector_codec.encode_rows(matrix)
+
+
+def decode_vectors(blob: bytes) -> np.ndarray:
+    """Decode a blob from encode_vectors (or encode_vector) into a 2-D array."""
+    vector_codec, dimension = _parse_header(blob)
+    payload = memoryview(blob)[HEADER_SIZE:]
+    if len(payload) % vector_codec.row_size(dimension) != 0:
+        raise ValueError("Truncated vector blob")
+    return vector_codec.decode_rows(payload, dimension)
+
+
+def encode_vector(vector: VectorType, codec: str = "float32") -> bytes:
+    return encode_vectors([vector], codec=codec)
+
+
+def decode_vector(blob: bytes) -> np.ndarray:
+    matrix = decode_vectors(blob)
+    if matrix.shape[0] != 1:
+        raise ValueError(f"Expected a single vector, found {matrix.shape[0]}")
+    return matrix[0]
+
+
+def encode_vector_rows(vectors: VectorBatchType, codec: str = "float32") -> List[bytes]:
+    """
+    Encode a batch into one blob per vector (e.g. one per table row).
+    The batch is encoded in one go and then sliced.
+    """
+    vector_codec = get_vector_codec(codec)
+    matrix = as_vector_matrix(vectors)
+    if matrix.shape[0] == 0:
+        return []
+    header = _header(vector_codec, matrix.shape[1])
+    payload = vector_codec.encode_rows(matrix)
+    row_size = vector_codec.row_size(matrix.shape[1])
+    return [
+        header + payload[start : start + row_size]
+        for start in range(0, len(payload), row_size)
+    ]
+
+
+def decode_vector_rows(blobs: List[bytes]) -> np.ndarray:
+    """
+    Decode single-vector blobs (from encode_vector_rows / encode_vector)
+    into a 2-D array, with one decoding pass if they all share codec
+    and dimension.
+    """
+    if not blobs:
+        return np.empty((0, 0), dtype=VECTOR_DTYPE)
+    header = bytes(blobs[0][:HEADER_SIZE])
+    if all(blob[:HEADER_SIZE] == header for blob in blobs):
+        vector_codec, dimension = _parse_header(header)
+        payload = b"".join(memoryview(blob)[HEADER_SIZE:] for blob in blobs)
+        if len(payload) != len(blobs) * vector_codec.row_size(dimension):
+            raise ValueError("Expected one vector per blob")
+        return vector_codec.decode_rows(payload, dimension)
+    else:
+        return as_vector_matrix([decode_vector(blob) for blob in blobs])
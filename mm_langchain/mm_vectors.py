@@ -0,0 +1,46 @@
+# Array-native vector path: vectors travel between embeddings, stores and
+# reader-writers as contiguous float32 arrays (1-D single, 2-D batch).
+# Lists of floats are accepted too; going back to lists is left
+# to the driver boundary (e.g. the cassio table calls).
+from typing import Iterable, List, Union
+
+import numpy as np
+
+# a single vector, either as list of floats or as a 1-D array
+VectorType = Union[List[float], np.ndarray]
+
+# a batch of vectors: a 2-D array or any iterable of single vectors
+VectorBatchType = Union[np.ndarray, Iterable[VectorType]]
+
+VECTOR_DTYPE = np.float32
+
+
+def as_vector_array(vector: VectorType) -> np.ndarray:
+    """Make a single vector into a contiguous 1-D float32 array (copying if needed)."""
+    array = np.ascontiguousarray(vector, dtype=VECTOR_DTYPE)
+    if array.ndim != 1:
+        raise ValueError(f"Expected a 1-D vector, got shape {array.shape}")
+    return array
+
+
+def as_vector_matrix(vectors: VectorBatchType) -> np.ndarray:
+    """Make a batch of vectors into a contiguous 2-D float32 array."""
+    if isinstance(vectors, np.ndarray):
+        matrix = np.ascontiguousarray(vectors, dtype=VECTOR_DTYPE)
+    else:
+        rows = [as_vector_array(vector) for vector in vectors]
+        if rows:
+            matrix = np.stack(rows)
+        else:
+            matrix = np.empty((0, 0), dtype=VECTOR_DTYPE)
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D batch of vectors, got shape {matrix.shape}")
+    return matrix
+
+
+def to_vector_list(vector: VectorType) -> List[float]:
+    """The driver-boundary conversion: a list of Python floats."""
+    if isinstance(vector, np.ndarray):
+        return vector.tolist()
+    else:
+        return list(vector)
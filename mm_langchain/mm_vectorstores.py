@@ -1,63 +1,330 @@
+import asyncio
+import base64
+import heapq
 import uuid
-from typing import Any, Dict, Iterable, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
 
-## Components from langchain
-from langchain.schema.document import Document
-from langchain.schema.embeddings import Embeddings
+import numpy as np
 
-from .mm_types import DefaultVSearchResult, MMContent, MMStoredDocument
+from .mm_types import DefaultVSearchResult
 from .mm_abstract_vectorstores import (
-    MMVectorStore,
+    MMBulkWriteError,
+    MMDefaultVectorStore,
     VectorReaderWriter,
     VectorStore,
+    per_query,
 )
 from .mm_abstract_embeddings import MMEmbeddings, MMContentSerializer
+from .mm_vectors import (
+    VectorBatchType,
+    VectorType,
+    as_vector_array,
+    as_vector_matrix,
+    to_vector_list,
+)
+from .mm_vector_codecs import (
+    HEADER_SIZE,
+    decode_vector_rows,
+    encode_vector_rows,
+    get_vector_codec,
+)
+from .mm_model_registry import resolve_vector_dimension
+from .mm_metrics import MetricsCollector
+
+from cassandra.cluster import ResponseFuture
+from cassio.table import (
+    ClusteredMetadataVectorCassandraTable,
+    MetadataVectorCassandraTable,
+)
+from cassio.table.cql import CQLOpType
+
+if TYPE_CHECKING:
+    # components from langchain (slow to import: see Cassandra._to_documents)
+    from langchain.schema.document import Document
+    from langchain.schema.embeddings import Embeddings
+
+
+def _as_asyncio_future(response_future: ResponseFuture) -> "asyncio.Future[Any]":
+    """Bridge a driver ResponseFuture to the running event loop."""
+    loop = asyncio.get_running_loop()
+    a_future = loop.create_future()
+
+    def _set_result(result: Any) -> None:
+        if not a_future.done():
+            a_future.set_result(result)
+
+    def _set_exception(exc: BaseException) -> None:
+        if not a_future.done():
+            a_future.set_exception(exc)
+
+    response_future.add_callbacks(
+        callback=lambda result: loop.call_soon_threadsafe(_set_result, result),
+        errback=lambda exc: loop.call_soon_threadsafe(_set_exception, exc),
+    )
+    return a_future
 
-from cassio.table import MetadataVectorCassandraTable
+
+# (non-indexed) metadata key holding the full vector in two-stage mode
+FULL_VECTOR_METADATA_KEY = "_mm_full_vector"
 
 
 class CassandraVectorReaderWriter(VectorReaderWriter[DefaultVSearchResult]):
+    """
+    Two-stage search (opt-in, with `search_dimension` < `vector_dimension`):
+    the table's vector column (hence the ANN index) holds only the first
+    `search_dimension` components, while the full vector is kept, encoded
+    with `full_vector_codec`, in a non-indexed metadata field.
+    A search retrieves `k * oversample` candidates with the truncated query
+    and rescores them with the full vectors.
+    The ANN index shrinks by `vector_dimension / search_dimension`, but
+    the full vector is stored too (base64-encoded): with the default
+    "float32" codec rescoring is exact, and rows grow (512 -> 128: 1.59x);
+    "float16" or "int8" make rescoring approximate and rows smaller
+    (0.92x, 0.59x). See row_storage, and mm_benchmarks.bench_rescoring
+    for the recall of these layouts: the vectors of models not trained
+    for truncation (e.g. CLIP) lose much of it at small search_dimension.
+    This changes the table schema: use a new table for it.
+
+    Partitioned mode (opt-in, with `partition_field`): the table is
+    partitioned by the (string) value of that metadata field, which every
+    written entry must have. A search whose metadata filter includes it
+    only runs on that partition; other searches must name the partitions
+    to search (`partitions=[...]`) or opt in to searching all of them
+    (`all_partitions=True`), as one query per partition with merged results.
+    Also this needs a new table. With incremental ingestion, include the
+    field in `id_metadata_fields` (equal contents in two partitions).
+    """
+
     def __init__(
         self,
         table_name: str,
         vector_dimension: int,
+        write_concurrency: int = 16,
+        search_dimension: Optional[int] = None,
+        oversample: int = 4,
+        full_vector_codec: str = "float32",
+        partition_field: Optional[str] = None,
     ) -> None:
-        self.table = MetadataVectorCassandraTable(
-            table=table_name,
-            vector_dimension=vector_dimension,
+        if search_dimension is not None and not (
+            0 < search_dimension <= vector_dimension
+        ):
+            raise ValueError("search_dimension must be in [1, vector_dimension]")
+        self.vector_dimension = vector_dimension
+        self.search_dimension = search_dimension
+        self.oversample = oversample
+        self.full_vector_codec = full_vector_codec
+        self.partition_field = partition_field
+        table_kwargs: Dict[str, Any] = {"table": table_name}
+        if search_dimension is None:
+            table_kwargs["vector_dimension"] = vector_dimension
+        else:
+            table_kwargs["vector_dimension"] = search_dimension
+            table_kwargs["metadata_indexing"] = (
+                "deny_list",
+                [FULL_VECTOR_METADATA_KEY],
+            )
+        self.table: Any
+        if partition_field is None:
+            self.table = MetadataVectorCassandraTable(**table_kwargs)
+        else:
+            self.table = ClusteredMetadataVectorCassandraTable(
+                partition_id_type=["TEXT"], **table_kwargs
+            )
+        self.write_concurrency = write_concurrency
+
+    @staticmethod
+    def row_storage(
+        vector_dimension: int,
+        search_dimension: Optional[int] = None,
+        full_vector_codec: str = "float32",
+    ) -> Dict[str, int]:
+        """
+        Bytes per row of the vector data, for a table layout:
+        the (indexed) vector column and the full vector in the metadata.
+        """
+        if search_dimension is None:
+            return {"vector_column": 4 * vector_dimension, "full_vector_metadata": 0}
+        blob_size = HEADER_SIZE + get_vector_codec(full_vector_codec).row_size(
+            vector_dimension
+        )
+        return {
+            "vector_column": 4 * search_dimension,
+            # (base64 text)
+            "full_vector_metadata": 4 * ((blob_size + 2) // 3),
+        }
+
+    def _rows_to_write(
+        self, vectors: List[VectorType], metadatas: List[dict]
+    ) -> Tuple[List[List[float]], List[dict]]:
+        """The (vector, metadata) column values for each row to write."""
+        if self.search_dimension is None:
+            return [to_vector_list(vector) for vector in vectors], metadatas
+        matrix = as_vector_matrix(vectors)
+        full_vector_blobs = encode_vector_rows(matrix, codec=self.full_vector_codec)
+        return (
+            matrix[:, : self.search_dimension].tolist(),
+            [
+                {
+                    **metadata,
+                    FULL_VECTOR_METADATA_KEY: base64.b64encode(blob).decode(),
+                }
+                for metadata, blob in zip(metadatas, full_vector_blobs)
+            ],
         )
 
+    def _partition_kwargs(self, metadatas: List[dict]) -> List[Dict[str, Any]]:
+        """The extra primary-key arguments for each row (partitioned mode)."""
+        if self.partition_field is None:
+            return [{}] * len(metadatas)
+        missing = sum(
+            1 for metadata in metadatas if self.partition_field not in metadata
+        )
+        if missing:
+            raise ValueError(
+                f"{missing} entries lack the partition field '{self.partition_field}'"
+            )
+        return [
+            {"partition_id": str(metadata[self.partition_field])}
+            for metadata in metadatas
+        ]
+
     def store_contents(
         self,
         contents_str: Iterable[str],
-        vectors: Iterable[List[float]],
+        vectors: VectorBatchType,
         metadatas: Optional[Iterable[dict]] = None,
         ids: Optional[Iterable[str]] = None,
+        concurrency: Optional[int] = None,
         **kwargs: Any,
     ) -> List[str]:
-        # silly reference implementation
+        """
+        Writes are issued asynchronously, with at most `concurrency`
+        (default: self.write_concurrency) of them in flight at any time.
+        If some rows fail, the others are still written and
+        a MMBulkWriteError is raised at the end.
+        """
+        window = max(1, concurrency or self.write_concurrency)
         contents0 = list(contents_str)
         vectors0 = list(vectors)
         metadatas0 = list(metadatas) if metadatas else [{}] * len(contents0)
         ids0 = list(ids) if ids else [uuid.uuid4().hex for _ in contents0]
-        inserteds = []
-        for xco, xve, xme, xid in zip(contents0, vectors0, metadatas0, ids0):
-            self.table.put(
-                row_id=xid,
-                body_blob=xco,
-                vector=xve,
-                metadata=xme,
+        # (before writing anything)
+        self._partition_kwargs(metadatas0)
+        with self.metrics.timer("cassandra.write", items=len(contents0)) as timer:
+            if self.metrics.enabled:
+                timer.nbytes = sum(len(content) for content in contents0)
+            return self._store_rows(
+                contents0, vectors0, metadatas0, ids0, window=window
             )
-            inserteds.append(xid)
+
+    def _store_rows(
+        self,
+        contents0: List[str],
+        vectors0: List[VectorType],
+        metadatas0: List[dict],
+        ids0: List[str],
+        window: int,
+    ) -> List[str]:
+        key_kwargss = self._partition_kwargs(metadatas0)
+        vectors1, metadatas1 = self._rows_to_write(vectors0, metadatas0)
+        #
+        inserteds: List[str] = []
+        failures: Dict[str, Exception] = {}
+        in_flight: Deque[Tuple[str, ResponseFuture]] = deque()
+
+        def _collect(row_id: str, future: ResponseFuture) -> None:
+            try:
+                future.result()
+                inserteds.append(row_id)
+            except Exception as exc:
+                failures[row_id] = exc
+
+        for xco, xve, xme, xid, xkw in zip(
+            contents0, vectors1, metadatas1, ids0, key_kwargss
+        ):
+            if len(in_flight) >= window:
+                _collect(*in_flight.popleft())
+            try:
+                future = self.table.put_async(
+                    row_id=xid,
+                    body_blob=xco,
+                    vector=xve,
+                    metadata=xme,
+                    **xkw,
+                )
+            except Exception as exc:
+                # e.g. failure to bind values for this row
+                failures[xid] = exc
+                continue
+            in_flight.append((xid, future))
+        while in_flight:
+            _collect(*in_flight.popleft())
+        #
+        if failures:
+            raise MMBulkWriteError(inserted_ids=inserteds, failures=failures)
         return inserteds
 
-    def search_by_vector(
+    async def astore_contents(
         self,
-        vector: List[float],
-        k: int = 4,
-        metadata: Optional[dict] = None,
+        contents_str: Iterable[str],
+        vectors: VectorBatchType,
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[Iterable[str]] = None,
+        concurrency: Optional[int] = None,
         **kwargs: Any,
-    ) -> List[DefaultVSearchResult]:
+    ) -> List[str]:
+        """
+        Same as store_contents, awaiting the driver futures
+        instead of blocking on them.
+        """
+        window = asyncio.Semaphore(max(1, concurrency or self.write_concurrency))
+        contents0 = list(contents_str)
+        vectors0 = list(vectors)
+        metadatas0 = list(metadatas) if metadatas else [{}] * len(contents0)
+        ids0 = list(ids) if ids else [uuid.uuid4().hex for _ in contents0]
+        key_kwargss = self._partition_kwargs(metadatas0)
+        vectors0, metadatas0 = self._rows_to_write(vectors0, metadatas0)
+
+        async def _put(
+            xco: str, xve: List[float], xme: dict, xid: str, xkw: Dict[str, Any]
+        ) -> Optional[Exception]:
+            async with window:
+                try:
+                    await _as_asyncio_future(
+                        self.table.put_async(
+                            row_id=xid,
+                            body_blob=xco,
+                            vector=xve,
+                            metadata=xme,
+                            **xkw,
+                        )
+                    )
+                    return None
+                except Exception as exc:
+                    return exc
+
+        with self.metrics.timer("cassandra.write", items=len(contents0)) as timer:
+            if self.metrics.enabled:
+                timer.nbytes = sum(len(content) for content in contents0)
+            outcomes = await asyncio.gather(
+                *(
+                    _put(xco, xve, xme, xid, xkw)
+                    for xco, xve, xme, xid, xkw in zip(
+                        contents0, vectors0, metadatas0, ids0, key_kwargss
+                    )
+                )
+            )
+        inserteds = [xid for xid, exc in zip(ids0, outcomes) if exc is None]
+        failures = {xid: exc for xid, exc in zip(ids0, outcomes) if exc is not None}
+        if failures:
+            raise MMBulkWriteError(inserted_ids=inserteds, failures=failures)
+        return inserteds
+
+    @staticmethod
+    def _to_search_results(rows: Iterable[dict]) -> List[DefaultVSearchResult]:
         return [
             (
                 result["row_id"],
@@ -65,15 +332,255 @@ class CassandraVectorReaderWriter(VectorReaderWriter[DefaultVSearchResult]):
                 result["metadata"],
                 result["distance"],
             )
-            for result in self.table.metric_ann_search(
-                vector=vector,
-                n=k,
-                metadata=metadata,
-                metric="cos",
-                metric_threshold=None,
+            for result in rows
+        ]
+
+    def existing_ids(
+        self,
+        ids: List[str],
+        metadatas: Optional[List[dict]] = None,
+        concurrency: Optional[int] = None,
+    ) -> Set[str]:
+        """
+        One primary-key read per id, issued asynchronously with
+        at most `concurrency` (default: self.write_concurrency) in flight.
+        In partitioned mode the metadatas are required (for the partition).
+        """
+        window = max(1, concurrency or self.write_concurrency)
+        if self.partition_field is None:
+            cql = "SELECT row_id FROM {table_fqname} WHERE row_id = %s;"
+            argss = [(row_id,) for row_id in ids]
+        else:
+            if metadatas is None:
+                raise ValueError("Partitioned table: existing_ids needs the metadatas")
+            cql = (
+                "SELECT row_id FROM {table_fqname} "
+                "WHERE partition_id = %s AND row_id = %s;"
+            )
+            argss = [
+                (key_kwargs["partition_id"], row_id)
+                for key_kwargs, row_id in zip(self._partition_kwargs(metadatas), ids)
+            ]
+        found: Set[str] = set()
+        in_flight: Deque[Tuple[str, ResponseFuture]] = deque()
+
+        def _collect(row_id: str, future: ResponseFuture) -> None:
+            if list(future.result()):
+                found.add(row_id)
+
+        for row_id, args in zip(ids, argss):
+            if len(in_flight) >= window:
+                _collect(*in_flight.popleft())
+            in_flight.append(
+                (
+                    row_id,
+                    self.table.execute_cql_async(
+                        cql, op_type=CQLOpType.READ, args=args
+                    ),
+                )
+            )
+        while in_flight:
+            _collect(*in_flight.popleft())
+        return found
+
+    def partition_ids(self) -> List[str]:
+        """All partitions in the table (a full token-range scan)."""
+        if self.partition_field is None:
+            raise ValueError("The table is not partitioned")
+        rows = self.table.execute_cql(
+            "SELECT DISTINCT partition_id FROM {table_fqname};",
+            op_type=CQLOpType.READ,
+        )
+        return [
+            row["partition_id"] if isinstance(row, dict) else row.partition_id
+            for row in rows
+        ]
+
+    def _search_plan(
+        self,
+        metadata: Optional[dict],
+        partitions: Optional[List[str]],
+        all_partitions: bool,
+    ) -> Tuple[Optional[List[str]], Optional[dict]]:
+        """
+        The partitions to query (None: the table is not partitioned)
+        and the metadata filter left to apply within them.
+        """
+        if self.partition_field is None:
+            if partitions is not None or all_partitions:
+                raise ValueError("The table is not partitioned")
+            return None, metadata
+        metadata0 = dict(metadata or {})
+        if self.partition_field in metadata0:
+            return [str(metadata0.pop(self.partition_field))], metadata0
+        if partitions is not None:
+            return [str(partition) for partition in partitions], metadata0
+        if all_partitions:
+            return self.partition_ids(), metadata0
+        raise ValueError(
+            f"Partitioned table: filter on '{self.partition_field}', or pass "
+            "partitions=[...] or all_partitions=True for a cross-partition search"
+        )
+
+    def _ann_rows(
+        self,
+        ann_vector: List[float],
+        ann_n: int,
+        metadata: Optional[dict],
+        partition_ids: Optional[List[str]],
+    ) -> List[dict]:
+        def _search(key_kwargs: Dict[str, Any]) -> List[dict]:
+            # (rows are fetched while iterating)
+            return list(
+                self.table.metric_ann_search(
+                    vector=ann_vector,
+                    n=ann_n,
+                    metadata=metadata,
+                    metric="cos",
+                    metric_threshold=None,
+                    **key_kwargs,
+                )
+            )
+
+        if partition_ids is None:
+            return _search({})
+        key_kwargss = [{"partition_id": partition_id} for partition_id in partition_ids]
+        if len(key_kwargss) <= 1:
+            return list(chain.from_iterable(map(_search, key_kwargss)))
+        with ThreadPoolExecutor(
+            max_workers=min(len(key_kwargss), self.write_concurrency)
+        ) as executor:
+            return self._merge_rows(executor.map(_search, key_kwargss), ann_n)
+
+    async def _aann_rows(
+        self,
+        ann_vector: List[float],
+        ann_n: int,
+        metadata: Optional[dict],
+        partition_ids: Optional[List[str]],
+    ) -> List[dict]:
+        async def _search(key_kwargs: Dict[str, Any]) -> List[dict]:
+            return list(
+                await self.table.ametric_ann_search(
+                    vector=ann_vector,
+                    n=ann_n,
+                    metadata=metadata,
+                    metric="cos",
+                    metric_threshold=None,
+                    **key_kwargs,
+                )
+            )
+
+        if partition_ids is None:
+            return await _search({})
+        return self._merge_rows(
+            await asyncio.gather(
+                *(
+                    _search({"partition_id": partition_id})
+                    for partition_id in partition_ids
+                )
+            ),
+            ann_n,
+        )
+
+    @staticmethod
+    def _merge_rows(rows_by_partition: Iterable[List[dict]], n: int) -> List[dict]:
+        """The overall top n of per-partition results (by decreasing similarity)."""
+        return heapq.nlargest(
+            n, chain.from_iterable(rows_by_partition), key=lambda row: row["distance"]
+        )
+
+    def _ann_query(
+        self, vector: VectorType, k: int, oversample: Optional[int]
+    ) -> Tuple[List[float], int]:
+        """The query vector and number of rows for the ANN search."""
+        if self.search_dimension is None:
+            return to_vector_list(vector), k
+        query = as_vector_array(vector)[: self.search_dimension]
+        return query.tolist(), k * (oversample or self.oversample)
+
+    def _rescore(
+        self, rows: Iterable[dict], vector: VectorType, k: int
+    ) -> List[DefaultVSearchResult]:
+        """Second stage: exact cosine with the full vectors, then top k."""
+        rows0 = list(rows)
+        if not rows0:
+            return []
+        with self.metrics.timer("cassandra.rescore", items=len(rows0)):
+            return self._rescore_rows(rows0, vector, k)
+
+    def _rescore_rows(
+        self, rows0: List[dict], vector: VectorType, k: int
+    ) -> List[DefaultVSearchResult]:
+        full_vectors = decode_vector_rows(
+            [
+                base64.b64decode(row["metadata"].pop(FULL_VECTOR_METADATA_KEY))
+                for row in rows0
+            ]
+        )
+        query = as_vector_array(vector)
+        norms = np.linalg.norm(full_vectors, axis=1) * np.linalg.norm(query)
+        norms[norms == 0] = 1.0
+        scores = (full_vectors @ query) / norms
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [
+            (
+                rows0[row_i]["row_id"],
+                rows0[row_i]["body_blob"],
+                rows0[row_i]["metadata"],
+                float(scores[row_i]),
             )
+            for row_i in top.tolist()
         ]
 
+    def search_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        metadata: Optional[dict] = None,
+        oversample: Optional[int] = None,
+        partitions: Optional[List[str]] = None,
+        all_partitions: bool = False,
+        **kwargs: Any,
+    ) -> List[DefaultVSearchResult]:
+        """
+        partitions, all_partitions: for searches not filtering on the
+        partition field of a partitioned table (see the class docstring).
+        """
+        partition_ids, metadata0 = self._search_plan(
+            metadata, partitions, all_partitions
+        )
+        ann_vector, ann_n = self._ann_query(vector, k, oversample)
+        with self.metrics.timer("cassandra.ann_query") as timer:
+            rows = self._ann_rows(ann_vector, ann_n, metadata0, partition_ids)
+            timer.items = len(rows)
+        if self.search_dimension is None:
+            return self._to_search_results(rows)
+        else:
+            return self._rescore(rows, vector, k)
+
+    async def asearch_by_vector(
+        self,
+        vector: VectorType,
+        k: int = 4,
+        metadata: Optional[dict] = None,
+        oversample: Optional[int] = None,
+        partitions: Optional[List[str]] = None,
+        all_partitions: bool = False,
+        **kwargs: Any,
+    ) -> List[DefaultVSearchResult]:
+        partition_ids, metadata0 = self._search_plan(
+            metadata, partitions, all_partitions
+        )
+        ann_vector, ann_n = self._ann_query(vector, k, oversample)
+        with self.metrics.timer("cassandra.ann_query") as timer:
+            rows = await self._aann_rows(ann_vector, ann_n, metadata0, partition_ids)
+            timer.items = len(rows)
+        if self.search_dimension is None:
+            return self._to_search_results(rows)
+        else:
+            return self._rescore(rows, vector, k)
+
     def clear(self):
         self.table.clear()
 
@@ -86,18 +593,38 @@ class Cassandra(VectorStore[DefaultVSearchResult]):
         else:
             return filter_dict
 
+    @staticmethod
+    def _to_documents(results: List[DefaultVSearchResult]) -> List["Document"]:
+        # imported here: the import of langchain.schema takes a good part
+        # of the startup time of a process only using the mm stores
+        from langchain.schema.document import Document
+
+        return [
+            Document(page_content=rbl, metadata=rme) for (rid, rbl, rme, rsi) in results
+        ]
+
     def __init__(
         self,
-        embedding: Embeddings,
+        embedding: "Embeddings",
         table_name: str,
+        vector_dimension: Optional[int] = None,
+        partition_field: Optional[str] = None,
     ):
+        """
+        If vector_dimension is not given (nor known for the embedding's model,
+        see mm_model_registry), a sample sentence is embedded to find it.
+        partition_field: see the partitioned mode of CassandraVectorReaderWriter.
+        """
         self.embedding = embedding
-        self._embedding_dimension = len(
-            embedding.embed_query("This is a sample sentence.")
+        self._embedding_dimension = resolve_vector_dimension(
+            embedding,
+            vector_dimension,
+            lambda: len(embedding.embed_query("This is a sample sentence.")),
         )
         self.vector_reader_writer = CassandraVectorReaderWriter(
             table_name=table_name,
             vector_dimension=self._embedding_dimension,
+            partition_field=partition_field,
         )
 
     def similarity_search(
@@ -106,78 +633,110 @@ class Cassandra(VectorStore[DefaultVSearchResult]):
         k: int = 4,
         filter: Optional[Dict[str, str]] = None,
         **kwargs: Any,
-    ) -> List[Document]:
+    ) -> List["Document"]:
         """Return docs most similar to query."""
         search_metadata = self._filter_to_metadata(filter)
         search_vector = self.embedding.embed_query(query)
-        return [
-            Document(page_content=rbl, metadata=rme)
-            for (rid, rbl, rme, rsi) in self.vector_reader_writer.search_by_vector(
+        return self._to_documents(
+            self.vector_reader_writer.search_by_vector(
                 vector=search_vector,
                 k=k,
                 metadata=search_metadata,
                 **kwargs,
             )
+        )
+
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filters: Optional[List[Optional[Dict[str, str]]]] = None,
+        **kwargs: Any,
+    ) -> List[List["Document"]]:
+        """
+        Return docs most similar to each query, in input order.
+        The queries are embedded one by one with embed_query (not in
+        one embed_documents call: models such as e5 or bge embed
+        queries and documents differently), then searched concurrently.
+        """
+        search_metadatas = [
+            self._filter_to_metadata(filter)
+            for filter in per_query(filters, len(queries))
+        ]
+        return [
+            self._to_documents(results)
+            for results in self.vector_reader_writer.search_by_vectors(
+                vectors=[self.embedding.embed_query(query) for query in queries],
+                k=k,
+                metadatas=search_metadatas,
+                **kwargs,
+            )
         ]
 
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> List["Document"]:
+        search_metadata = self._filter_to_metadata(filter)
+        search_vector = await self.embedding.aembed_query(query)
+        results = await self.vector_reader_writer.asearch_by_vector(
+            vector=search_vector,
+            k=k,
+            metadata=search_metadata,
+            **kwargs,
+        )
+        return self._to_documents(results)
 
-class MMCassandra(MMVectorStore[DefaultVSearchResult]):
-    @staticmethod
-    def _filter_to_metadata(filter_dict: Optional[Dict[str, str]]) -> Dict[str, Any]:
-        if filter_dict is None:
-            return {}
-        else:
-            return filter_dict
 
+class MMCassandra(MMDefaultVectorStore):
     def __init__(
         self,
         embedding: MMEmbeddings,
         content_serializer: MMContentSerializer,
         table_name: str,
         *pargs,
+        vector_dimension: Optional[int] = None,
+        search_dimension: Optional[int] = None,
+        oversample: int = 4,
+        full_vector_codec: str = "float32",
+        partition_field: Optional[str] = None,
+        metrics: Optional[MetricsCollector] = None,
         **kwargs,
     ) -> None:
-        self._embedding_dimension = len(
-            embedding.embed_one({"text": "This is a sample sentence."})
+        """
+        vector_dimension: if not given (nor known for the embedding's model,
+        see mm_model_registry), a sample sentence is embedded to find it.
+        search_dimension, oversample, full_vector_codec: see the two-stage
+        search in CassandraVectorReaderWriter (off by default).
+        partition_field: see the partitioned mode of CassandraVectorReaderWriter
+        (off by default).
+        metrics: a MetricsCollector for the per-stage timings (see mm_metrics).
+        """
+        self._embedding_dimension = resolve_vector_dimension(
+            embedding,
+            vector_dimension,
+            lambda: len(
+                embedding.embed_one_array({"text": "This is a sample sentence."})
+            ),
         )
         vector_rw = CassandraVectorReaderWriter(
             table_name=table_name,
             vector_dimension=self._embedding_dimension,
+            search_dimension=search_dimension,
+            oversample=oversample,
+            full_vector_codec=full_vector_codec,
+            partition_field=partition_field,
         )
         super().__init__(
             vector_reader_writer=vector_rw,
             embedding=embedding,
             content_serializer=content_serializer,
+            metrics=metrics,
         )
 
     @property
     def embeddings(self) -> Optional[MMEmbeddings]:
         raise NotImplementedError
-
-    def similarity_search(
-        self,
-        query: MMContent,
-        k: int = 4,
-        filter: Optional[Dict[str, str]] = None,
-        **kwargs: Any,
-    ) -> List[MMStoredDocument]:
-        """Return (mm) docs most similar to query."""
-        search_metadata = self._filter_to_metadata(filter)
-        search_vector = self.embedding.embed_one(query)
-        return [
-            MMStoredDocument(
-                content=self.content_serializer.deserialize_stored_str_to_content(
-                    rbl, metadata=rme
-                ),
-                metadata=rme,
-            )
-            for (rid, rbl, rme, rsi) in self.vector_reader_writer.search_by_vector(
-                vector=search_vector,
-                k=k,
-                metadata=search_metadata,
-                **kwargs,
-            )
-        ]
-
-    def clear(self):
-        self.vector_reader_writer.clear()
@@ -25,9 +25,13 @@ mm_vectorstore = MMCassandra(
     content_serializer=MMImageTextSerializer(),
     table_name=vector_store_name,
 )
-mm_vectorstore.clear()
 
 loader = MMDisjointWebBaseLoader(web_url)
-added = mm_vectorstore.add_documents(loader.load_and_split())
+# re-running this skips the documents already stored (ids are content hashes)
+added = mm_vectorstore.add_documents_stream(
+    loader.lazy_load_and_split(),
+    incremental=True,
+    id_metadata_fields=["source", "image_url"],
+)
 
-print(f"Added {len(added)} documents from {web_url}.")
+print(f"Added {len(added)} new documents from {web_url}.")
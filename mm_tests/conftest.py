@@ -0,0 +1,26 @@
+import pytest
+
+from mm_fakes import CountingMMEmbeddings, FakeVectorTable
+from mm_langchain.mm_huggingface_embeddings import MMImageTextSerializer
+
+
+@pytest.fixture
+def embedding() -> CountingMMEmbeddings:
+    return CountingMMEmbeddings(dimension=16)
+
+
+@pytest.fixture
+def serializer() -> MMImageTextSerializer:
+    return MMImageTextSerializer()
+
+
+@pytest.fixture
+def fake_cassio_tables(monkeypatch):
+    import mm_langchain.mm_vectorstores as mm_vectorstores
+
+    monkeypatch.setattr(
+        mm_vectorstores, "MetadataVectorCassandraTable", FakeVectorTable
+    )
+    monkeypatch.setattr(
+        mm_vectorstores, "ClusteredMetadataVectorCassandraTable", FakeVectorTable
+    )
@@ -0,0 +1,183 @@
+"""
+Offline stand-ins for the tests: a fake multimodal embedding model,
+a fake cassio vector table and synthetic images, vectors and texts.
+"""
+import hashlib
+import io
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+from PIL.Image import Image as PILImageType
+
+from mm_langchain.mm_abstract_embeddings import MMEmbeddings
+from mm_langchain.mm_vectors import as_vector_matrix
+
+_WORDS = (
+    "the of and to in is for on with as by at from multimodal vector store "
+    'image page café naïve résumé \u2014 "quoted" line\nbreak \U0001f600'
+).split(" ")
+
+
+class CountingMMEmbeddings(MMEmbeddings):
+    """
+    Deterministic "text"/"image" embeddings (a pseudo-random unit vector
+    seeded by a hash of the value), counting the values embedded.
+    """
+
+    modality_type_map = {
+        "text": str,
+        "image": PILImageType,
+    }
+
+    def __init__(self, dimension: int = 16) -> None:
+        self.dimension = dimension
+        self.num_embedded = 0
+
+    def _vector(self, modality: str, value: Any) -> np.ndarray:
+        self.num_embedded += 1
+        data = value.encode("utf-8") if modality == "text" else value.tobytes()
+        seed = hashlib.blake2b(modality.encode() + b"\x00" + data, digest_size=8)
+        rng = np.random.default_rng(int.from_bytes(seed.digest(), "little"))
+        vector = rng.standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def embed_by_modality(self, modality: str, value: Any) -> np.ndarray:
+        return self._vector(modality, value)
+
+    def embed_batch_by_modality(
+        self, modality: str, values: List[Any], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        return as_vector_matrix([self._vector(modality, value) for value in values])
+
+
+def synthetic_image(seed: int = 0, size: Tuple[int, int] = (320, 240)) -> PILImageType:
+    """A noisy RGB image (fully determined by the seed)."""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    return Image.fromarray(pixels, mode="RGB")
+
+
+def synthetic_jpeg(seed: int = 0, size: Tuple[int, int] = (320, 240)) -> bytes:
+    buffer = io.BytesIO()
+    synthetic_image(seed, size).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def synthetic_vectors(
+    num_rows: int, dimension: int, num_clusters: int = 20, seed: int = 0
+) -> np.ndarray:
+    """Clustered float32 vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, num_clusters, size=num_rows)
+    noise = rng.standard_normal((num_rows, dimension)).astype(np.float32)
+    return centers[labels] + 0.8 * noise
+
+
+def recall_at_k(exact_rw: Any, approx_rw: Any, queries: np.ndarray, k: int) -> float:
+    """Fraction of the exact top-k ids also found by approx_rw."""
+    found = 0
+    for query in queries:
+        exact_ids = {row[0] for row in exact_rw.search_by_vector(query, k=k)}
+        approx_ids = {row[0] for row in approx_rw.search_by_vector(query, k=k)}
+        found += len(exact_ids & approx_ids)
+    return found / (k * len(queries))
+
+
+def text_chunks(num_chunks: int, chunk_size: int = 200) -> List[Dict[str, str]]:
+    """Serialized web-page-like contents: text chunks, some images."""
+    rng = random.Random(0)
+    chunks: List[Dict[str, str]] = []
+    for chunk_i in range(num_chunks):
+        if chunk_i % 5 == 4:
+            chunks.append({"image": "(an image)"})
+        else:
+            words = [rng.choice(_WORDS) for _ in range(chunk_size // 5)]
+            chunks.append({"text": " ".join(words)[:chunk_size]})
+    return chunks
+
+
+class _Done:
+    """A completed driver ResponseFuture."""
+
+    def __init__(self, result=None, error=None):
+        self._result = result
+        self._error = error
+
+    def result(self):
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def add_callbacks(self, callback, errback):
+        if self._error is not None:
+            errback(self._error)
+        else:
+            callback(self._result)
+
+
+class FakeVectorTable:
+    """
+    In-memory stand-in for the cassio (clustered) metadata vector tables,
+    with exact cosine search. Rows whose body is in `failing_bodies`
+    fail to be written.
+    """
+
+    def __init__(self, table, vector_dimension, partition_id_type=None, **kwargs):
+        self.vector_dimension = vector_dimension
+        self.clustered = partition_id_type is not None
+        self.rows = {}
+        self.ann_searches = []
+        self.failing_bodies = set()
+
+    def put_async(self, row_id, body_blob, vector, metadata, partition_id=None):
+        assert len(vector) == self.vector_dimension
+        assert self.clustered == (partition_id is not None)
+        if body_blob in self.failing_bodies:
+            return _Done(error=RuntimeError(f"cannot write {body_blob}"))
+        self.rows[(partition_id, row_id)] = (body_blob, vector, dict(metadata))
+        return _Done()
+
+    def metric_ann_search(
+        self, vector, n, metric, metric_threshold=None, metadata=None, **kwargs
+    ):
+        partition_id = kwargs.get("partition_id")
+        assert self.clustered == (partition_id is not None)
+        self.ann_searches.append((partition_id, dict(metadata or {})))
+        query = np.asarray(vector, dtype=np.float32)
+        found = []
+        for (row_pid, row_id), (body, row_vector, row_md) in self.rows.items():
+            if row_pid != partition_id:
+                continue
+            if any(row_md.get(key) != value for key, value in (metadata or {}).items()):
+                continue
+            row_array = np.asarray(row_vector, dtype=np.float32)
+            similarity = float(
+                row_array @ query / (np.linalg.norm(row_array) * np.linalg.norm(query))
+            )
+            found.append(
+                {
+                    "row_id": row_id,
+                    "body_blob": body,
+                    "metadata": dict(row_md),
+                    "distance": similarity,
+                }
+            )
+        found.sort(key=lambda row: -row["distance"])
+        return found[:n]
+
+    async def ametric_ann_search(self, **kwargs):
+        return self.metric_ann_search(**kwargs)
+
+    def execute_cql(self, cql, op_type, args=()):
+        assert "DISTINCT partition_id" in cql
+        return [{"partition_id": pid} for pid in sorted({pid for pid, _ in self.rows})]
+
+    def execute_cql_async(self, cql, op_type, args=()):
+        key = tuple(args) if self.clustered else (None, args[0])
+        return _Done(result=[{"row_id": key[1]}] if key in self.rows else [])
+
+    def clear(self):
+        self.rows = {}
@@ -0,0 +1,48 @@
+import pytest
+
+from mm_fakes import text_chunks
+from mm_langchain.mm_blob_codecs import decode_blob, get_blob_codec
+from mm_langchain.mm_huggingface_embeddings import MMImageTextSerializer
+
+CODECS = ["json", "orjson", "length_prefixed"]
+
+
+def _codec(name):
+    if name == "orjson":
+        pytest.importorskip("orjson")
+    return get_blob_codec(name)
+
+
+@pytest.mark.parametrize("codec_name", CODECS)
+def test_round_trip(codec_name):
+    codec = _codec(codec_name)
+    chunks = text_chunks(50) + [{}, {"text": ""}]
+    chunks.append({"text": "~lp:3:not a tag", "image": "1:x{}\n"})
+    for stored in chunks:
+        assert decode_blob(codec.encode(stored)) == stored
+
+
+@pytest.mark.parametrize("codec_name", CODECS)
+def test_rows_written_with_any_codec_stay_readable(codec_name):
+    writer = MMImageTextSerializer(blob_codec=_codec(codec_name))
+    reader = MMImageTextSerializer()
+    stored_str = writer.serialize_content_to_stored_str({"text": "some text"})
+    assert reader.deserialize_stored_str_to_content(stored_str) == {"text": "some text"}
+
+
+def test_json_compatible_codecs_write_plain_json():
+    assert get_blob_codec("json").encode({"text": "a"}) == '{"text":"a"}'
+    stored = {"text": "café ☕", "image": "x"}
+    orjson_blob = _codec("orjson").encode(stored)
+    assert orjson_blob == '{"image":"x","text":"café ☕"}'
+    assert orjson_blob != get_blob_codec("json").encode(stored)
+    assert decode_blob(orjson_blob) == stored
+
+
+def test_unknown_codecs_and_tags_are_rejected():
+    with pytest.raises(ValueError):
+        get_blob_codec("msgpack")
+    with pytest.raises(ValueError):
+        decode_blob("~zz:payload")
+    with pytest.raises(ValueError):
+        decode_blob("~lp:5:text9:truncated")
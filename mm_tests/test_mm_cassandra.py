@@ -0,0 +1,104 @@
+import asyncio
+from typing import List
+
+import pytest
+from langchain.schema.embeddings import Embeddings
+
+from mm_fakes import synthetic_image
+from mm_langchain.mm_abstract_vectorstores import MMBulkWriteError
+from mm_langchain.mm_local_vectorstores import (
+    NumpyVectorReaderWriter,
+    MMNumpyVectorStore,
+)
+from mm_langchain.mm_multivector_vectorstores import MMMultiVectorStore
+from mm_langchain.mm_vectorstores import Cassandra, CassandraVectorReaderWriter
+
+
+class AsymmetricEmbeddings(Embeddings):
+    """Queries get a different vector than the same text as a document."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[1.0, float(len(text)), 0.0] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return [0.0, float(len(text)), 1.0]
+
+
+def test_batch_search_embeds_queries_as_queries(fake_cassio_tables):
+    store = Cassandra(AsymmetricEmbeddings(), "t", vector_dimension=3)
+    store.add_texts(["a", "bb", "ccc"])
+    queries = ["a", "bbbb"]
+    batch = store.similarity_search_batch(queries, k=2)
+    single = [store.similarity_search(query, k=2) for query in queries]
+    assert batch == single
+    assert batch[0][0].page_content == "ccc"
+
+
+def test_batch_search_rejects_misaligned_filters(fake_cassio_tables):
+    store = Cassandra(AsymmetricEmbeddings(), "t", vector_dimension=3)
+    store.add_texts(["a", "bb"])
+    with pytest.raises(ValueError):
+        store.similarity_search_batch(["a", "bb", "ccc"], filters=[{"x": "1"}])
+
+
+def test_mm_batch_search_rejects_misaligned_filters(embedding, serializer):
+    store = MMNumpyVectorStore(embedding, serializer, vector_dimension=16)
+    store.add_contents([{"text": "a"}, {"text": "b"}])
+    queries = [{"text": "a"}, {"text": "b"}]
+    with pytest.raises(ValueError):
+        store.similarity_search_batch(queries, filters=[None])
+    with pytest.raises(ValueError):
+        store.vector_reader_writer.search_by_vectors(
+            embedding.embed_many_array(queries), metadatas=[None] * 3
+        )
+    assert len(store.similarity_search_batch(queries, filters=[None, None])) == 2
+
+
+@pytest.mark.parametrize("window", [1, 3, 16])
+def test_partial_failures_are_reported_after_all_writes(fake_cassio_tables, window):
+    vector_rw = CassandraVectorReaderWriter("t", vector_dimension=2)
+    vector_rw.table.failing_bodies = {"b1", "b3"}
+    bodies = [f"b{i}" for i in range(6)]
+    ids = [f"id{i}" for i in range(6)]
+    with pytest.raises(MMBulkWriteError) as exc_info:
+        vector_rw.store_contents(
+            bodies, [[1.0, float(i)] for i in range(6)], ids=ids, concurrency=window
+        )
+    assert sorted(exc_info.value.inserted_ids) == ["id0", "id2", "id4", "id5"]
+    assert sorted(exc_info.value.failures) == ["id1", "id3"]
+    assert vector_rw.existing_ids(ids) == {"id0", "id2", "id4", "id5"}
+
+
+def test_async_partial_failures_are_reported(fake_cassio_tables):
+    vector_rw = CassandraVectorReaderWriter("t", vector_dimension=2)
+    vector_rw.table.failing_bodies = {"b0"}
+    with pytest.raises(MMBulkWriteError) as exc_info:
+        asyncio.run(
+            vector_rw.astore_contents(
+                ["b0", "b1"], [[1.0, 0.0], [0.0, 1.0]], ids=["id0", "id1"]
+            )
+        )
+    assert exc_info.value.inserted_ids == ["id1"]
+    assert list(exc_info.value.failures) == ["id0"]
+
+
+def test_multivector_failures_in_one_index_are_reported(embedding, serializer):
+    class FailingReaderWriter(NumpyVectorReaderWriter):
+        def store_contents(self, contents_str, vectors, metadatas=None, ids=None, **kw):
+            ids0 = list(ids)
+            raise MMBulkWriteError(
+                inserted_ids=[], failures={row_id: RuntimeError() for row_id in ids0}
+            )
+
+    store = MMMultiVectorStore(
+        embedding,
+        serializer,
+        {"text": NumpyVectorReaderWriter(16), "image": FailingReaderWriter(16)},
+    )
+    with pytest.raises(MMBulkWriteError) as exc_info:
+        store.add_contents(
+            [{"text": "a"}, {"image": synthetic_image(0, (8, 8))}],
+            ids=["text-only", "image-only"],
+        )
+    assert exc_info.value.inserted_ids == ["text-only"]
+    assert list(exc_info.value.failures) == ["image-only"]
@@ -0,0 +1,104 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from mm_langchain.mm_abstract_vectorstores import MMDefaultVectorStore
+from mm_langchain.mm_vectorstores import CassandraVectorReaderWriter
+
+TENANTS = ["t0", "t1", "t2"]
+
+
+@pytest.fixture
+def partitioned_rw(fake_cassio_tables):
+    vector_rw = CassandraVectorReaderWriter(
+        "t", vector_dimension=8, partition_field="tenant"
+    )
+    vectors = np.random.default_rng(0).standard_normal((30, 8)).astype(np.float32)
+    vector_rw.store_contents(
+        [str(i) for i in range(30)],
+        vectors,
+        [{"tenant": TENANTS[i % 3], "kind": f"k{i % 2}"} for i in range(30)],
+        ids=[str(i) for i in range(30)],
+    )
+    return vector_rw, vectors
+
+
+def test_writes_are_routed_to_partitions(partitioned_rw):
+    vector_rw, _ = partitioned_rw
+    assert {pid for pid, _ in vector_rw.table.rows} == set(TENANTS)
+    assert all(
+        metadata["tenant"] == pid
+        for (pid, _), (_, _, metadata) in vector_rw.table.rows.items()
+    )
+
+
+def test_filter_on_the_partition_field_hits_one_partition(partitioned_rw):
+    vector_rw, vectors = partitioned_rw
+    results = vector_rw.search_by_vector(
+        vectors[4], k=3, metadata={"tenant": "t1", "kind": "k0"}
+    )
+    assert results[0][0] == "4"
+    assert vector_rw.table.ann_searches == [("t1", {"kind": "k0"})]
+
+
+def test_cross_partition_search_is_opt_in(partitioned_rw):
+    vector_rw, vectors = partitioned_rw
+    with pytest.raises(ValueError):
+        vector_rw.search_by_vector(vectors[5], k=3, metadata={"kind": "k1"})
+    everywhere = vector_rw.search_by_vector(vectors[5], k=5, all_partitions=True)
+    assert everywhere[0][0] == "5"
+    scores = [result[3] for result in everywhere]
+    assert scores == sorted(scores, reverse=True)
+    assert {pid for pid, _ in vector_rw.table.ann_searches} == set(TENANTS)
+    some = vector_rw.search_by_vector(vectors[5], k=5, partitions=["t2", "t0"])
+    assert {int(result[0]) % 3 for result in some} <= {0, 2}
+    assert (
+        asyncio.run(vector_rw.asearch_by_vector(vectors[5], k=5, all_partitions=True))
+        == everywhere
+    )
+
+
+def test_entries_without_the_partition_field_are_rejected(partitioned_rw):
+    vector_rw, vectors = partitioned_rw
+    num_rows = len(vector_rw.table.rows)
+    with pytest.raises(ValueError):
+        vector_rw.store_contents(["x", "y"], vectors[:2], [{"tenant": "t0"}, {}])
+    assert len(vector_rw.table.rows) == num_rows
+
+
+def test_existing_ids_need_the_partition(partitioned_rw):
+    vector_rw, _ = partitioned_rw
+    assert vector_rw.existing_ids(
+        ["1", "1", "999"],
+        metadatas=[{"tenant": "t1"}, {"tenant": "t0"}, {"tenant": "t0"}],
+    ) == {"1"}
+    with pytest.raises(ValueError):
+        vector_rw.existing_ids(["1"])
+
+
+def test_unpartitioned_tables_reject_partition_options(fake_cassio_tables):
+    vector_rw = CassandraVectorReaderWriter("t", vector_dimension=2)
+    with pytest.raises(ValueError):
+        vector_rw.search_by_vector([1.0, 0.0], all_partitions=True)
+
+
+def test_incremental_ingestion_on_partitioned_tables(
+    fake_cassio_tables, embedding, serializer
+):
+    vector_rw = CassandraVectorReaderWriter(
+        "t", vector_dimension=16, partition_field="tenant"
+    )
+    store = MMDefaultVectorStore(
+        vector_reader_writer=vector_rw,
+        embedding=embedding,
+        content_serializer=serializer,
+    )
+    contents = [{"text": "a"}, {"text": "a"}]
+    metadatas = [{"tenant": "x"}, {"tenant": "y"}]
+    store.add_contents_incremental(contents, metadatas, id_metadata_fields=["tenant"])
+    store.add_contents_incremental(contents, metadatas, id_metadata_fields=["tenant"])
+    assert embedding.num_embedded == 2
+    assert len(vector_rw.table.rows) == 2
+    docs = store.similarity_search({"text": "a"}, k=2, filter={"tenant": "y"})
+    assert [doc.metadata for doc in docs] == [{"tenant": "y"}]
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+from PIL import Image
+
+from mm_fakes import synthetic_image, synthetic_jpeg
+from mm_langchain.mm_embedding_cache import CachedMMEmbeddings, embedding_cache_key
+
+
+@pytest.fixture
+def no_pixel_access(monkeypatch):
+    def _tobytes(*pargs, **kwargs):
+        raise AssertionError("the image pixels were read")
+
+    monkeypatch.setattr(Image.Image, "tobytes", _tobytes)
+
+
+def test_encoded_image_key_needs_no_decoding(no_pixel_access):
+    jpeg = synthetic_jpeg()
+    key = embedding_cache_key("m", "image", Image.open(io.BytesIO(jpeg)))
+    assert key == embedding_cache_key("m", "image", Image.open(io.BytesIO(jpeg)))
+    other = synthetic_jpeg(seed=1)
+    assert key != embedding_cache_key("m", "image", Image.open(io.BytesIO(other)))
+
+
+def test_images_edited_in_place_get_a_new_key():
+    image = Image.open(io.BytesIO(synthetic_jpeg()))
+    key = embedding_cache_key("m", "image", image)
+    image.load()
+    decoded_key = embedding_cache_key("m", "image", image)
+    image.putpixel((0, 0), (255, 0, 255))
+    edited_key = embedding_cache_key("m", "image", image)
+    assert len({key, decoded_key, edited_key}) == 3
+
+
+def test_edited_image_is_embedded_again(embedding):
+    cached = CachedMMEmbeddings(embedding, namespace="fake")
+    image = Image.open(io.BytesIO(synthetic_jpeg()))
+    first = cached.embed_one_array({"image": image})
+    image.paste((0, 0, 0), (0, 0, 100, 100))
+    assert (cached.embed_one_array({"image": image}) != first).any()
+
+
+def test_file_image_key_follows_the_file(tmp_path, no_pixel_access):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(synthetic_jpeg())
+    key = embedding_cache_key("m", "image", Image.open(path))
+    assert embedding_cache_key("m", "image", Image.open(path)) == key
+    path.write_bytes(synthetic_jpeg(seed=1) + b"\x00")
+    assert embedding_cache_key("m", "image", Image.open(path)) != key
+
+
+def test_images_without_source_use_pixels():
+    key = embedding_cache_key("m", "image", synthetic_image(seed=0, size=(8, 8)))
+    assert key == embedding_cache_key("m", "image", synthetic_image(0, (8, 8)))
+    assert key != embedding_cache_key("m", "image", synthetic_image(1, (8, 8)))
+
+
+def test_cache_hits_skip_the_model(embedding):
+    cached = CachedMMEmbeddings(embedding, namespace="fake")
+    jpeg = synthetic_jpeg()
+    contents = [{"text": "a caption"}, {"image": Image.open(io.BytesIO(jpeg))}]
+    first = cached.embed_many_array(contents)
+    assert embedding.num_embedded == 2
+    again = [{"text": "a caption"}, {"image": Image.open(io.BytesIO(jpeg))}]
+    assert (cached.embed_many_array(again) == first).all()
+    assert embedding.num_embedded == 2
+    assert cached.cache.hits == 2
@@ -0,0 +1,60 @@
+import os
+import socket
+import stat
+import threading
+from multiprocessing import AuthenticationError
+
+import pytest
+
+from mm_langchain.mm_embedding_server import MMEmbeddingClient, MMEmbeddingServer
+
+
+def _start(server: MMEmbeddingServer) -> None:
+    ready = threading.Event()
+    threading.Thread(
+        target=server.serve_forever, kwargs={"ready": ready}, daemon=True
+    ).start()
+    assert ready.wait(10)
+
+
+def test_clients_authenticate_with_the_generated_key(tmp_path, embedding):
+    address = str(tmp_path / "emb.sock")
+    _start(MMEmbeddingServer(embedding, address, max_latency=0.001))
+    assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(address + ".key").st_mode) == 0o600
+    client = MMEmbeddingClient(address)
+    assert client.modalities == embedding.modalities
+    expected = embedding.embed_one_array({"text": "hello"})
+    assert (client.embed_one_array({"text": "hello"}) == expected).all()
+    with pytest.raises(AuthenticationError):
+        MMEmbeddingClient(address, authkey=b"not the key")
+    # the server survives failed handshakes
+    assert (
+        MMEmbeddingClient(address).embed_one_array({"text": "hello"}) == expected
+    ).all()
+
+
+def test_the_server_survives_clients_dropping_the_handshake(tmp_path, embedding):
+    address = str(tmp_path / "emb.sock")
+    _start(MMEmbeddingServer(embedding, address, max_latency=0.001))
+    for _ in range(3):
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.connect(address)
+    assert MMEmbeddingClient(address).modalities == embedding.modalities
+
+
+def test_explicit_key_writes_no_key_file(tmp_path, embedding):
+    address = str(tmp_path / "emb.sock")
+    _start(MMEmbeddingServer(embedding, address, authkey=b"secret"))
+    assert not os.path.exists(address + ".key")
+    with pytest.raises(ValueError):
+        MMEmbeddingClient(address)
+    assert MMEmbeddingClient(address, authkey=b"secret").modalities
+
+
+def test_other_files_at_the_address_are_not_removed(tmp_path, embedding):
+    address = tmp_path / "not_a_socket"
+    address.write_text("precious")
+    with pytest.raises(ValueError):
+        MMEmbeddingServer(embedding, str(address)).serve_forever()
+    assert address.read_text() == "precious"
@@ -0,0 +1,42 @@
+import io
+
+from PIL import Image
+
+from mm_fakes import synthetic_jpeg
+from mm_langchain.mm_image_preprocessing import MMImagePreprocessor, prepare_image
+
+PHOTO_SIZE = (2000, 1500)
+
+
+def _photo() -> Image.Image:
+    return Image.open(io.BytesIO(synthetic_jpeg(size=PHOTO_SIZE)))
+
+
+def test_prepare_image_scales_to_target_size():
+    prepared = prepare_image(_photo(), target_size=224)
+    assert prepared.mode == "RGB"
+    assert min(prepared.size) == 224
+
+
+def test_prepare_image_leaves_the_callers_image_unchanged(tmp_path):
+    photo = _photo()
+    prepare_image(photo)
+    assert photo.size == PHOTO_SIZE
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(synthetic_jpeg(size=PHOTO_SIZE))
+    from_file = Image.open(path)
+    prepare_image(from_file)
+    assert from_file.size == PHOTO_SIZE
+
+
+def test_pool_and_in_process_paths_agree():
+    in_process = MMImagePreprocessor(min_pool_batch=100)
+    pooled = MMImagePreprocessor(max_workers=1, min_pool_batch=1)
+    try:
+        photos = [_photo(), _photo()]
+        expected = in_process.preprocess(photos)
+        results = pooled.preprocess(photos)
+        assert [image.size for image in results] == [image.size for image in expected]
+        assert all(photo.size == PHOTO_SIZE for photo in photos)
+    finally:
+        pooled.close()
@@ -0,0 +1,127 @@
+import pytest
+
+from mm_langchain.mm_abstract_vectorstores import MMBulkWriteError
+from mm_langchain.mm_huggingface_embeddings import MMImageTextSerializer
+from mm_langchain.mm_incremental import BloomFilter, content_hash_id
+from mm_langchain.mm_local_vectorstores import (
+    MMNumpyVectorStore,
+    NumpyVectorReaderWriter,
+)
+
+CONTENTS = [{"text": "first chunk"}, {"text": "second chunk"}, {"text": "third"}]
+
+
+def _store(embedding, serializer):
+    return MMNumpyVectorStore(
+        embedding=embedding, content_serializer=serializer, vector_dimension=16
+    )
+
+
+def test_unchanged_contents_are_not_embedded_again(embedding, serializer):
+    store = _store(embedding, serializer)
+    ids = store.add_contents_incremental(CONTENTS)
+    assert embedding.num_embedded == 3
+    assert store.add_contents_incremental(CONTENTS) == ids
+    assert embedding.num_embedded == 3
+    assert store.vector_reader_writer.existing_ids(ids) == set(ids)
+
+
+def test_clear_then_add_again_writes_all_rows(embedding, serializer):
+    store = _store(embedding, serializer)
+    ids = store.add_contents_incremental(CONTENTS)
+    store.clear()
+    assert store.vector_reader_writer.existing_ids(ids) == set()
+    store.add_contents_incremental(CONTENTS)
+    assert embedding.num_embedded == 6
+    assert store.vector_reader_writer.existing_ids(ids) == set(ids)
+    # after a clear, misses of the filter skip the lookup
+    store.add_contents_incremental([{"text": "new"}])
+    assert embedding.num_embedded == 7
+
+
+def test_bloom_filter_hit_is_confirmed_against_the_store(embedding, serializer):
+    store = _store(embedding, serializer)
+    row_id = content_hash_id(serializer.serialize_content(CONTENTS[0]))
+    # same effect as a false positive: the filter claims an absent row
+    store.known_ids = BloomFilter(capacity=100)
+    store.known_ids.add(row_id)
+    store.known_ids_exhaustive = True
+    assert store.add_contents_incremental(CONTENTS[:1]) == [row_id]
+    assert store.vector_reader_writer.existing_ids([row_id]) == {row_id}
+
+
+def test_rows_stored_by_another_store_are_found(embedding, serializer):
+    store = _store(embedding, serializer)
+    ids = store.add_contents_incremental(CONTENTS)
+    other = MMNumpyVectorStore(
+        embedding=embedding,
+        content_serializer=serializer,
+        vector_reader_writer=store.vector_reader_writer,
+    )
+    other.add_contents_incremental(CONTENTS)
+    assert embedding.num_embedded == 3
+    assert other.add_contents_incremental(CONTENTS) == ids
+
+
+def test_ids_do_not_depend_on_the_blob_codec(embedding, serializer):
+    ids = _store(embedding, serializer).add_contents_incremental(CONTENTS)
+    other = _store(embedding, MMImageTextSerializer(blob_codec="length_prefixed"))
+    assert other.add_contents_incremental(CONTENTS) == ids
+
+
+class CountingReaderWriter(NumpyVectorReaderWriter):
+    def __init__(self, *pargs, **kwargs):
+        super().__init__(*pargs, **kwargs)
+        self.lookups = 0
+
+    def existing_ids(self, ids, metadatas=None):
+        self.lookups += 1
+        return super().existing_ids(ids, metadatas=metadatas)
+
+
+def test_saved_known_ids_skip_the_lookups_of_a_later_run(
+    tmp_path, embedding, serializer
+):
+    vector_rw = CountingReaderWriter(16)
+    first_run = MMNumpyVectorStore(embedding, serializer, vector_rw)
+    ids = first_run.add_contents_incremental(CONTENTS)
+    first_run.save_known_ids(str(tmp_path / "known_ids"))
+    lookups = vector_rw.lookups
+
+    second_run = MMNumpyVectorStore(embedding, serializer, vector_rw)
+    second_run.load_known_ids(str(tmp_path / "known_ids"))
+    assert second_run.add_contents_incremental(CONTENTS) == ids
+    assert vector_rw.lookups == lookups
+    assert embedding.num_embedded == 3
+    # new entries are still looked up (and written)
+    second_run.add_contents_incremental([{"text": "new"}])
+    assert (vector_rw.lookups, embedding.num_embedded) == (lookups + 1, 4)
+
+
+def test_rows_written_before_a_bulk_failure_are_known(embedding, serializer):
+    class FailingReaderWriter(NumpyVectorReaderWriter):
+        def store_contents(self, contents_str, vectors, metadatas=None, ids=None):
+            ids0 = list(ids)
+            super().store_contents(
+                contents_str[:1], vectors[:1], metadatas[:1], ids=ids0[:1]
+            )
+            raise MMBulkWriteError(
+                inserted_ids=ids0[:1],
+                failures={row_id: RuntimeError() for row_id in ids0[1:]},
+            )
+
+    store = MMNumpyVectorStore(embedding, serializer, FailingReaderWriter(16))
+    with pytest.raises(MMBulkWriteError) as exc_info:
+        store.add_contents_incremental(CONTENTS)
+    written, failed = exc_info.value.inserted_ids[0], list(exc_info.value.failures)
+    assert written in store.known_ids
+    assert not any(row_id in store.known_ids for row_id in failed)
+
+
+def test_bloom_filter_round_trip(tmp_path):
+    bloom = BloomFilter(capacity=1000, error_rate=1e-4)
+    bloom.update(f"key{i}" for i in range(100))
+    bloom.save(str(tmp_path / "bloom"))
+    loaded = BloomFilter.load(str(tmp_path / "bloom"))
+    assert all(f"key{i}" in loaded for i in range(100))
+    assert (loaded.count, loaded.num_bits) == (100, bloom.num_bits)
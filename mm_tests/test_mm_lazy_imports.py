@@ -0,0 +1,18 @@
+import subprocess
+import sys
+
+QUERIER_IMPORTS = """
+import sys
+from mm_langchain.mm_huggingface_embeddings import MMHuggingFaceEmbeddings
+from mm_langchain.mm_embedding_cache import CachedMMEmbeddings
+from mm_langchain.mm_local_vectorstores import MMNumpyVectorStore
+from mm_langchain.mm_vectorstores import MMCassandra
+heavy = {"langchain.schema", "sentence_transformers", "torch"} & set(sys.modules)
+assert not heavy, heavy
+from mm_langchain.mm_embedding_cache import CachedEmbeddings
+assert "langchain.schema" in sys.modules
+"""
+
+
+def test_querier_imports_skip_langchain_schema_and_torch():
+    subprocess.run([sys.executable, "-c", QUERIER_IMPORTS], check=True)
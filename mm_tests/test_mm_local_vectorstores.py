@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from mm_langchain.mm_local_vectorstores import (
+    IVFVectorReaderWriter,
+    NumpyVectorReaderWriter,
+)
+
+
+def _filled(rw_class, **kwargs):
+    vectors = np.random.default_rng(0).standard_normal((200, 8)).astype(np.float32)
+    vector_rw = rw_class(vector_dimension=8, **kwargs)
+    ids = [f"id{i}" for i in range(200)]
+    vector_rw.store_contents(
+        [f"b{i}" for i in range(200)], vectors, [{"i": i} for i in range(200)], ids=ids
+    )
+    return vector_rw, vectors
+
+
+@pytest.mark.parametrize(
+    "rw_class, kwargs",
+    [
+        (NumpyVectorReaderWriter, {}),
+        (NumpyVectorReaderWriter, {"compact_codec": "int8"}),
+        (IVFVectorReaderWriter, {"n_lists": 4, "train_size": 100}),
+    ],
+)
+def test_saving_over_the_loaded_files(tmp_path, rw_class, kwargs):
+    path = str(tmp_path / "store")
+    vector_rw, vectors = _filled(rw_class, **kwargs)
+    vector_rw.save(path)
+    loaded = rw_class.load(path)
+    assert loaded.delete([f"id{i}" for i in range(0, 200, 2)]) == 100
+    loaded.save(path)
+    # the memory-mapped vectors of `loaded` are still intact
+    assert loaded.search_by_vector(vectors[1], k=1)[0][0] == "id1"
+    reloaded = rw_class.load(path)
+    for i in (1, 99, 199):
+        top = reloaded.search_by_vector(vectors[i], k=1)[0]
+        assert (top[0], top[1], top[2]) == (f"id{i}", f"b{i}", {"i": i})
+        assert top[3] == pytest.approx(1.0, abs=1e-2)
+    assert reloaded.existing_ids(["id0", "id1"]) == {"id1"}
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from mm_fakes import synthetic_image
+from mm_langchain.mm_local_vectorstores import NumpyVectorReaderWriter
+from mm_langchain.mm_metrics import InMemoryMetricsCollector
+from mm_langchain.mm_multivector_vectorstores import (
+    MMMultiVectorStore,
+    MultiVectorReaderWriter,
+    fuse_results,
+)
+
+
+class SpyReaderWriter(NumpyVectorReaderWriter):
+    def __init__(self, *pargs, **kwargs):
+        super().__init__(*pargs, **kwargs)
+        self.searches = 0
+
+    def search_by_vector(self, *pargs, **kwargs):
+        self.searches += 1
+        return super().search_by_vector(*pargs, **kwargs)
+
+
+def _result(row_id, score):
+    return (row_id, row_id, {}, score)
+
+
+@pytest.mark.parametrize("fusion", ["weighted_sum", "rrf"])
+def test_weights_rank_entries_found_in_one_index_each(fusion):
+    # text and image documents are disjoint: only the weights decide
+    results = {
+        "text": [_result("cat", 0.9)],
+        "image": [_result("photo", 0.8)],
+    }
+
+    def ranking(weights):
+        fused = fuse_results(results, weights, k=2, fusion=fusion)
+        return [row_id for row_id, _, _, _ in fused]
+
+    assert ranking({"text": 1.0, "image": 0.01}) == ["cat", "photo"]
+    assert ranking({"text": 0.01, "image": 1.0}) == ["photo", "cat"]
+
+
+def test_fused_scores_stay_on_the_similarity_scale():
+    results = {
+        "text": [_result("a", 0.9)],
+        "image": [_result("a", 0.7)],
+    }
+    fused = fuse_results(results, {"text": 3.0, "image": 1.0}, k=1)
+    assert fused[0][3] == pytest.approx(0.85)
+
+
+def test_weights_shift_the_fused_ranking():
+    results = {
+        "text": [_result("a", 0.9), _result("b", 0.5)],
+        "image": [_result("b", 0.95), _result("a", 0.1)],
+    }
+    fused = fuse_results(results, {"text": 0.1, "image": 1.0}, k=2)
+    assert [result[0] for result in fused] == ["b", "a"]
+
+
+@pytest.fixture
+def multivector_store(embedding, serializer):
+    store = MMMultiVectorStore(
+        embedding,
+        serializer,
+        {"text": SpyReaderWriter(16), "image": SpyReaderWriter(16)},
+        metrics=InMemoryMetricsCollector(),
+    )
+    store.add_contents(
+        [
+            {"text": "cat"},
+            {"text": "dog", "image": synthetic_image(1, (16, 16))},
+            {"image": synthetic_image(2, (16, 16))},
+        ],
+        [{"i": i} for i in range(3)],
+    )
+    yield store
+    store.close()
+
+
+def test_queries_search_the_indexes_of_their_modalities(multivector_store):
+    rws = multivector_store.vector_reader_writer.vector_reader_writers
+    docs = multivector_store.similarity_search({"text": "cat"}, k=1)
+    assert docs[0].metadata == {"i": 0}
+    assert (rws["text"].searches, rws["image"].searches) == (1, 0)
+    asyncio.run(multivector_store.asimilarity_search({"text": "cat"}, k=1))
+    assert rws["image"].searches == 0
+    # cross-modal, explicitly
+    multivector_store.similarity_search({"text": "cat"}, k=1, modalities=["image"])
+    assert (rws["text"].searches, rws["image"].searches) == (2, 1)
+
+
+def test_batch_search_groups_queries_by_modality(multivector_store):
+    rws = multivector_store.vector_reader_writer.vector_reader_writers
+    image = synthetic_image(2, (16, 16))
+    results = multivector_store.similarity_search_batch(
+        [{"text": "cat"}, {"image": image}, {"text": "dog"}], k=1
+    )
+    assert [docs[0].metadata for docs in results] == [{"i": 0}, {"i": 2}, {"i": 1}]
+    assert (rws["text"].searches, rws["image"].searches) == (2, 1)
+
+
+def test_metrics_reach_the_per_modality_reader_writers(multivector_store):
+    metrics = multivector_store.metrics
+    for (
+        vector_rw
+    ) in multivector_store.vector_reader_writer.vector_reader_writers.values():
+        assert vector_rw.metrics is metrics
+
+
+def test_close_releases_the_search_threads():
+    vector_rw = MultiVectorReaderWriter(
+        {"text": NumpyVectorReaderWriter(4), "image": NumpyVectorReaderWriter(4)}
+    )
+    vector_rw.search_by_vector([1.0, 0.0, 0.0, 0.0], k=1)
+    executor = vector_rw._executor
+    assert executor is not None
+    vector_rw.close()
+    assert vector_rw._executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from mm_fakes import recall_at_k, synthetic_vectors
+from mm_langchain.mm_local_vectorstores import NumpyVectorReaderWriter
+from mm_langchain.mm_vector_codecs import decode_vector_rows, encode_vector_rows
+from mm_langchain.mm_vectorstores import CassandraVectorReaderWriter
+
+
+def _build(vectors, compact_codec=None):
+    rw = NumpyVectorReaderWriter(
+        vector_dimension=vectors.shape[1], compact_codec=compact_codec
+    )
+    rw.store_contents(
+        [""] * len(vectors), vectors, ids=[str(i) for i in range(len(vectors))]
+    )
+    return rw
+
+
+@pytest.mark.parametrize("codec", ["float32", "float16", "int8", "bit"])
+def test_vector_codec_round_trip(codec):
+    matrix = synthetic_vectors(20, 32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    decoded = decode_vector_rows(encode_vector_rows(matrix, codec=codec))
+    assert decoded.shape == matrix.shape
+    if codec == "bit":
+        assert (np.sign(decoded) == np.sign(matrix)).all()
+    else:
+        assert np.allclose(decoded, matrix, atol={"int8": 1e-2}.get(codec, 1e-3))
+
+
+def test_int8_first_pass_keeps_recall():
+    vectors = synthetic_vectors(2000, 64)
+    data, queries = vectors[:1900], vectors[1900:]
+    approx = _build(data, "int8")
+    assert recall_at_k(_build(data), approx, queries, k=5) > 0.95
+
+
+def test_float16_is_not_a_first_pass_codec():
+    with pytest.raises(ValueError):
+        NumpyVectorReaderWriter(vector_dimension=8, compact_codec="float16")
+
+
+def test_cassandra_row_storage():
+    exact = CassandraVectorReaderWriter.row_storage(512)
+    assert exact == {"vector_column": 2048, "full_vector_metadata": 0}
+    compact = CassandraVectorReaderWriter.row_storage(512, 128, "int8")
+    assert compact["vector_column"] == 512
+    assert sum(compact.values()) < sum(exact.values())
+
+
+def test_cassandra_rescoring_is_exact_by_default(fake_cassio_tables):
+    vectors = synthetic_vectors(200, 32)
+    data, queries = vectors[:190], vectors[190:]
+    exact = CassandraVectorReaderWriter("t", vector_dimension=32)
+    two_stage = CassandraVectorReaderWriter(
+        "t", vector_dimension=32, search_dimension=8, oversample=50
+    )
+    for vector_rw in (exact, two_stage):
+        vector_rw.store_contents(
+            [""] * len(data), data, ids=[str(i) for i in range(len(data))]
+        )
+    for query in queries:
+        expected = exact.search_by_vector(query, k=3)
+        found = two_stage.search_by_vector(query, k=3)
+        assert [row[0] for row in found] == [row[0] for row in expected]
+        assert [row[3] for row in found] == pytest.approx(
+            [row[3] for row in expected], abs=1e-6
+        )
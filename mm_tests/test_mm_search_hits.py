@@ -0,0 +1,26 @@
+import asyncio
+
+from mm_langchain.mm_local_vectorstores import MMNumpyVectorStore
+
+
+def test_search_hits_by_vector(embedding, serializer):
+    store = MMNumpyVectorStore(embedding, serializer, vector_dimension=16)
+    ids = store.add_contents(
+        [{"text": "a"}, {"text": "b"}], [{"n": 0}, {"n": 1}], ids=["id-a", "id-b"]
+    )
+    query = embedding.embed_one_array({"text": "b"})
+    hits = store.similarity_search_with_score_and_id_by_vector(query, k=2)
+    async_hits = asyncio.run(
+        store.asimilarity_search_with_score_and_id_by_vector(query, k=2)
+    )
+    for found in (hits, async_hits):
+        assert [hit.id for hit in found] == ids[::-1]
+        assert found[0].score > found[1].score
+        assert found[0].content == {"text": "b"}
+        assert found[0].metadata == {"n": 1}
+    filtered = asyncio.run(
+        store.asimilarity_search_with_score_and_id_by_vector(
+            query, k=2, filter={"n": 0}
+        )
+    )
+    assert [hit.id for hit in filtered] == ["id-a"]